@@ -0,0 +1,314 @@
+# autiner_bot/alerts.py
+"""
+Cảnh báo giá / % thay đổi 24h / RSI theo chat.
+- Chỉ mục theo (symbol, metric): 2 list ngưỡng đã sắp xếp
+    above: báo khi giá trị >= ngưỡng -> các cảnh báo kích hoạt là đoạn đầu [:bisect_right(v)]
+    below: báo khi giá trị <= ngưỡng -> các cảnh báo kích hoạt là đoạn cuối [bisect_left(v):]
+  Mỗi ticker chỉ tốn 2 lần bisect / metric, không quét toàn bộ cảnh báo.
+- Cảnh báo 1 lần: kích hoạt xong thì xoá.
+- Chạy trên snapshot ticker dùng chung (listener của TICKERS): REST refresh lẫn websocket.
+- RSI: peek O(1) trên trạng thái chỉ báo đã nạp nến đóng (poller warm các symbol có cảnh báo RSI).
+- Lưu file JSON (ghi gộp sau ALERTS_SAVE_DELAY giây, ghi tạm rồi rename).
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import json
+import os
+import time
+
+from autiner_bot import metrics
+from autiner_bot.settings import S
+from autiner_bot.data_sources.binance import TICKERS, live_rsi
+from autiner_bot.data_sources.models import Ticker
+
+METRICS = ("price", "pct", "rsi")
+ABOVE, BELOW = "above", "below"
+
+
+class Alert:
+    __slots__ = ("id", "chat_id", "symbol", "metric", "direction", "threshold", "created_at")
+
+    def __init__(self, id: int, chat_id: int, symbol: str, metric: str, direction: str,
+                 threshold: float, created_at: Optional[float] = None):
+        self.id = id
+        self.chat_id = chat_id
+        self.symbol = symbol
+        self.metric = metric
+        self.direction = direction
+        self.threshold = threshold
+        self.created_at = time.time() if created_at is None else created_at
+
+    def to_dict(self) -> dict:
+        return {s: getattr(self, s) for s in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Alert":
+        return cls(int(d["id"]), int(d["chat_id"]), d["symbol"], d["metric"], d["direction"],
+                   float(d["threshold"]), d.get("created_at"))
+
+    def __repr__(self) -> str:
+        op = ">=" if self.direction == ABOVE else "<="
+        return f"Alert(#{self.id} {self.symbol} {self.metric} {op} {self.threshold})"
+
+
+class _Thresholds:
+    """Ngưỡng tăng dần + id song song."""
+    __slots__ = ("values", "ids")
+
+    def __init__(self):
+        self.values: List[float] = []
+        self.ids: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def add(self, value: float, alert_id: int) -> None:
+        i = bisect_right(self.values, value)
+        self.values.insert(i, value)
+        self.ids.insert(i, alert_id)
+
+    def remove(self, value: float, alert_id: int) -> bool:
+        i, j = bisect_left(self.values, value), bisect_right(self.values, value)
+        for k in range(i, j):
+            if self.ids[k] == alert_id:
+                del self.values[k], self.ids[k]
+                return True
+        return False
+
+    def pop_le(self, v: float) -> List[int]:
+        """Lấy ra các id có ngưỡng <= v (đoạn đầu)."""
+        k = bisect_right(self.values, v)
+        if not k:
+            return []
+        out = self.ids[:k]
+        del self.values[:k], self.ids[:k]
+        return out
+
+    def pop_ge(self, v: float) -> List[int]:
+        """Lấy ra các id có ngưỡng >= v (đoạn cuối)."""
+        k = bisect_left(self.values, v)
+        if k == len(self.values):
+            return []
+        out = self.ids[k:]
+        del self.values[k:], self.ids[k:]
+        return out
+
+
+# Metric -> giá trị từ ticker (None = bỏ qua)
+_VALUE: Dict[str, Callable[[Ticker], Optional[float]]] = {
+    "price": lambda t: t.last_price,
+    "pct": lambda t: t.change_pct,
+    "rsi": lambda t: live_rsi(t.symbol, t.last_price, S.ALERTS_RSI_INTERVAL),
+}
+
+_FIRED = metrics.counter("autiner_alerts_fired_total", "Cảnh báo đã kích hoạt", ["metric"])
+
+
+class AlertBook:
+    def __init__(self, path: str = "", max_per_chat: int = 50, save_delay: float = 2.0):
+        self.path = path
+        self.max_per_chat = max_per_chat
+        self.save_delay = save_delay
+        self._alerts: Dict[int, Alert] = {}
+        self._by_chat: Dict[int, Set[int]] = {}
+        # symbol -> metric -> (above, below)
+        self._index: Dict[str, Dict[str, Tuple[_Thresholds, _Thresholds]]] = {}
+        self._next_id = 1
+        self._dirty = False
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self.stats: Dict[str, int] = {"added": 0, "removed": 0, "fired": 0, "checks": 0}
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    # ---------- thêm / xoá ----------
+    def add(self, chat_id: int, symbol: str, metric: str, direction: str, threshold: float) -> Alert:
+        if metric not in METRICS or direction not in (ABOVE, BELOW):
+            raise ValueError(f"cảnh báo không hợp lệ: {metric} {direction}")
+        if len(self._by_chat.get(chat_id, ())) >= self.max_per_chat:
+            raise ValueError(f"tối đa {self.max_per_chat} cảnh báo / chat")
+        alert = Alert(self._next_id, chat_id, symbol.upper(), metric, direction, float(threshold))
+        self._next_id += 1
+        self._insert(alert)
+        self.stats["added"] += 1
+        self._changed()
+        return alert
+
+    def _insert(self, alert: Alert) -> None:
+        self._alerts[alert.id] = alert
+        self._by_chat.setdefault(alert.chat_id, set()).add(alert.id)
+        sides = self._index.setdefault(alert.symbol, {}).get(alert.metric)
+        if sides is None:
+            sides = self._index[alert.symbol][alert.metric] = (_Thresholds(), _Thresholds())
+        sides[0 if alert.direction == ABOVE else 1].add(alert.threshold, alert.id)
+
+    def remove(self, chat_id: int, alert_id: int) -> bool:
+        alert = self._alerts.get(alert_id)
+        if alert is None or alert.chat_id != chat_id:
+            return False
+        sides = self._index[alert.symbol][alert.metric]
+        sides[0 if alert.direction == ABOVE else 1].remove(alert.threshold, alert_id)
+        self._forget(alert)
+        self._prune(alert.symbol, alert.metric)
+        self.stats["removed"] += 1
+        self._changed()
+        return True
+
+    def remove_chat(self, chat_id: int) -> int:
+        ids = list(self._by_chat.get(chat_id, ()))
+        for alert_id in ids:
+            self.remove(chat_id, alert_id)
+        return len(ids)
+
+    def _forget(self, alert: Alert) -> None:
+        del self._alerts[alert.id]
+        ids = self._by_chat.get(alert.chat_id)
+        if ids is not None:
+            ids.discard(alert.id)
+            if not ids:
+                del self._by_chat[alert.chat_id]
+
+    def _prune(self, symbol: str, metric: str) -> None:
+        by_metric = self._index.get(symbol)
+        sides = by_metric.get(metric) if by_metric is not None else None
+        if sides is None:
+            return
+        if not sides[0] and not sides[1]:
+            del by_metric[metric]
+            if not by_metric:
+                del self._index[symbol]
+
+    # ---------- đọc ----------
+    def for_chat(self, chat_id: int) -> List[Alert]:
+        return sorted((self._alerts[i] for i in self._by_chat.get(chat_id, ())), key=lambda a: a.id)
+
+    def symbols(self, metric: Optional[str] = None) -> List[str]:
+        return sorted(s for s, by_metric in self._index.items() if metric is None or metric in by_metric)
+
+    # ---------- kiểm tra ----------
+    def check(self, tickers: Iterable[Ticker]) -> List[Tuple[Alert, float]]:
+        """Các cảnh báo vừa kích hoạt (đã xoá khỏi sổ) kèm giá trị lúc kích hoạt."""
+        self.stats["checks"] += 1
+        index = self._index
+        if not index:
+            return []
+        fired: List[Tuple[Alert, float]] = []
+        emptied: List[Tuple[str, str]] = []
+        for t in tickers:
+            by_metric = index.get(t.symbol)
+            if by_metric is None:
+                continue
+            for metric, (above, below) in by_metric.items():
+                v = t.last_price if metric == "price" else t.change_pct if metric == "pct" else _VALUE[metric](t)
+                if v is None:
+                    continue
+                # chỉ đụng tới list khi ngưỡng gần nhất đã bị vượt
+                hit_above = above.values and above.values[0] <= v
+                hit_below = below.values and below.values[-1] >= v
+                if not (hit_above or hit_below):
+                    continue
+                ids = (above.pop_le(v) if hit_above else []) + (below.pop_ge(v) if hit_below else [])
+                for alert_id in ids:
+                    alert = self._alerts[alert_id]
+                    self._forget(alert)
+                    fired.append((alert, v))
+                _FIRED.labels(metric).inc(len(ids))
+                emptied.append((t.symbol, metric))
+        for symbol, metric in emptied:
+            self._prune(symbol, metric)
+        if fired:
+            self.stats["fired"] += len(fired)
+            self._changed()
+        return fired
+
+    # ---------- lưu file ----------
+    def _changed(self) -> None:
+        self._dirty = True
+        if not self.path or self._save_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # ngoài event loop (script/test): gọi save() khi cần
+        self._save_handle = loop.call_later(self.save_delay, self._save_scheduled)
+
+    def _save_scheduled(self) -> None:
+        self._save_handle = None
+        self.save()
+
+    def save(self) -> None:
+        if not self.path or not self._dirty:
+            return
+        data = {"next_id": self._next_id, "alerts": [a.to_dict() for a in self._alerts.values()]}
+        tmp = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError as e:
+            print(f"[ERROR] alerts save {self.path}: {e}")
+
+    def load(self) -> int:
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            alerts = [Alert.from_dict(d) for d in data.get("alerts", [])]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[ERROR] alerts load {self.path}: {e}")
+            return 0
+        for a in alerts:
+            self._insert(a)
+        self._next_id = max([int(data.get("next_id") or 1)] + [a.id + 1 for a in alerts])
+        return len(alerts)
+
+
+ALERTS = AlertBook(S.ALERTS_FILE, max_per_chat=S.ALERTS_MAX_PER_CHAT, save_delay=S.ALERTS_SAVE_DELAY)
+
+
+@metrics.register_collector
+def _collect_metrics():
+    yield "autiner_alerts_active", "gauge", "Số cảnh báo đang chờ", [({}, len(ALERTS))]
+    yield "autiner_alerts_symbols", "gauge", "Số symbol có cảnh báo", [({}, len(ALERTS._index))]
+
+
+# =============================
+# Start / stop
+# =============================
+Notifier = Callable[[Alert, float], Awaitable[None]]
+_listener: Optional[Callable[[List[Ticker]], None]] = None
+
+
+def start_alerts(notify: Notifier) -> int:
+    """Nạp cảnh báo đã lưu và gắn vào snapshot ticker; notify(alert, value) gửi tin cho chat."""
+    global _listener
+    loaded = ALERTS.load() if not len(ALERTS) else 0
+
+    def _on_tickers(changed: List[Ticker]) -> None:
+        fired = ALERTS.check(changed)
+        if fired:
+            loop = asyncio.get_running_loop()
+            for alert, value in fired:
+                loop.create_task(notify(alert, value))
+
+    if _listener is not None:
+        TICKERS.unsubscribe(_listener)
+    _listener = _on_tickers
+    TICKERS.subscribe(_listener)
+    return loaded
+
+
+def stop_alerts() -> None:
+    global _listener
+    if _listener is not None:
+        TICKERS.unsubscribe(_listener)
+        _listener = None
+    if ALERTS._save_handle is not None:
+        ALERTS._save_handle.cancel()
+        ALERTS._save_handle = None
+    ALERTS.save()
@@ -0,0 +1,241 @@
+# autiner_bot/backtest/engine.py
+"""
+Backtest offline cho 2 chiến lược:
+- analyze_coin        (data_sources/binance.py): RSI/MACD/EMA → side + strength, TP/SL cố định 1% (như menu.text_handler)
+- analyze_coin_signal (strategies/signal_analyzer.py): RSI + MA5/MA20 + biến động 24h,
+                        Market/Limit, TP theo biến động, SL 0.5%
+Tín hiệu tính vector hoá trên toàn chuỗi (batch_indicators); mô phỏng lệnh từng nến, 1 lệnh / symbol.
+Nhiều symbol chạy song song bằng process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+import os
+
+import numpy as np
+
+from autiner_bot.backtest.loader import discover_files, load_store, load_symbol
+from autiner_bot.data_sources.kline_store import KlineStore
+from autiner_bot.data_sources.kline_cache import interval_ms
+from autiner_bot.strategies import batch_indicators as bi
+
+STRATEGIES = ("analyze_coin", "analyze_coin_signal")
+
+
+@dataclass
+class BacktestParams:
+    strategy: str = "analyze_coin"
+    interval: str = "15m"
+    min_strength: int = 70          # chỉ vào lệnh khi độ mạnh >= ngưỡng
+    fee_pct: float = 0.04           # phí taker mỗi chiều (%)
+    max_hold_bars: int = 0          # 0 = giữ tới khi chạm TP/SL
+    limit_fill_bars: int = 3        # lệnh Limit phải khớp trong số nến này, không thì bỏ
+    warmup_bars: int = 200          # bỏ qua phần đầu cho chỉ báo ổn định
+
+
+# =============================
+# Tín hiệu (vector hoá)
+# =============================
+def signals_analyze_coin(arr: Dict[str, np.ndarray], params: BacktestParams) -> Dict[str, np.ndarray]:
+    """Cùng luật score_indicators: RSI ±2, MACD ±1, EMA20/50 ±1; TP/SL 1%."""
+    close = arr["close"]
+    rsi = bi.rsi(close)
+    line, sig, _ = bi.macd(close)
+    ema20, ema50 = bi.ema(close, 20), bi.ema(close, 50)
+
+    bullish = line > np.where(np.isnan(sig), 0.0, sig)
+    score_long = 2 * (rsi < 30) + bullish + (ema20 > ema50)
+    score_short = 2 * (rsi > 70) + ~bullish + ~(ema20 > ema50)
+    side = np.where(score_long >= score_short, 1, -1)
+    strength = np.minimum(90, 50 + 10 * np.abs(score_long - score_short))
+
+    n = close.size
+    valid = ~np.isnan(rsi) & ~np.isnan(ema50)
+    return {
+        "side": np.where(valid, side, 0),
+        "strength": np.where(valid, strength, 0),
+        "entry": close.copy(),
+        "tp_pct": np.full(n, 1.0),
+        "sl_pct": np.full(n, 1.0),
+        "limit": np.zeros(n, dtype=bool),
+    }
+
+
+def signals_analyze_coin_signal(arr: Dict[str, np.ndarray], params: BacktestParams) -> Dict[str, np.ndarray]:
+    """Cùng luật analyze_coin_signal; biến động 24h tính từ chính chuỗi nến."""
+    close = arr["close"]
+    n = close.size
+    rsi = bi.rsi(close)
+    ma5, ma20 = bi.sma(close, 5), bi.sma(close, 20)
+
+    day = max(1, 86_400_000 // max(1, interval_ms(params.interval)))
+    change = np.full(n, np.nan)
+    if n > day:
+        change[day:] = (close[day:] / close[:-day] - 1.0) * 100.0
+
+    long_cond = (rsi < 30) | ((ma5 > ma20) & (change > 0))
+    short_cond = (rsi > 70) | ((ma5 < ma20) & (change < 0))
+    side = np.where(long_cond, 1, np.where(short_cond, -1, np.where(change >= 0, 1, -1)))
+
+    market = np.abs(change) > 2
+    entry = np.where(market, close, np.where(side == 1, np.minimum(close, ma5), np.maximum(close, ma5)))
+    tp_pct = np.maximum(1.0, np.abs(change))
+    # signal_analyzer đặt SL = entry * 1.005 cho cả 2 chiều; ở đây SL luôn ngược chiều lệnh 0.5%
+    sl_pct = np.full(n, 0.5)
+
+    strength = np.clip((np.abs(np.nan_to_num(change)) * 10).astype(np.int64), 1, 100)
+    boost = ((side == 1) & (rsi < 25)) | ((side == -1) & (rsi > 75))
+    strength = np.minimum(100, strength + 30 * boost)
+
+    valid = ~np.isnan(rsi) & ~np.isnan(ma20) & ~np.isnan(change)
+    return {
+        "side": np.where(valid, side, 0),
+        "strength": np.where(valid, strength, 0),
+        "entry": entry,
+        "tp_pct": tp_pct,
+        "sl_pct": sl_pct,
+        "limit": ~market,
+    }
+
+
+_SIGNALS = {
+    "analyze_coin": signals_analyze_coin,
+    "analyze_coin_signal": signals_analyze_coin_signal,
+}
+
+
+# =============================
+# Mô phỏng lệnh
+# =============================
+def _first_true(mask_fn, start: int, stop: int, chunk: int = 256) -> int:
+    """Index đầu tiên trong [start, stop) mà mask đúng; -1 nếu không có. Quét theo khối tăng dần."""
+    i = start
+    while i < stop:
+        j = min(stop, i + chunk)
+        m = mask_fn(i, j)
+        if m.any():
+            return i + int(np.argmax(m))
+        i = j
+        chunk *= 2
+    return -1
+
+
+def simulate(arr: Dict[str, np.ndarray], sig: Dict[str, np.ndarray], params: BacktestParams) -> List[dict]:
+    high, low, close, times = arr["high"], arr["low"], arr["close"], arr["open_time"]
+    n = close.size
+    side, strength = sig["side"], sig["strength"]
+    candidates = np.flatnonzero((side != 0) & (strength >= params.min_strength))
+    candidates = candidates[candidates >= params.warmup_bars]
+    fee = 2 * params.fee_pct
+
+    trades = []
+    next_free = 0
+    for i in candidates:
+        if i < next_free or i + 1 >= n:
+            continue
+        d = int(side[i])
+        entry = float(sig["entry"][i])
+        entry_bar = i
+
+        if sig["limit"][i]:
+            stop = min(n, i + 1 + params.limit_fill_bars)
+            fill = _first_true((lambda a, b: low[a:b] <= entry) if d == 1 else (lambda a, b: high[a:b] >= entry),
+                               i + 1, stop)
+            if fill < 0:
+                continue
+            entry_bar = fill
+
+        tp = entry * (1 + d * sig["tp_pct"][i] / 100)
+        sl = entry * (1 - d * sig["sl_pct"][i] / 100)
+        stop = n if not params.max_hold_bars else min(n, entry_bar + 1 + params.max_hold_bars)
+        if d == 1:
+            hit = _first_true(lambda a, b: (high[a:b] >= tp) | (low[a:b] <= sl), entry_bar + 1, stop)
+        else:
+            hit = _first_true(lambda a, b: (low[a:b] <= tp) | (high[a:b] >= sl), entry_bar + 1, stop)
+
+        if hit >= 0:
+            # Cùng nến chạm cả TP và SL -> coi như SL (thận trọng)
+            sl_hit = low[hit] <= sl if d == 1 else high[hit] >= sl
+            exit_price, reason, exit_bar = (sl, "SL", hit) if sl_hit else (tp, "TP", hit)
+        else:
+            exit_bar = stop - 1
+            exit_price, reason = float(close[exit_bar]), ("TIME" if params.max_hold_bars else "OPEN")
+
+        pnl = d * (exit_price / entry - 1) * 100 - fee
+        trades.append({
+            "entry_time": int(times[entry_bar]), "exit_time": int(times[exit_bar]),
+            "side": "LONG" if d == 1 else "SHORT", "strength": int(strength[i]),
+            "entry": entry, "exit": float(exit_price), "reason": reason, "pnl_pct": float(pnl),
+        })
+        next_free = exit_bar + 1
+    return trades
+
+
+# =============================
+# Thống kê
+# =============================
+def summarize(trades: List[dict]) -> dict:
+    if not trades:
+        return {"trades": 0, "win_rate": 0.0, "pnl_pct": 0.0, "avg_pnl_pct": 0.0, "max_drawdown_pct": 0.0}
+    pnl = np.array([t["pnl_pct"] for t in trades])
+    equity = np.cumsum(pnl)
+    drawdown = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:] - equity
+    return {
+        "trades": int(pnl.size),
+        "win_rate": round(float((pnl > 0).mean() * 100), 2),
+        "pnl_pct": round(float(pnl.sum()), 4),
+        "avg_pnl_pct": round(float(pnl.mean()), 4),
+        "max_drawdown_pct": round(float(drawdown.max()), 4),
+        "long": int(sum(t["side"] == "LONG" for t in trades)),
+        "short": int(sum(t["side"] == "SHORT" for t in trades)),
+    }
+
+
+def backtest_arrays(arr: Dict[str, np.ndarray], params: BacktestParams) -> dict:
+    if params.strategy not in _SIGNALS:
+        raise ValueError(f"unknown strategy {params.strategy!r}, expected one of {STRATEGIES}")
+    sig = _SIGNALS[params.strategy](arr, params)
+    trades = simulate(arr, sig, params)
+    return {"bars": int(arr["close"].size), "trades": trades, "stats": summarize(trades)}
+
+
+def _backtest_job(args) -> tuple:
+    symbol, source, params = args
+    params = BacktestParams(**params)
+    # source: list file, hoặc thư mục KlineStore (str)
+    arr = load_store(source, symbol, params.interval) if isinstance(source, str) else load_symbol(source)
+    return symbol, backtest_arrays(arr, params)
+
+
+def run_backtest(data_dir: str, params: BacktestParams, symbols: Optional[List[str]] = None,
+                 workers: Optional[int] = None, keep_trades: bool = False,
+                 store_dir: Optional[str] = None) -> dict:
+    """Backtest mọi symbol có file trong data_dir, hoặc có nến trong store_dir (song song theo process)."""
+    if store_dir:
+        sources = {s: store_dir for s in KlineStore(store_dir).symbols(params.interval)}
+    else:
+        sources = discover_files(data_dir, params.interval)
+    if symbols:
+        wanted = {s.upper() for s in symbols}
+        sources = {s: p for s, p in sources.items() if s in wanted}
+    jobs = [(s, p, asdict(params)) for s, p in sources.items()]
+
+    per_symbol: Dict[str, dict] = {}
+    all_trades: List[dict] = []
+    workers = min(workers or os.cpu_count() or 1, max(1, len(jobs)))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        results = pool.map(_backtest_job, jobs) if pool else map(_backtest_job, jobs)
+        for symbol, res in results:
+            per_symbol[symbol] = {"bars": res["bars"], **res["stats"]}
+            all_trades.extend(dict(t, symbol=symbol) for t in res["trades"])
+    finally:
+        if pool:
+            pool.shutdown()
+
+    all_trades.sort(key=lambda t: t["exit_time"])
+    report = {"params": asdict(params), "total": summarize(all_trades), "per_symbol": per_symbol}
+    if keep_trades:
+        report["trades"] = all_trades
+    return report
@@ -0,0 +1,95 @@
+# autiner_bot/backtest/loader.py
+"""
+Đọc nến lịch sử từ file local cho backtest.
+- CSV kiểu data.binance.vision (có hoặc không header): open_time,open,high,low,close,volume,...
+- JSON: list nến y như REST /fapi/v1/klines.
+- Tên file bắt đầu bằng SYMBOL-INTERVAL (vd: BTCUSDT-1m-2024-01.csv) hoặc nằm trong thư mục SYMBOL/.
+- Hoặc đọc thẳng từ kho nến trên đĩa của bot (KlineStore, memmap, không copy).
+"""
+
+from typing import Dict, List
+import json
+import os
+import re
+
+import numpy as np
+
+from autiner_bot.data_sources.kline_store import KlineStore
+
+COLUMNS = ("open_time", "open", "high", "low", "close", "volume")
+
+_NAME_RE = re.compile(r"^([A-Z0-9]+)-(\d+[mhdwM])")
+
+
+def _empty() -> Dict[str, np.ndarray]:
+    out = {c: np.empty(0) for c in COLUMNS}
+    out["open_time"] = np.empty(0, dtype=np.int64)
+    return out
+
+
+def _from_matrix(raw: np.ndarray) -> Dict[str, np.ndarray]:
+    if raw.size == 0:
+        return _empty()
+    raw = np.atleast_2d(raw)
+    out = {c: raw[:, i].astype(np.float64) for i, c in enumerate(COLUMNS)}
+    out["open_time"] = raw[:, 0].astype(np.int64)
+    return out
+
+
+def load_klines_file(path: str) -> Dict[str, np.ndarray]:
+    """1 file -> dict cột (open_time int64 ms, còn lại float64)."""
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not data:
+            return _empty()
+        return _from_matrix(np.asarray([row[:6] for row in data], dtype=np.float64))
+
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.readline()
+    skip = 0 if first[:1].isdigit() else 1  # có header thì bỏ dòng đầu
+    raw = np.loadtxt(path, delimiter=",", skiprows=skip, usecols=range(6), dtype=np.float64, ndmin=2)
+    out = _from_matrix(raw)
+    # Một số file spot mới dùng microsecond
+    if out["open_time"].size and out["open_time"][0] > 10**14:
+        out["open_time"] = out["open_time"] // 1000
+    return out
+
+
+def concat_klines(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Nối nhiều file, sắp theo open_time, bỏ nến trùng."""
+    parts = [p for p in parts if p["open_time"].size]
+    if not parts:
+        return _empty()
+    merged = {c: np.concatenate([p[c] for p in parts]) for c in COLUMNS}
+    _, idx = np.unique(merged["open_time"], return_index=True)
+    return {c: merged[c][idx] for c in COLUMNS}
+
+
+def discover_files(data_dir: str, interval: str) -> Dict[str, List[str]]:
+    """Tìm file nến theo symbol cho 1 interval."""
+    found: Dict[str, List[str]] = {}
+    for root, _, files in os.walk(data_dir):
+        for name in files:
+            if not name.endswith((".csv", ".json")):
+                continue
+            m = _NAME_RE.match(name)
+            if m:
+                symbol, itv = m.group(1), m.group(2)
+            else:
+                # data/BTCUSDT/1m.csv
+                symbol, itv = os.path.basename(root).upper(), os.path.splitext(name)[0]
+            if itv != interval:
+                continue
+            found.setdefault(symbol, []).append(os.path.join(root, name))
+    return {s: sorted(p) for s, p in sorted(found.items())}
+
+
+def load_symbol(paths: List[str]) -> Dict[str, np.ndarray]:
+    return concat_klines([load_klines_file(p) for p in paths])
+
+
+def load_store(root: str, symbol: str, interval: str) -> Dict[str, np.ndarray]:
+    """Các cột COLUMNS của 1 symbol trong KlineStore (view memmap)."""
+    cols = KlineStore(root).read(symbol, interval)
+    return {c: cols[c] for c in COLUMNS}
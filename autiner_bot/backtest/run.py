@@ -0,0 +1,80 @@
+# autiner_bot/backtest/run.py
+"""
+Chạy backtest từ dòng lệnh:
+    python -m autiner_bot.backtest.run --data ./data --strategy analyze_coin --interval 15m
+    python -m autiner_bot.backtest.run --store data/klines --interval 15m      # kho nến của bot
+    python -m autiner_bot.backtest.run --data ./data --import-to data/klines    # nạp file vào kho
+"""
+
+import argparse
+import json
+import time
+
+from autiner_bot.backtest.engine import STRATEGIES, BacktestParams, run_backtest
+from autiner_bot.backtest.loader import discover_files, load_symbol
+from autiner_bot.data_sources.kline_store import KlineStore
+
+
+def _print_report(report: dict, elapsed: float) -> None:
+    p, total = report["params"], report["total"]
+    print(f"== Backtest {p['strategy']} @ {p['interval']} (strength >= {p['min_strength']}, "
+          f"fee {p['fee_pct']}%/chiều) — {elapsed:.2f}s")
+    print(f"{'SYMBOL':<14}{'BARS':>9}{'TRADES':>8}{'WIN%':>8}{'PNL%':>10}{'MAXDD%':>9}")
+    for sym, st in sorted(report["per_symbol"].items(), key=lambda kv: -kv[1]["pnl_pct"]):
+        print(f"{sym:<14}{st['bars']:>9}{st['trades']:>8}{st['win_rate']:>8.2f}"
+              f"{st['pnl_pct']:>10.2f}{st['max_drawdown_pct']:>9.2f}")
+    print(f"{'TOTAL':<14}{'':>9}{total['trades']:>8}{total['win_rate']:>8.2f}"
+          f"{total['pnl_pct']:>10.2f}{total['max_drawdown_pct']:>9.2f}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Backtest offline chiến lược Autiner trên nến lịch sử local")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--data", help="thư mục chứa file nến (csv/json)")
+    src.add_argument("--store", help="thư mục KlineStore (KLINE_STORE_DIR)")
+    ap.add_argument("--strategy", choices=STRATEGIES, default="analyze_coin")
+    ap.add_argument("--interval", default="15m")
+    ap.add_argument("--symbols", default="", help="vd: BTCUSDT,ETHUSDT (mặc định: tất cả)")
+    ap.add_argument("--min-strength", type=int, default=BacktestParams.min_strength)
+    ap.add_argument("--fee", type=float, default=BacktestParams.fee_pct, help="phí mỗi chiều (%%)")
+    ap.add_argument("--max-hold", type=int, default=BacktestParams.max_hold_bars, help="số nến giữ lệnh tối đa")
+    ap.add_argument("--workers", type=int, default=0, help="số process (0 = số CPU)")
+    ap.add_argument("--json", dest="json_out", default="", help="ghi báo cáo đầy đủ (kèm lệnh) ra file JSON")
+    ap.add_argument("--import-to", default="", help="chỉ nạp file nến từ --data vào KlineStore này rồi thoát")
+    args = ap.parse_args(argv)
+
+    if args.import_to:
+        if not args.data:
+            ap.error("--import-to cần --data")
+        store = KlineStore(args.import_to)
+        for sym, paths in discover_files(args.data, args.interval).items():
+            n = store.append_columns(sym, args.interval, load_symbol(paths))
+            print(f"{sym}: +{n} nến (tổng {store.length(sym, args.interval)})")
+        return 0
+
+    params = BacktestParams(
+        strategy=args.strategy,
+        interval=args.interval,
+        min_strength=args.min_strength,
+        fee_pct=args.fee,
+        max_hold_bars=args.max_hold,
+    )
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()] or None
+
+    t0 = time.perf_counter()
+    report = run_backtest(args.data, params, symbols=symbols, workers=args.workers or None,
+                          keep_trades=bool(args.json_out), store_dir=args.store)
+    elapsed = time.perf_counter() - t0
+
+    if not report["per_symbol"]:
+        print(f"[ERROR] không tìm thấy nến {args.interval} trong {args.data or args.store}")
+        return 1
+    _print_report(report, elapsed)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
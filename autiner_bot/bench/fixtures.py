@@ -0,0 +1,178 @@
+# autiner_bot/bench/fixtures.py
+"""
+Dữ liệu cho stub server của benchmark.
+- generate(): bộ dữ liệu tổng hợp, cố định theo seed (chạy offline, kết quả lặp lại được).
+- record(): ghi lại response thật của Binance (ticker 24h, nến top-N, P2P, vài giây websocket) ra thư mục JSON.
+- load(): đọc lại thư mục đã record.
+Nến lưu theo open time tương đối (bar cuối = 0); stub dời về thời điểm hiện tại khi phục vụ.
+Frame websocket (combined stream: !ticker@arr, <symbol>@kline_<itv>) lưu theo dạng Binance gửi,
+open time nến cũng tương đối theo nến đang chạy (ws_stub dời lại khi replay).
+"""
+
+from typing import Dict, List, Optional
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+# Symbol cố định đứng đầu để benchmark tra cứu luôn có dữ liệu
+CORE_SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "OPUSDT", "1000SHIBUSDT", "BTCDOMUSDT"]
+
+
+class Fixtures:
+    __slots__ = ("tickers", "klines", "p2p", "interval", "ws")
+
+    def __init__(self, tickers: List[dict], klines: Dict[str, list], p2p: List[dict], interval: str = "15m",
+                 ws: Optional[List[dict]] = None):
+        self.tickers = tickers        # REST /fapi/v1/ticker/24hr (chuỗi số như Binance)
+        self.klines = klines          # symbol -> list nến REST, open time tương đối (ms, bar cuối = 0)
+        self.p2p = p2p                # data[] của P2P adv/search
+        self.interval = interval
+        self.ws = ws or []            # frame combined stream theo thứ tự nhận
+
+
+def ticker_event(t: dict) -> dict:
+    """1 dòng REST ticker/24hr -> event 24hrTicker của websocket (key rút gọn)."""
+    return {"e": "24hrTicker", "E": 0, "s": t["symbol"], "p": t["priceChange"], "P": t["priceChangePercent"],
+            "w": t["weightedAvgPrice"], "c": t["lastPrice"], "Q": t["lastQty"], "o": t["openPrice"],
+            "h": t["highPrice"], "l": t["lowPrice"], "v": t["volume"], "q": t["quoteVolume"],
+            "O": t["openTime"], "C": t["closeTime"], "F": t["firstId"], "L": t["lastId"], "n": t["count"]}
+
+
+def kline_event(symbol: str, interval: str, row: list, closed: bool = False) -> dict:
+    """1 dòng nến REST -> event kline của websocket."""
+    return {"e": "kline", "E": 0, "s": symbol, "k": {
+        "t": row[0], "T": row[6], "s": symbol, "i": interval, "o": row[1], "c": row[4], "h": row[2],
+        "l": row[3], "v": row[5], "n": row[8], "x": closed, "q": row[7], "V": row[9], "Q": row[10]}}
+
+
+def frames_from_fixtures(tickers: List[dict], klines: Dict[str, list], interval: str, updates: int = 3) -> List[dict]:
+    """Frame giả lập: mỗi lượt 1 !ticker@arr + 1 update nến đang chạy cho mỗi symbol có nến."""
+    frames = []
+    for u in range(updates):
+        frames.append({"stream": "!ticker@arr", "data": [ticker_event(t) for t in tickers]})
+        for sym, rows in klines.items():
+            row = list(rows[-1])
+            row[4] = f"{float(row[4]) * (1 + 0.001 * (u + 1)):.6f}"   # giá nến đang chạy nhích dần
+            frames.append({"stream": f"{sym.lower()}@kline_{interval}", "data": kline_event(sym, interval, row)})
+    return frames
+
+
+def generate(n_symbols: int = 300, bars: int = 500, seed: int = 7, interval_ms: int = 900_000) -> Fixtures:
+    rng = np.random.default_rng(seed)
+    symbols = CORE_SYMBOLS + [f"C{i:03d}USDT" for i in range(max(0, n_symbols - len(CORE_SYMBOLS)))]
+    tickers, klines = [], {}
+    for rank, sym in enumerate(symbols):
+        close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.004, bars)))
+        opens = np.r_[close[0], close[:-1]]
+        high = np.maximum(opens, close) * (1 + np.abs(rng.normal(0, 0.002, bars)))
+        low = np.minimum(opens, close) * (1 - np.abs(rng.normal(0, 0.002, bars)))
+        vol = rng.uniform(100, 1000, bars)
+        t = (np.arange(bars) - (bars - 1)) * interval_ms
+        klines[sym] = [
+            [int(t[i]), f"{opens[i]:.6f}", f"{high[i]:.6f}", f"{low[i]:.6f}", f"{close[i]:.6f}",
+             f"{vol[i]:.3f}", int(t[i]) + interval_ms - 1, f"{vol[i] * close[i]:.3f}", 100,
+             f"{vol[i] / 2:.3f}", f"{vol[i] * close[i] / 2:.3f}", "0"]
+            for i in range(bars)
+        ]
+        change = (close[-1] / close[-96] - 1) * 100 if bars > 96 else 0.0
+        tickers.append({
+            "symbol": sym, "priceChange": f"{close[-1] - close[0]:.6f}", "priceChangePercent": f"{change:.3f}",
+            "weightedAvgPrice": f"{close.mean():.6f}", "lastPrice": f"{close[-1]:.6f}", "lastQty": "1",
+            "openPrice": f"{close[0]:.6f}", "highPrice": f"{high.max():.6f}", "lowPrice": f"{low.min():.6f}",
+            "volume": f"{vol.sum():.3f}", "quoteVolume": f"{1e9 / (rank + 1):.2f}",
+            "openTime": 0, "closeTime": 0, "firstId": 1, "lastId": 2, "count": 1000,
+        })
+    p2p = [{"adv": {"price": f"{25_400 + 5 * i}", "tradableQuantity": f"{1000 + 100 * i}"}} for i in range(20)]
+    ws = frames_from_fixtures(tickers, {s: klines[s] for s in CORE_SYMBOLS if s in klines}, "15m")
+    return Fixtures(tickers, klines, p2p, ws=ws)
+
+
+def load(path: str) -> Fixtures:
+    with open(os.path.join(path, "ticker_24hr.json"), "r", encoding="utf-8") as f:
+        tickers = json.load(f)
+    with open(os.path.join(path, "p2p.json"), "r", encoding="utf-8") as f:
+        p2p = json.load(f)
+    klines = {}
+    kdir = os.path.join(path, "klines")
+    interval = "15m"
+    for name in sorted(os.listdir(kdir)):
+        sym, interval = os.path.splitext(name)[0].split("-", 1)
+        with open(os.path.join(kdir, name), "r", encoding="utf-8") as f:
+            klines[sym] = json.load(f)
+    ws = []
+    ws_path = os.path.join(path, "ws.jsonl")
+    if os.path.exists(ws_path):
+        with open(ws_path, "r", encoding="utf-8") as f:
+            ws = [json.loads(line) for line in f if line.strip()]
+    return Fixtures(tickers, klines, p2p, interval, ws)
+
+
+async def _record_ws(symbols: List[str], interval: str, seconds: float) -> List[dict]:
+    """Ghi frame thật của combined stream trong `seconds` giây (open time nến đổi sang tương đối)."""
+    from autiner_bot.settings import S
+    from autiner_bot.data_sources import http_client
+    from autiner_bot.data_sources.binance_ws import TICKER_STREAM, kline_stream
+    from autiner_bot.data_sources.kline_cache import interval_ms
+
+    step = interval_ms(interval)
+    streams = [TICKER_STREAM] + [kline_stream(s, interval) for s in symbols]
+    url = f"{S.BINANCE_WS_URL.rstrip('/')}/stream?streams={'/'.join(streams)}"
+    frames = []
+    session = await http_client.get_session()
+    async with session.ws_connect(url, heartbeat=30) as ws:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + seconds
+        while (left := deadline - loop.time()) > 0:
+            try:
+                msg = await ws.receive_json(timeout=left)
+            except asyncio.TimeoutError:
+                break
+            k = (msg.get("data") or {}).get("k") if isinstance(msg.get("data"), dict) else None
+            if k:
+                now_open = int(time.time() * 1000) // step * step
+                k["t"], k["T"] = k["t"] - now_open, k["T"] - now_open
+            frames.append(msg)
+    return frames
+
+
+async def record(path: str, top_n: int = 50, interval: str = "15m", limit: int = 500,
+                 symbols: Optional[List[str]] = None, ws_seconds: float = 10.0) -> Fixtures:
+    """Ghi response thật (cần mạng). Open time được đổi sang tương đối."""
+    from autiner_bot.data_sources import http_client
+    from autiner_bot.data_sources.binance import BINANCE_FUTURES_URL, _fetch_p2p_ads
+
+    base = BINANCE_FUTURES_URL
+    tickers = await http_client.get_json(f"{base}/fapi/v1/ticker/24hr")
+    if not symbols:
+        usdt = [t for t in tickers if t.get("symbol", "").endswith("USDT")]
+        usdt.sort(key=lambda t: float(t.get("quoteVolume") or 0), reverse=True)
+        symbols = [t["symbol"] for t in usdt[:top_n]]
+
+    sem = asyncio.Semaphore(5)
+
+    async def _one(sym: str):
+        async with sem:
+            rows = await http_client.get_json(f"{base}/fapi/v1/klines",
+                                              {"symbol": sym, "interval": interval, "limit": limit})
+        last = int(rows[-1][0]) if rows else 0
+        return sym, [[int(r[0]) - last, *r[1:6], int(r[6]) - last, *r[7:]] for r in rows]
+
+    klines = dict(await asyncio.gather(*(_one(s) for s in symbols)))
+    p2p = await _fetch_p2p_ads()
+    ws = await _record_ws(symbols[:10], interval, ws_seconds) if ws_seconds > 0 else []
+    await http_client.close_http_session()
+
+    os.makedirs(os.path.join(path, "klines"), exist_ok=True)
+    with open(os.path.join(path, "ticker_24hr.json"), "w", encoding="utf-8") as f:
+        json.dump(tickers, f)
+    with open(os.path.join(path, "p2p.json"), "w", encoding="utf-8") as f:
+        json.dump(p2p, f)
+    for sym, rows in klines.items():
+        with open(os.path.join(path, "klines", f"{sym}-{interval}.json"), "w", encoding="utf-8") as f:
+            json.dump(rows, f)
+    with open(os.path.join(path, "ws.jsonl"), "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(m) + "\n" for m in ws)
+    return Fixtures(tickers, klines, p2p, interval, ws)
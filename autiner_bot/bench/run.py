@@ -0,0 +1,244 @@
+# autiner_bot/bench/run.py
+"""
+Benchmark đường dữ liệu / tín hiệu với stub Binance local (không gọi mạng thật):
+    python -m autiner_bot.bench.run                                  # dữ liệu tổng hợp
+    python -m autiner_bot.bench.run --fixtures bench_fx              # dữ liệu đã record
+    python -m autiner_bot.bench.run --record bench_fx                # record từ Binance thật rồi thoát
+    python -m autiner_bot.bench.run --save-baseline bench.json
+    python -m autiner_bot.bench.run --compare bench.json --threshold 0.25   # exit 1 nếu chậm đi
+Báo cáo mỗi case: số lần chạy, throughput (ops/s), p50/p95/p99 (µs).
+"""
+
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+import argparse
+import asyncio
+import gc
+import json
+import sys
+import time
+
+import numpy as np
+
+from autiner_bot.settings import S
+from autiner_bot.bench import fixtures as fx_mod
+from autiner_bot.bench.stub_server import StubServer
+from autiner_bot.data_sources import binance, http_client
+from autiner_bot.data_sources.kline_cache import KLINES
+from autiner_bot.data_sources.models import KlineSeries
+from autiner_bot.data_sources.rate_limiter import WeightLimiter
+from autiner_bot.data_sources.symbol_index import get_symbol_index
+from autiner_bot.strategies import signal_analyzer
+from autiner_bot.utils import state
+from autiner_bot import menu
+
+BENCH_USERS = 64   # số user id xoay vòng của case text_handler (state của họ nằm sẵn trong LRU)
+
+
+@dataclass
+class Case:
+    name: str
+    fn: Callable                     # sync: fn(i); async: await fn(i)
+    is_async: bool = False
+    setup: Optional[Callable[[], None]] = None   # chạy trước mỗi lần đo (không tính giờ)
+
+
+def _summary(samples_ns: List[int], total_s: float) -> dict:
+    a = np.asarray(samples_ns, dtype=np.float64) / 1000.0   # µs
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    return {
+        "n": int(a.size),
+        "ops_per_s": round(a.size / total_s, 1) if total_s else 0.0,
+        "mean_us": round(float(a.mean()), 2),
+        "p50_us": round(float(p50), 2),
+        "p95_us": round(float(p95), 2),
+        "p99_us": round(float(p99), 2),
+    }
+
+
+async def _measure(case: Case, iterations: int, warmup: int) -> dict:
+    for i in range(warmup):
+        if case.setup:
+            case.setup()
+        r = case.fn(i)
+        if case.is_async:
+            await r
+    samples = []
+    gc_was = gc.isenabled()
+    gc.disable()
+    try:
+        total = 0.0
+        for i in range(iterations):
+            if case.setup:
+                case.setup()
+            t0 = time.perf_counter_ns()
+            r = case.fn(i)
+            if case.is_async:
+                await r
+            dt = time.perf_counter_ns() - t0
+            samples.append(dt)
+            total += dt / 1e9
+    finally:
+        if gc_was:
+            gc.enable()
+    return _summary(samples, total)
+
+
+# =============================
+# Các case
+# =============================
+class _Message:
+    __slots__ = ("text", "replies")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.replies: List[str] = []
+
+    async def reply_text(self, text: str, **kwargs) -> None:
+        self.replies.append(text)
+
+
+def _fake_update(text: str, user_id: int):
+    return SimpleNamespace(message=_Message(text), effective_user=SimpleNamespace(id=user_id),
+                           effective_chat=SimpleNamespace(id=user_id))
+
+
+def build_cases(fx: fx_mod.Fixtures) -> List[Case]:
+    symbols = list(fx.klines)
+    series = {s: KlineSeries.from_rows(rows[-200:]) for s, rows in list(fx.klines.items())[:50]}
+    series_list = list(series.values())
+    series_symbols = list(series)
+    closes = [s.close.tolist() for s in series_list]
+    queries = ["op", " btc / usdt ", "eth-usdc", "1000shib", "sol_usd", "bnb", "btcdom", "xyz", "c01", "C123"]
+    bases = [menu._clean_symbol(q).replace("USDT", "") for q in queries]
+    coins = [{"symbol": s, "lastPrice": 100.0, "change_pct": 2.5 - (i % 5)} for i, s in enumerate(symbols[:50])]
+    texts = ["btc", "eth", "op", "sol", "bnb", "1000shib"]
+
+    def _cold():
+        KLINES.clear()
+        binance.ANALYSES.clear()
+        binance.TICKERS.data = []
+        binance.TICKERS.updated_at = 0.0
+
+    async def _text(i: int):
+        await menu.text_handler(_fake_update(texts[i % len(texts)], 1_000_000 + i % BENCH_USERS), None)
+
+    return [
+        Case("clean_symbol", lambda i: menu._clean_symbol(queries[i % len(queries)])),
+        Case("resolve_symbol", lambda i: get_symbol_index(binance.TICKERS.data).resolve(bases[i % len(bases)])),
+        Case("calculate_indicators", lambda i: binance.calculate_indicators(
+            series_list[i % len(series_list)], series_symbols[i % len(series_symbols)])),
+        Case("calculate_rsi", lambda i: signal_analyzer.calculate_rsi(closes[i % len(closes)], 14)),
+        Case("analyze_coin_signal", lambda i: signal_analyzer.analyze_coin_signal(coins[i % len(coins)]), True),
+        Case("text_handler_warm", _text, True),
+        Case("text_handler_cold", _text, True, setup=_cold),
+    ]
+
+
+# =============================
+# So sánh baseline
+# =============================
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Tên các case có p50 hoặc p95 tệ hơn baseline quá threshold (0.25 = 25%)."""
+    regressions = []
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in ("p50_us", "p95_us"):
+            if base[key] > 0 and cur[key] > base[key] * (1 + threshold):
+                regressions.append(name)
+                break
+    return regressions
+
+
+def _print_table(results: Dict[str, dict], baseline: Optional[Dict[str, dict]], regressions: List[str]) -> None:
+    print(f"{'CASE':<22}{'N':>7}{'OPS/S':>12}{'P50 µs':>11}{'P95 µs':>11}{'P99 µs':>11}{'Δp50':>9}")
+    for name, r in results.items():
+        delta = ""
+        if baseline and name in baseline and baseline[name]["p50_us"]:
+            delta = f"{(r['p50_us'] / baseline[name]['p50_us'] - 1) * 100:+.0f}%"
+        flag = "  <-- REGRESSION" if name in regressions else ""
+        print(f"{name:<22}{r['n']:>7}{r['ops_per_s']:>12,.1f}{r['p50_us']:>11,.1f}{r['p95_us']:>11,.1f}"
+              f"{r['p99_us']:>11,.1f}{delta:>9}{flag}")
+
+
+# =============================
+# Main
+# =============================
+async def run(fx: fx_mod.Fixtures, iterations: int, warmup: int, only: Optional[List[str]] = None) -> Dict[str, dict]:
+    stub = await StubServer(fx).start()
+    # Trỏ mọi nguồn dữ liệu về stub; tắt kho đĩa + SQLite state, weight limiter không giới hạn,
+    # không giãn cách user
+    saved = (binance.BINANCE_FUTURES_URL, binance.BINANCE_P2P_URL, binance.LIMITER, KLINES.store,
+             S.USER_MIN_INTERVAL, state.STATE)
+    binance.BINANCE_FUTURES_URL = stub.base_url
+    binance.BINANCE_P2P_URL = f"{stub.base_url}/p2p"
+    binance.LIMITER = WeightLimiter(10**9)
+    KLINES.store = None
+    S.USER_MIN_INTERVAL = 0
+    state.STATE = state.StateStore(path="")
+    try:
+        await http_client.init_http_session()
+        await binance.TICKERS.refresh()
+        results = {}
+        for case in build_cases(fx):
+            if only and case.name not in only:
+                continue
+            results[case.name] = await _measure(case, iterations, warmup)
+        results["_stub_requests"] = dict(stub.requests)
+        return results
+    finally:
+        (binance.BINANCE_FUTURES_URL, binance.BINANCE_P2P_URL, binance.LIMITER, KLINES.store,
+         S.USER_MIN_INTERVAL, state.STATE) = saved
+        await http_client.close_http_session()
+        await stub.stop()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark Autiner trên stub Binance local")
+    ap.add_argument("--fixtures", default="", help="thư mục fixtures đã record (mặc định: dữ liệu tổng hợp)")
+    ap.add_argument("--record", default="", help="record fixtures từ Binance thật vào thư mục này rồi thoát")
+    ap.add_argument("--symbols", type=int, default=300, help="số symbol của dữ liệu tổng hợp")
+    ap.add_argument("--iterations", type=int, default=300)
+    ap.add_argument("--warmup", type=int, default=20)
+    ap.add_argument("--cases", default="", help="vd: calculate_rsi,text_handler_warm (mặc định: tất cả)")
+    ap.add_argument("--save-baseline", default="", help="ghi kết quả làm baseline (JSON)")
+    ap.add_argument("--compare", default="", help="so với baseline JSON, exit 1 nếu chậm hơn ngưỡng")
+    ap.add_argument("--threshold", type=float, default=0.25, help="ngưỡng chậm hơn cho phép (0.25 = 25%%)")
+    args = ap.parse_args(argv)
+
+    if args.record:
+        fx = asyncio.run(fx_mod.record(args.record))
+        print(f"recorded {len(fx.tickers)} tickers, {len(fx.klines)} kline series -> {args.record}")
+        return 0
+
+    fx = fx_mod.load(args.fixtures) if args.fixtures else fx_mod.generate(n_symbols=args.symbols)
+    only = [c.strip() for c in args.cases.split(",") if c.strip()] or None
+    results = asyncio.run(run(fx, args.iterations, args.warmup, only))
+    stub_requests = results.pop("_stub_requests")
+
+    baseline = None
+    regressions: List[str] = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+
+    print(f"== Autiner bench: {len(fx.tickers)} tickers, {len(fx.klines)} kline series, "
+          f"{args.iterations} lần/case, python {sys.version.split()[0]}")
+    _print_table(results, baseline, regressions)
+    print(f"stub requests: {stub_requests}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"created": int(time.time()), "iterations": args.iterations, "results": results}, f, indent=2)
+    if regressions:
+        print(f"[ERROR] chậm hơn baseline > {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+# autiner_bot/bench/stub_server.py
+"""
+Stub HTTP giả lập Binance Futures / P2P cho benchmark, phục vụ từ Fixtures.
+- /fapi/v1/ticker/24hr, /fapi/v1/klines (symbol, limit, startTime), /fapi/v1/ping
+- POST /p2p (adv/search)
+- Nến được dời open time sao cho bar cuối là nến đang chạy ở thời điểm phục vụ.
+"""
+
+from typing import Dict, Optional
+import socket
+import time
+
+from aiohttp import web
+
+from autiner_bot.bench.fixtures import Fixtures
+from autiner_bot.data_sources.kline_cache import interval_ms
+
+
+class StubServer:
+    def __init__(self, fixtures: Fixtures, host: str = "127.0.0.1", port: int = 0):
+        self.fx = fixtures
+        self.host = host
+        self.port = port
+        self.requests: Dict[str, int] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _count(self, name: str) -> None:
+        self.requests[name] = self.requests.get(name, 0) + 1
+
+    async def _ticker(self, request: web.Request) -> web.Response:
+        self._count("ticker_24hr")
+        return web.json_response(self.fx.tickers)
+
+    async def _klines(self, request: web.Request) -> web.Response:
+        self._count("klines")
+        q = request.query
+        rows = self.fx.klines.get(q.get("symbol", "").upper())
+        if rows is None:
+            return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400)
+        # open time tương đối theo khung của fixtures -> đổi sang khung được hỏi (bar cuối = nến đang chạy)
+        fx_step = interval_ms(self.fx.interval) or 900_000
+        step = interval_ms(q.get("interval", self.fx.interval)) or fx_step
+        now_open = int(time.time() * 1000) // step * step
+        shifted = [[r[0] // fx_step * step + now_open, *r[1:6], r[0] // fx_step * step + now_open + step - 1, *r[7:]]
+                   for r in rows]
+        if "startTime" in q:
+            start = int(q["startTime"])
+            shifted = [r for r in shifted if r[0] >= start]
+        return web.json_response(shifted[-int(q.get("limit", 500)):])
+
+    async def _ping(self, request: web.Request) -> web.Response:
+        self._count("ping")
+        return web.json_response({})
+
+    async def _p2p(self, request: web.Request) -> web.Response:
+        self._count("p2p")
+        return web.json_response({"data": self.fx.p2p, "success": True})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/fapi/v1/ticker/24hr", self._ticker)
+        app.router.add_get("/fapi/v1/klines", self._klines)
+        app.router.add_get("/fapi/v1/ping", self._ping)
+        app.router.add_post("/p2p", self._p2p)
+        return app
+
+    async def start(self) -> "StubServer":
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind((self.host, self.port))  # port 0 -> hệ điều hành chọn cổng trống
+        self.port = sock.getsockname()[1]
+        await web.SockSite(self._runner, sock).start()
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,121 @@
+# autiner_bot/bench/ws_stub.py
+"""
+Stub websocket giả lập Binance Futures combined stream, replay frame của Fixtures.ws.
+- GET /stream?streams=a/b/c -> chỉ gửi frame thuộc các stream đã đăng ký (kể cả SUBSCRIBE/UNSUBSCRIBE sau đó)
+- Open time nến được dời sao cho nến t=0 là nến đang chạy ở thời điểm gửi (giống stub REST).
+- Điều khiển cho test: reject(n) từ chối n lần bắt tay tới (HTTP 503), drop() cắt mọi kết nối.
+"""
+
+from typing import List, Optional, Set
+import asyncio
+import json
+import socket
+import time
+
+from aiohttp import WSMsgType, web
+
+from autiner_bot.bench.fixtures import Fixtures
+from autiner_bot.data_sources.kline_cache import interval_ms
+
+
+def _shift_frame(frame: dict) -> dict:
+    """Dời open/close time nến tương đối -> thời điểm hiện tại (bản sao, không sửa fixtures)."""
+    data = frame.get("data")
+    k = data.get("k") if isinstance(data, dict) else None
+    if not k:
+        return frame
+    step = interval_ms(k["i"]) or 60_000
+    now_open = int(time.time() * 1000) // step * step
+    return {**frame, "data": {**data, "k": {**k, "t": k["t"] + now_open, "T": k["T"] + now_open}}}
+
+
+class WsStubServer:
+    def __init__(self, fixtures: Fixtures, host: str = "127.0.0.1", port: int = 0, frame_delay: float = 0.0):
+        self.fx = fixtures
+        self.host = host
+        self.port = port
+        self.frame_delay = frame_delay          # giãn cách giữa 2 frame khi replay
+        self.attempts: List[float] = []         # monotonic mỗi lần bắt tay (kể cả bị từ chối)
+        self.connects = 0
+        self.frames_sent = 0
+        self.subscribe_requests = 0
+        self._reject = 0
+        self._clients: Set[web.WebSocketResponse] = set()
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+    # ---------- điều khiển ----------
+    def reject(self, n: int) -> None:
+        self._reject = n
+
+    async def drop(self) -> None:
+        for ws in list(self._clients):
+            await ws.close(code=1001, message=b"stub drop")
+
+    # ---------- handler ----------
+    async def _replay(self, ws: web.WebSocketResponse, streams: Set[str]) -> None:
+        for frame in self.fx.ws:
+            if frame.get("stream") not in streams:
+                continue
+            if ws.closed:
+                return
+            await ws.send_str(json.dumps(_shift_frame(frame)))
+            self.frames_sent += 1
+            await asyncio.sleep(self.frame_delay)
+
+    async def _stream(self, request: web.Request) -> web.StreamResponse:
+        self.attempts.append(time.monotonic())
+        if self._reject > 0:
+            self._reject -= 1
+            return web.Response(status=503, text="stub reject")
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connects += 1
+        self._clients.add(ws)
+        streams = set(filter(None, request.query.get("streams", "").split("/")))
+        replays = [asyncio.create_task(self._replay(ws, streams))]
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                req = json.loads(msg.data)
+                params = set(req.get("params") or [])
+                if req.get("method") == "SUBSCRIBE":
+                    self.subscribe_requests += 1
+                    streams |= params
+                    replays.append(asyncio.create_task(self._replay(ws, params)))
+                elif req.get("method") == "UNSUBSCRIBE":
+                    streams -= params
+                await ws.send_str(json.dumps({"result": None, "id": req.get("id")}))
+        finally:
+            for t in replays:
+                t.cancel()
+            self._clients.discard(ws)
+        return ws
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/stream", self._stream)
+        return app
+
+    async def start(self) -> "WsStubServer":
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind((self.host, self.port))  # port 0 -> hệ điều hành chọn cổng trống
+        self.port = sock.getsockname()[1]
+        await web.SockSite(self._runner, sock).start()
+        return self
+
+    async def stop(self) -> None:
+        await self.drop()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
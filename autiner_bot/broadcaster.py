@@ -0,0 +1,316 @@
+# autiner_bot/broadcaster.py
+"""
+Hàng gửi tin Telegram chủ động (cảnh báo, kết quả quét, thông báo hàng loạt).
+- Hàng ưu tiên theo chat: HIGH > NORMAL > LOW, cùng mức thì FIFO.
+- Giới hạn toàn cục (~30 tin/s, giãn đều) và theo chat (1 tin/s, nhóm 20 tin/phút).
+- Mỗi chat chỉ 1 tin đang gửi -> đúng thứ tự; nhiều tin đang chờ cùng chat được gộp thành 1
+  (nối text, tối đa 4096 ký tự) -> ít lượt gửi hơn khi bị giới hạn theo chat.
+- RetryAfter: dừng cả hàng theo thời gian Telegram yêu cầu, tin được xếp lại đầu hàng của chat.
+- Lỗi mạng thử lại có backoff; chat chặn bot / request sai thì bỏ tin.
+"""
+
+from collections import deque
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from telegram.error import BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter
+
+from autiner_bot import metrics
+
+log = logging.getLogger("autiner.broadcaster")
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+MAX_TEXT = 4096   # giới hạn độ dài 1 tin Telegram
+_SEPARATOR = "\n\n"
+
+# send(chat_id, text, **kwargs) -> vd: application.bot.send_message
+Sender = Callable[..., Awaitable[Any]]
+
+_QUEUE_SECONDS = metrics.histogram(
+    "autiner_outbox_queue_seconds", "Thời gian tin chờ trong hàng trước khi gửi (giây)",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+
+class _Message:
+    __slots__ = ("text", "kwargs", "priority", "key", "attempts", "queued_at")
+
+    def __init__(self, text: str, kwargs: dict, priority: int, key: Optional[Hashable]):
+        self.text = text
+        self.kwargs = kwargs
+        self.priority = priority
+        self.key = key
+        self.attempts = 0
+        self.queued_at = time.monotonic()
+
+
+class _Chat:
+    __slots__ = ("chat_id", "queue", "ready_at", "sending")
+
+    def __init__(self, chat_id: int):
+        self.chat_id = chat_id
+        self.queue: Deque[_Message] = deque()
+        self.ready_at = 0.0       # monotonic: lúc được gửi tin tiếp theo (bucket theo chat)
+        self.sending = False
+
+
+class Broadcaster:
+    def __init__(self, send: Sender, global_rate: float = 30.0, chat_rate: float = 1.0,
+                 group_rate: float = 20 / 60, concurrency: int = 10, max_pending: int = 10_000,
+                 max_attempts: int = 3):
+        self._send = send
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._chats: Dict[int, _Chat] = {}
+        self._ready: List[Tuple[int, int, int]] = []       # (priority, seq, chat_id)
+        self._delayed: List[Tuple[float, int, int]] = []   # (ready_at, seq, chat_id)
+        self._queued: Set[int] = set()                     # chat đang nằm trong _ready/_delayed
+        self._seq = itertools.count()
+        self._tokens = 1.0
+        self._tokens_at = time.monotonic()
+        self._paused_until = 0.0
+        self._wake = asyncio.Event()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self.pending = 0
+        self.stats: Dict[str, int] = {
+            "submitted": 0, "rejected": 0, "coalesced": 0, "replaced": 0, "sent": 0, "messages_sent": 0,
+            "retry_after": 0, "retries": 0, "dropped": 0, "forbidden": 0,
+        }
+
+    # ---------- gửi vào hàng ----------
+    def submit(self, chat_id: int, text: str, priority: int = PRIORITY_NORMAL,
+               key: Optional[Hashable] = None, **kwargs) -> bool:
+        """
+        Xếp 1 tin; False nếu hàng đầy. key: tin mới cùng key thay tin cũ còn chờ của chat
+        (vd: kết quả quét mới nhất). kwargs chuyển thẳng cho send (reply_markup, parse_mode...).
+        """
+        chat = self._chats.get(chat_id)
+        if key is not None and chat is not None:
+            for i, old in enumerate(chat.queue):
+                if old.key == key:
+                    msg = _Message(text, kwargs, min(priority, old.priority), key)
+                    msg.queued_at = old.queued_at
+                    chat.queue[i] = msg
+                    self.stats["replaced"] += 1
+                    self._schedule(chat)
+                    return True
+        if self.pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            return False
+        if chat is None:
+            if len(self._chats) >= 4 * max(1024, self.pending):
+                self._gc()
+            chat = self._chats[chat_id] = _Chat(chat_id)
+        msg = _Message(text, kwargs, priority, key)
+        # tin ưu tiên cao hơn chen lên trước tin ưu tiên thấp hơn của cùng chat
+        i = len(chat.queue)
+        while i > 0 and chat.queue[i - 1].priority > priority:
+            i -= 1
+        chat.queue.insert(i, msg)
+        self.pending += 1
+        self.stats["submitted"] += 1
+        self._schedule(chat)
+        return True
+
+    def broadcast(self, chat_ids: Iterable[int], text: str, priority: int = PRIORITY_LOW, **kwargs) -> int:
+        """Gửi cùng 1 tin cho nhiều chat; trả số chat đã xếp hàng."""
+        return sum(self.submit(c, text, priority, **kwargs) for c in chat_ids)
+
+    # ---------- lập lịch ----------
+    def _schedule(self, chat: _Chat) -> None:
+        if chat.sending or not chat.queue:
+            return
+        if chat.ready_at > time.monotonic():
+            if chat.chat_id not in self._queued:
+                heapq.heappush(self._delayed, (chat.ready_at, next(self._seq), chat.chat_id))
+        else:
+            # có thể trùng mục cũ (vd: vừa có tin ưu tiên cao hơn); mục thừa bị bỏ qua khi pop
+            heapq.heappush(self._ready, (chat.queue[0].priority, next(self._seq), chat.chat_id))
+        self._queued.add(chat.chat_id)
+        self._wake.set()
+
+    def _gc(self) -> None:
+        """Bỏ chat rảnh đã hết thời gian chờ theo chat (giữ lại thì mới giữ được giới hạn 1 tin/s)."""
+        now = time.monotonic()
+        for chat_id in [c.chat_id for c in self._chats.values()
+                        if not c.queue and not c.sending and c.ready_at <= now]:
+            del self._chats[chat_id]
+
+    def _promote(self, now: float) -> Optional[float]:
+        """Chuyển chat hết thời gian chờ sang _ready; trả thời điểm chat chờ sớm nhất tiếp theo."""
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, chat_id = heapq.heappop(self._delayed)
+            chat = self._chats.get(chat_id)
+            if chat is None or not chat.queue or chat.sending:
+                continue
+            if chat.ready_at > now:   # bị lùi thêm (backoff) sau khi xếp hàng
+                heapq.heappush(self._delayed, (chat.ready_at, next(self._seq), chat_id))
+            else:
+                heapq.heappush(self._ready, (chat.queue[0].priority, next(self._seq), chat_id))
+        return self._delayed[0][0] if self._delayed else None
+
+    def _pop_ready(self, now: float) -> Optional[_Chat]:
+        while self._ready:
+            _, _, chat_id = heapq.heappop(self._ready)
+            chat = self._chats.get(chat_id)
+            # mục thừa / chat chưa tới lượt (đã có mục trong _delayed) -> bỏ qua
+            if chat is not None and chat.queue and not chat.sending and chat_id in self._queued \
+                    and chat.ready_at <= now:
+                self._queued.discard(chat_id)
+                return chat
+        return None
+
+    def _take_global_token(self, now: float) -> float:
+        """0 nếu lấy được token toàn cục, ngược lại số giây cần chờ."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        # sức chứa 1 token: giãn đều, không dồn burst (cửa sổ 1s bất kỳ tối đa ~global_rate + 1 tin)
+        self._tokens = min(1.0, self._tokens + (now - self._tokens_at) * self.global_rate)
+        self._tokens_at = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return 0.0
+        return (1.0 - self._tokens) / self.global_rate
+
+    def _coalesce(self, chat: _Chat) -> Tuple[_Message, int]:
+        """Gộp các tin đầu hàng cùng kwargs thành 1 tin (≤ MAX_TEXT); trả (tin, số tin đã gộp)."""
+        head = chat.queue.popleft()
+        if not chat.queue:
+            return head, 1
+        parts, size, n = [head.text], len(head.text), 1
+        while chat.queue:
+            nxt = chat.queue[0]
+            if nxt.kwargs != head.kwargs or size + len(_SEPARATOR) + len(nxt.text) > MAX_TEXT:
+                break
+            chat.queue.popleft()
+            parts.append(nxt.text)
+            size += len(_SEPARATOR) + len(nxt.text)
+            n += 1
+        if n == 1:
+            return head, 1
+        msg = _Message(_SEPARATOR.join(parts), head.kwargs, head.priority, None)
+        msg.queued_at = head.queued_at
+        self.stats["coalesced"] += n - 1
+        return msg, n
+
+    # ---------- vòng gửi ----------
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            next_due = self._promote(now)
+            if not self._ready:
+                self._wake.clear()
+                timeout = None if next_due is None else max(0.0, next_due - now)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            wait = self._take_global_token(now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            await self._slots.acquire()
+            chat = self._pop_ready(time.monotonic())
+            if chat is None:
+                self._slots.release()
+                self._tokens = min(1.0, self._tokens + 1.0)   # trả lại token chưa dùng
+                continue
+            msg, n = self._coalesce(chat)
+            chat.sending = True
+            task = asyncio.get_running_loop().create_task(self._deliver(chat, msg, n))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    def _chat_interval(self, chat_id: int) -> float:
+        rate = self.group_rate if chat_id < 0 else self.chat_rate
+        return 1.0 / rate if rate > 0 else 0.0
+
+    async def _deliver(self, chat: _Chat, msg: _Message, n: int) -> None:
+        requeue = False
+        try:
+            await self._send(chat.chat_id, msg.text, **msg.kwargs)
+            self.stats["sent"] += 1
+            self.stats["messages_sent"] += n
+            _QUEUE_SECONDS.observe(time.monotonic() - msg.queued_at)
+        except RetryAfter as e:
+            ra = e.retry_after
+            ra = ra.total_seconds() if isinstance(ra, timedelta) else float(ra)
+            self.stats["retry_after"] += 1
+            # flood-wait áp cho cả bot: dừng toàn bộ hàng
+            self._paused_until = max(self._paused_until, time.monotonic() + ra)
+            log.warning("telegram RetryAfter %.1fs (chat %s)", ra, chat.chat_id)
+            requeue = True
+        except ChatMigrated as e:
+            # nhóm lên supergroup: gửi lại sang chat id mới
+            self.submit(e.new_chat_id, msg.text, msg.priority, **msg.kwargs)
+        except Forbidden:
+            self.stats["forbidden"] += 1   # bị chặn / bị kick: bỏ mọi tin của chat
+            self.stats["dropped"] += n + len(chat.queue)
+            self.pending -= len(chat.queue)
+            chat.queue.clear()
+        except BadRequest as e:
+            self.stats["dropped"] += n
+            log.warning("telegram BadRequest chat %s: %s", chat.chat_id, e)
+        except NetworkError as e:
+            msg.attempts += 1
+            if msg.attempts < self.max_attempts:
+                self.stats["retries"] += 1
+                requeue = True
+                chat.ready_at = time.monotonic() + 2.0 ** msg.attempts
+            else:
+                self.stats["dropped"] += n
+                log.warning("telegram send chat %s failed after %d attempts: %s", chat.chat_id, msg.attempts, e)
+        except Exception as e:
+            self.stats["dropped"] += n
+            log.exception("telegram send chat %s error: %s", chat.chat_id, e)
+        finally:
+            if requeue:
+                chat.queue.appendleft(msg)
+                self.pending -= n - 1
+            else:
+                self.pending -= n
+                chat.ready_at = max(chat.ready_at, time.monotonic() + self._chat_interval(chat.chat_id))
+            chat.sending = False
+            self._slots.release()
+            self._schedule(chat)
+            self._wake.set()
+
+    # ---------- start / stop ----------
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def drain(self, timeout: float = 5.0) -> bool:
+        """Chờ gửi hết hàng (tối đa timeout giây); True nếu đã hết."""
+        deadline = time.monotonic() + timeout
+        while (self.pending or self._inflight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return not self.pending and not self._inflight
+
+    async def stop(self, drain_timeout: float = 0.0) -> None:
+        if drain_timeout > 0 and self._task is not None:
+            await self.drain(drain_timeout)
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for t in list(self._inflight):
+            t.cancel()
+        await asyncio.gather(*self._inflight, return_exceptions=True)
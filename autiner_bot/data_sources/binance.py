@@ -1,17 +1,22 @@
-import requests
-import asyncio
+import aiohttp
 import time
-import numpy as np
 import traceback
 
+from autiner_bot import metrics
+from autiner_bot.data_sources import fast_json, http_client
+from autiner_bot.data_sources.kline_cache import KLINES
+from autiner_bot.data_sources.models import KlineSeries
+from autiner_bot.data_sources.singleflight import all_stats as singleflight_stats, new_group
+from autiner_bot.data_sources.ticker_snapshot import TickerSnapshot
+from autiner_bot.data_sources.p2p_rate import P2PRateProvider
+from autiner_bot.data_sources.rate_limiter import BinanceRateLimited, WeightLimiter, endpoint_weight
+from autiner_bot.settings import S
+from autiner_bot.strategies.analysis_memo import AnalysisMemo, last_closed_open_time
+from autiner_bot.strategies.indicators import IncrementalIndicators
+
 BINANCE_FUTURES_URL = "https://fapi.binance.com"
 BINANCE_P2P_URL = "https://p2p.binance.com/bapi/c2c/v2/friendly/c2c/adv/search"
 
-HTTP_HEADERS = {
-    "User-Agent": "Mozilla/5.0 (AutinerBot; +binance-futures)",
-    "Accept": "application/json",
-}
-
 P2P_HEADERS = {
     "Content-Type": "application/json",
     "Origin": "https://p2p.binance.com",
@@ -19,202 +24,321 @@ P2P_HEADERS = {
     "User-Agent": "Mozilla/5.0 (AutinerBot; +binance-p2p)"
 }
 
-# ---------- helpers (sync) ----------
-def _get_json_sync(url: str, timeout=20):
-    r = requests.get(url, headers=HTTP_HEADERS, timeout=timeout)
-    r.raise_for_status()
-    return r.json()
+# ---------- giới hạn weight (2400/phút, chừa biên an toàn) ----------
+LIMITER = WeightLimiter(
+    int(S.BINANCE_WEIGHT_LIMIT * S.BINANCE_WEIGHT_SAFETY),
+    reserve_ratio=S.BINANCE_BACKGROUND_RESERVE,
+    max_wait_user=S.BINANCE_MAX_WAIT_USER,
+    max_wait_background=S.BINANCE_MAX_WAIT_BACKGROUND,
+)
 
-def _post_json_sync(url: str, payload: dict, timeout=20, headers=None):
-    r = requests.post(url, json=payload, headers=headers or HTTP_HEADERS, timeout=timeout)
-    r.raise_for_status()
-    return r.json()
+# ---------- metrics request fapi ----------
+_REQUEST_SECONDS = metrics.histogram(
+    "autiner_binance_request_seconds", "Latency request fapi, không tính chờ weight (giây)", ["endpoint"])
+_WEIGHT_WAIT_SECONDS = metrics.histogram(
+    "autiner_binance_weight_wait_seconds", "Thời gian chờ weight limiter trước khi gửi (giây)")
+_RESPONSES = metrics.counter("autiner_binance_responses_total", "Response fapi theo status", ["endpoint", "status"])
+_WEIGHT_SPENT = metrics.counter("autiner_binance_weight_total", "Weight đã giữ để gửi request", ["endpoint"])
+_RATE_LIMITED = metrics.counter("autiner_binance_rate_limited_total", "Request bị chặn vì 429/418", ["endpoint"])
+_IN_FLIGHT = metrics.gauge("autiner_binance_in_flight", "Request fapi đang chờ response")
 
-# ---------- cache ----------
-_ALL_TICKERS_CACHE = {"ts": 0, "data": []}
+@metrics.timed()
+async def _fapi_get(path: str, params=None, timeout=25, decode=None):
+    """GET tới fapi: giữ weight trước khi gửi, đọc weight/429 từ response."""
+    weight = endpoint_weight(path, params)
+    t0 = time.perf_counter()
+    await LIMITER.acquire(weight)
+    t1 = time.perf_counter()
+    _WEIGHT_WAIT_SECONDS.observe(t1 - t0)
+    _WEIGHT_SPENT.labels(path).inc(weight)
+
+    def _on_response(status, headers):
+        _RESPONSES.labels(path, status).inc()
+        LIMITER.observe(status, headers)
+
+    _IN_FLIGHT.inc()
+    try:
+        return await http_client.get_json(
+            f"{BINANCE_FUTURES_URL}{path}", params=params, timeout=timeout,
+            on_response=_on_response, decode=decode,
+        )
+    except aiohttp.ClientResponseError as e:
+        if e.status in (429, 418):
+            _RATE_LIMITED.labels(path).inc()
+            raise BinanceRateLimited(f"HTTP {e.status} from Binance", LIMITER.blocked_for()) from e
+        raise
+    except Exception:
+        _RESPONSES.labels(path, "error").inc()   # timeout / lỗi kết nối / lỗi decode
+        raise
+    finally:
+        _IN_FLIGHT.dec()
+        _REQUEST_SECONDS.labels(path).observe(time.perf_counter() - t1)
+
+def _log_error(where: str, e: Exception):
+    if isinstance(e, BinanceRateLimited):
+        print(f"[WARN] {where}: {e} (retry after {e.retry_after:.1f}s)")
+        return
+    print(f"[ERROR] {where}: {e}")
+    print(traceback.format_exc())
+
+# ---------- gộp request trùng (nhiều user hỏi cùng lúc) ----------
+_KLINES_FLIGHT = new_group("klines")
+_P2P_FLIGHT = new_group("p2p_rate")
 
 # =============================
 # 24h tickers (Futures)
 # =============================
-async def get_all_futures(ttl=10):
+@metrics.timed()
+async def _fetch_all_futures():
+    # list Ticker (__slots__, số đã là float)
+    return await _fapi_get("/fapi/v1/ticker/24hr", decode=fast_json.decode_tickers)
+
+# Snapshot dùng chung cho cả bot (menu, poller...)
+TICKERS = TickerSnapshot(_fetch_all_futures, ttl=S.TICKER_TTL, max_stale=S.TICKER_MAX_STALE)
+
+@metrics.timed()
+async def get_all_futures(ttl=None):
     try:
-        now = int(time.time())
-        if now - _ALL_TICKERS_CACHE["ts"] <= ttl and _ALL_TICKERS_CACHE["data"]:
-            return _ALL_TICKERS_CACHE["data"]
-
-        url = f"{BINANCE_FUTURES_URL}/fapi/v1/ticker/24hr"
-        data = await asyncio.to_thread(_get_json_sync, url, 25)
-        if isinstance(data, list) and data:
-            _ALL_TICKERS_CACHE["ts"] = now
-            _ALL_TICKERS_CACHE["data"] = data
-            return data
-        return []
+        return await TICKERS.get(ttl)
     except Exception as e:
-        print(f"[ERROR] get_all_futures: {e}")
-        print(traceback.format_exc())
+        _log_error("get_all_futures", e)
         return []
 
 # =============================
 # Kline (Futures)
 # =============================
-async def get_kline(symbol: str, interval="15m", limit=200):
+@metrics.timed()
+async def _fetch_kline(symbol: str, interval: str, limit: int, start_time=None):
+    params = {"symbol": symbol, "interval": interval, "limit": limit}
+    if start_time is not None:
+        params["startTime"] = start_time
+    # KlineSeries: cột numpy đã đổi kiểu
+    return await _fapi_get("/fapi/v1/klines", params, decode=fast_json.decode_klines)
+
+@metrics.timed()
+async def get_kline(symbol: str, interval="15m", limit=200, max_age=None):
+    """max_age: tuổi tối đa (giây) của cache được dùng lại; 0 = luôn tải phần đuôi."""
     try:
         symbol = symbol.upper()
-        url = f"{BINANCE_FUTURES_URL}/fapi/v1/klines?symbol={symbol}&interval={interval}&limit={limit}"
-        data = await asyncio.to_thread(_get_json_sync, url, 25)
-        return data if isinstance(data, list) else []
+        return await _KLINES_FLIGHT.do(
+            (symbol, interval, limit),
+            lambda: KLINES.get(symbol, interval, limit, _fetch_kline, max_age),
+        )
     except Exception as e:
-        print(f"[ERROR] get_kline({symbol}): {e}")
-        print(traceback.format_exc())
-        return []
+        _log_error(f"get_kline({symbol})", e)
+        return KlineSeries.empty()
 
 # =============================
 # P2P USDT/VND
 # =============================
-async def get_usdt_vnd_rate() -> float:
+@metrics.timed()
+async def _fetch_p2p_ads():
     payload = {
         "asset": "USDT",
         "fiat": "VND",
         "merchantCheck": False,
         "page": 1,
-        "rows": 10,
+        "rows": S.P2P_TOP_ADS,
         "tradeType": "SELL",
         "payTypes": [],
         "publisherType": None
     }
+    data = await _P2P_FLIGHT.do(
+        "USDT/VND",
+        lambda: http_client.post_json(BINANCE_P2P_URL, payload, timeout=20, headers=P2P_HEADERS),
+    )
+    return (data or {}).get("data") or []
+
+# Tỷ giá dùng chung (menu đọc, poller làm mới)
+P2P_RATE = P2PRateProvider(_fetch_p2p_ads, ttl=S.P2P_RATE_TTL, top=S.P2P_TOP_ADS)
+
+@metrics.timed()
+async def get_usdt_vnd_rate(ttl=None) -> float:
+    """Tỷ giá USDT/VND (trung vị theo khối lượng top quảng cáo, cache + làm mới nền)."""
     try:
-        data = await asyncio.to_thread(_post_json_sync, BINANCE_P2P_URL, payload, 20, P2P_HEADERS)
-        advs = data.get("data", [])
-        prices = []
-        for item in advs[:5]:
-            adv = item.get("adv") or {}
-            p = adv.get("price")
-            if p is not None:
-                try:
-                    prices.append(float(p))
-                except:
-                    pass
-        return float(sum(prices) / len(prices)) if prices else 0.0
+        return await P2P_RATE.get(ttl)
     except Exception as e:
-        print(f"[ERROR] get_usdt_vnd_rate: {e}")
-        print(traceback.format_exc())
-        return 0.0
+        _log_error("get_usdt_vnd_rate", e)
+        return P2P_RATE.rate
+
+@metrics.timed()
+async def refresh_usdt_vnd_rate() -> float:
+    return await P2P_RATE.refresh()
 
 # =============================
 # Indicator helpers
 # =============================
-def calculate_indicators(klines):
+# Trạng thái chỉ báo theo (symbol, interval): chỉ nạp nến mới đóng (O(1)/nến)
+_INDICATORS = IncrementalIndicators()
+
+@metrics.timed()
+def calculate_indicators(klines: KlineSeries, symbol: str, interval: str = "15m"):
+    """EMA/RSI Wilder/MACD/Bollinger tại nến đã đóng cuối (nến cuối = nến đang chạy, bỏ qua), nạp tăng dần."""
     try:
-        closes = np.array([float(k[4]) for k in klines], dtype=float)
-        if len(closes) < 26:
-            return {}
-
-        # EMA
-        ema20 = np.mean(closes[-20:]) if len(closes) >= 20 else closes[-1]
-        ema50 = np.mean(closes[-50:]) if len(closes) >= 50 else closes[-1]
-
-        # RSI (14)
-        deltas = np.diff(closes)
-        ups = deltas[deltas > 0].sum() / 14 if len(deltas) >= 14 else 0
-        downs = -deltas[deltas < 0].sum() / 14 if len(deltas) >= 14 else 0
-        rs = (ups / downs) if downs != 0 else 0
-        rsi = 100 - (100 / (1 + rs)) if rs != 0 else 50
-
-        # MACD
-        ema12 = np.mean(closes[-12:]) if len(closes) >= 12 else closes[-1]
-        ema26 = np.mean(closes[-26:]) if len(closes) >= 26 else closes[-1]
-        macd = ema12 - ema26
-        signal = np.mean([ema12, ema26])
-        macd_signal = "bullish" if macd > signal else "bearish"
-
-        # Bollinger
-        mid = np.mean(closes[-20:]) if len(closes) >= 20 else closes[-1]
-        std = np.std(closes[-20:]) if len(closes) >= 20 else 0
-        upper = mid + 2 * std
-        lower = mid - 2 * std
-        last_close = closes[-1]
-        if last_close >= upper:
-            bb_status = "gần biên trên"
-        elif last_close <= lower:
-            bb_status = "gần biên dưới"
-        else:
-            bb_status = "trong dải"
-
-        return {
-            "RSI": round(rsi, 2),
-            "MACD": macd_signal,
-            "EMA20": round(ema20, 6),
-            "EMA50": round(ema50, 6),
-            "Bollinger": bb_status,
-            "last_close": last_close
-        }
+        return _INDICATORS.compute((symbol.upper(), interval), klines) if klines else {}
     except Exception as e:
-        print(f"[ERROR] calculate_indicators: {e}")
+        print(f"[ERROR] calculate_indicators({symbol}): {e}")
         return {}
 
 # =============================
 # Phân tích coin
 # =============================
-async def analyze_coin(symbol: str):
-    try:
-        klines = await get_kline(symbol, "15m", 200)
-        indicators = calculate_indicators(klines) if klines else {}
-        if not indicators:
-            return {"side": "LONG", "strength": 50, "reason": "Không đủ dữ liệu"}
 
-        rsi, macd = indicators["RSI"], indicators["MACD"]
-        ema20, ema50 = indicators["EMA20"], indicators["EMA50"]
+@metrics.timed()
+def score_indicators(indicators: dict) -> dict:
+    """Luật chấm điểm của analyze_coin: RSI / MACD / EMA -> side, strength, reason."""
+    rsi, macd = indicators["RSI"], indicators["MACD"]
+    ema20, ema50 = indicators["EMA20"], indicators["EMA50"]
+
+    score_long, score_short = 0, 0
+    reasons = []
+
+    # RSI
+    if rsi < 30:
+        score_long += 2; reasons.append("RSI thấp (<30) → quá bán")
+    elif rsi > 70:
+        score_short += 2; reasons.append("RSI cao (>70) → quá mua")
+
+    # MACD
+    if macd == "bullish":
+        score_long += 1; reasons.append("MACD bullish")
+    elif macd == "bearish":
+        score_short += 1; reasons.append("MACD bearish")
 
-        score_long, score_short = 0, 0
-        reasons = []
+    # EMA
+    if ema20 > ema50:
+        score_long += 1; reasons.append("EMA20 > EMA50 → xu hướng tăng")
+    else:
+        score_short += 1; reasons.append("EMA20 < EMA50 → xu hướng giảm")
 
-        # RSI
-        if rsi < 30:
-            score_long += 2; reasons.append("RSI thấp (<30) → quá bán")
-        elif rsi > 70:
-            score_short += 2; reasons.append("RSI cao (>70) → quá mua")
+    # Bollinger
+    reasons.append(f"Bollinger: {indicators['Bollinger']}")
 
-        # MACD
-        if macd == "bullish":
-            score_long += 1; reasons.append("MACD bullish")
-        elif macd == "bearish":
-            score_short += 1; reasons.append("MACD bearish")
+    side = "LONG" if score_long >= score_short else "SHORT"
+    strength = 50 + 10 * abs(score_long - score_short)
+    reason = "; ".join(reasons)
 
-        # EMA
-        if ema20 > ema50:
-            score_long += 1; reasons.append("EMA20 > EMA50 → xu hướng tăng")
-        else:
-            score_short += 1; reasons.append("EMA20 < EMA50 → xu hướng giảm")
+    return {"side": side, "strength": min(90, strength), "reason": reason}
 
-        # Bollinger
-        reasons.append(f"Bollinger: {indicators['Bollinger']}")
+@metrics.timed()
+def analyze_klines(symbol: str, klines: KlineSeries, interval: str = "15m"):
+    """Chấm điểm từ nến có sẵn; None nếu không đủ dữ liệu."""
+    indicators = calculate_indicators(klines, symbol, interval)
+    if not indicators:
+        return None
+    return score_indicators(indicators)
 
-        side = "LONG" if score_long >= score_short else "SHORT"
-        strength = 50 + 10 * abs(score_long - score_short)
-        reason = "; ".join(reasons)
+@metrics.timed()
+async def warm_indicators(symbol: str, interval: str = "15m", limit: int = 200) -> bool:
+    """Nạp nến mới đóng vào trạng thái chỉ báo của symbol (để live_rsi đọc O(1))."""
+    klines = await get_kline(symbol, interval, limit)
+    return bool(klines) and bool(_INDICATORS.compute((symbol.upper(), interval), klines))
 
-        return {"side": side, "strength": min(90, strength), "reason": reason}
+def live_rsi(symbol: str, price: float, interval: str = "15m"):
+    """RSI nếu nến đang chạy đóng ở price (từ trạng thái đã nạp); None nếu chưa warm."""
+    st = _INDICATORS.state((symbol.upper(), interval))
+    return st.rsi.peek(price) if st is not None and price is not None else None
+
+# Tăng khi đổi luật score_indicators / cách tính chỉ báo -> bỏ các kết quả đã nhớ
+SCORE_VERSION = 1
+ANALYSES = AnalysisMemo(S.ANALYSIS_MEMO_SIZE)
+
+@metrics.timed()
+async def analyze_coin(symbol: str, interval: str = "15m"):
+    """
+    Chấm điểm tại nến đã đóng cuối (cùng luật với analyze_klines / scan_market).
+    Nhớ theo nến đóng cuối: trong cùng 1 nến, symbol chỉ tải nến + tính chỉ báo 1 lần.
+    """
+    symbol = symbol.upper()
+    key = (symbol, interval, SCORE_VERSION)
+    want = last_closed_open_time(interval)
+    cached = ANALYSES.get(key, want)
+    if cached is not None:
+        return cached
+    try:
+        klines = await get_kline(symbol, interval, 200)
+        if want is not None and klines and klines.last_open_time <= want:
+            # cache chưa có nến mới (nến vừa đóng chưa chốt) -> tải phần đuôi ngay
+            klines = await get_kline(symbol, interval, 200, max_age=0)
+        result = analyze_klines(symbol, klines, interval)
+        if result is None:
+            return {"side": "LONG", "strength": 50, "reason": "Không đủ dữ liệu"}
+        st = _INDICATORS.state((symbol, interval))
+        if st is not None and st.last_open_time == want:
+            ANALYSES.put(key, want, result)   # Binance trễ nến -> không nhớ (sẽ không bao giờ hit)
+        return result
     except Exception as e:
         print(f"[ERROR] analyze_coin({symbol}): {e}")
         return {"side": "LONG", "strength": 50, "reason": "Lỗi phân tích"}
 
+# =============================
+# Metrics lúc scrape (đọc stats sẵn có, không tốn gì trên đường nóng)
+# =============================
+def _ratio(hit: float, total: float) -> float:
+    return hit / total if total else 0.0
+
+@metrics.register_collector
+def _collect_metrics():
+    now = time.monotonic()
+    lim = LIMITER
+    tokens = min(lim.capacity, lim.tokens + (now - lim.updated_at) * lim.rate)
+    yield "autiner_binance_weight_tokens", "gauge", "Weight còn trong bucket phía client", [({}, tokens)]
+    yield "autiner_binance_weight_capacity", "gauge", "Weight tối đa / phút phía client", [({}, lim.capacity)]
+    yield "autiner_binance_weight_server_used", "gauge", "X-MBX-USED-WEIGHT-1M gần nhất", [({}, lim.server_used)]
+    yield "autiner_binance_blocked_seconds", "gauge", "Số giây còn bị Binance chặn", [({}, lim.blocked_for())]
+    yield metrics.stats_family("autiner_binance_limiter_events_total", "counter",
+                               "Sự kiện weight limiter (acquired/waited/shed/rejected/http_429/http_418)",
+                               "limiter", {"fapi": lim.stats})
+
+    caches = {"ticker_24hr": TICKERS.stats, "klines": KLINES.stats, "p2p_rate": P2P_RATE.stats,
+              "indicators": _INDICATORS.stats, "analyses": ANALYSES.stats}
+    yield metrics.stats_family("autiner_cache_events_total", "counter", "Sự kiện cache theo loại", "cache", caches)
+    t, k, p, a = TICKERS.stats, KLINES.stats, P2P_RATE.stats, ANALYSES.stats
+    yield "autiner_cache_hit_ratio", "gauge", "Tỉ lệ phục vụ từ cache (kể cả bản cũ đang làm mới nền)", [
+        ({"cache": "ticker_24hr"}, _ratio(t["hits"] + t["stale_hits"], t["hits"] + t["stale_hits"] + t["misses"])),
+        ({"cache": "klines"}, _ratio(k["hits"], k["hits"] + k["full_fetches"] + k["tail_fetches"])),
+        ({"cache": "p2p_rate"}, _ratio(p["hits"] + p["stale_hits"], p["hits"] + p["stale_hits"] + p["misses"])),
+        ({"cache": "analyses"}, _ratio(a["hits"], a["hits"] + a["misses"] + a["stale"])),
+    ]
+    yield "autiner_kline_cache_bars", "gauge", "Số nến đang giữ trong RAM", [({}, KLINES.total_bars)]
+    yield "autiner_kline_cache_series", "gauge", "Số (symbol, interval) đang giữ", [({}, len(KLINES))]
+    yield "autiner_analysis_memo_entries", "gauge", "Số kết quả phân tích đang nhớ", [({}, len(ANALYSES))]
+    age = TICKERS.age()
+    yield "autiner_ticker_snapshot_age_seconds", "gauge", "Tuổi snapshot ticker 24h", [
+        ({}, age if age != float("inf") else -1)]
+
+    flights = singleflight_stats()
+    yield metrics.stats_family("autiner_singleflight_events_total", "counter",
+                               "Lời gọi single-flight (calls/executed/coalesced)", "group",
+                               {g: {k: v for k, v in st.items() if k != "inflight"} for g, st in flights.items()})
+    yield "autiner_singleflight_in_flight", "gauge", "Request đang chạy theo nhóm single-flight", [
+        ({"group": g}, st["inflight"]) for g, st in flights.items()]
+
 # =============================
 # Diagnose Binance (test route /diag)
 # =============================
+@metrics.timed()
 async def diagnose_binance():
+    """Gọi thẳng Binance (async, qua session dùng chung + limiter) để kiểm tra kết nối."""
     info = {"ping": None, "tickers_status": None, "tickers_len": None, "sample": None, "error": None}
     try:
-        r1 = requests.get(f"{BINANCE_FUTURES_URL}/fapi/v1/ping", headers=HTTP_HEADERS, timeout=10)
-        info["ping"] = r1.status_code
-
-        r2 = requests.get(f"{BINANCE_FUTURES_URL}/fapi/v1/ticker/24hr", headers=HTTP_HEADERS, timeout=15)
-        info["tickers_status"] = r2.status_code
-        if r2.status_code == 200:
-            js = r2.json()
-            info["tickers_len"] = len(js) if isinstance(js, list) else None
-            info["sample"] = js[0] if isinstance(js, list) and js else None
-        else:
-            info["error"] = r2.text[:300]
+        session = await http_client.get_session()
+
+        await LIMITER.acquire(endpoint_weight("/fapi/v1/ping"))
+        async with session.get(f"{BINANCE_FUTURES_URL}/fapi/v1/ping", timeout=aiohttp.ClientTimeout(total=10)) as r1:
+            LIMITER.observe(r1.status, r1.headers)
+            info["ping"] = r1.status
+
+        await LIMITER.acquire(endpoint_weight("/fapi/v1/ticker/24hr"))
+        async with session.get(f"{BINANCE_FUTURES_URL}/fapi/v1/ticker/24hr", timeout=aiohttp.ClientTimeout(total=15)) as r2:
+            LIMITER.observe(r2.status, r2.headers)
+            info["tickers_status"] = r2.status
+            if r2.status == 200:
+                js = await r2.json(content_type=None)
+                info["tickers_len"] = len(js) if isinstance(js, list) else None
+                info["sample"] = js[0] if isinstance(js, list) and js else None
+            else:
+                info["error"] = (await r2.text())[:300]
     except Exception as e:
         info["error"] = str(e)
     return info
@@ -0,0 +1,141 @@
+# autiner_bot/data_sources/binance_ws.py
+"""
+Nguồn dữ liệu streaming từ Binance Futures WebSocket (combined stream).
+- !ticker@arr            -> gộp vào snapshot ticker 24h (binance.TICKERS)
+- <symbol>@kline_<itv>   -> cập nhật cửa sổ nến trong KLINES
+- Mất kết nối thì reconnect với backoff; trong lúc đó REST tự làm fallback
+  (snapshot/nến hết hạn -> REST tải lại như bình thường).
+"""
+
+from typing import Iterable, List, Optional, Set
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from autiner_bot.settings import S
+from autiner_bot.data_sources import http_client
+from autiner_bot.data_sources.fast_json import loads, typed_kline
+from autiner_bot.data_sources.models import Ticker
+from autiner_bot.data_sources.binance import TICKERS
+from autiner_bot.data_sources.kline_cache import KLINES
+
+TICKER_STREAM = "!ticker@arr"
+
+
+def kline_event_to_rest(k: dict) -> list:
+    """Event kline -> 1 dòng nến giống REST /fapi/v1/klines (dạng số)."""
+    return typed_kline([k["t"], k["o"], k["h"], k["l"], k["c"], k["v"], k["T"], k["q"], k["n"], k["V"], k["Q"]])
+
+
+def kline_stream(symbol: str, interval: str) -> str:
+    return f"{symbol.lower()}@kline_{interval}"
+
+
+class BinanceMarketStream:
+    def __init__(self, base_url: str, interval: str, symbols: Iterable[str] = (),
+                 max_backoff: float = 60.0, live_timeout: float = 10.0, min_backoff: float = 1.0):
+        self.base_url = base_url.rstrip("/")
+        self.interval = interval
+        self.symbols: Set[str] = {s.upper() for s in symbols}
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.live_timeout = live_timeout
+        self.connected = False
+        self.last_msg_at = 0.0
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._task: Optional[asyncio.Task] = None
+        self._req_id = 0
+        self.stats = {"connects": 0, "disconnects": 0, "messages": 0, "ticker_events": 0, "kline_events": 0}
+
+    # ---------- trạng thái ----------
+    def is_live(self) -> bool:
+        """Đang kết nối và có dữ liệu gần đây -> có thể bỏ qua REST polling."""
+        return self.connected and time.monotonic() - self.last_msg_at <= self.live_timeout
+
+    def streams(self) -> List[str]:
+        return [TICKER_STREAM] + [kline_stream(s, self.interval) for s in sorted(self.symbols)]
+
+    def url(self) -> str:
+        return f"{self.base_url}/stream?streams={'/'.join(self.streams())}"
+
+    # ---------- start / stop ----------
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self.connected = False
+
+    # ---------- đổi danh sách symbol nến ----------
+    async def set_kline_symbols(self, symbols: Iterable[str]) -> None:
+        new = {s.upper() for s in symbols}
+        added, removed = new - self.symbols, self.symbols - new
+        self.symbols = new
+        if self._ws is None or self._ws.closed:
+            return  # lần connect sau sẽ dùng danh sách mới
+        if added:
+            await self._send("SUBSCRIBE", [kline_stream(s, self.interval) for s in sorted(added)])
+        if removed:
+            await self._send("UNSUBSCRIBE", [kline_stream(s, self.interval) for s in sorted(removed)])
+
+    async def _send(self, method: str, params: List[str]) -> None:
+        self._req_id += 1
+        await self._ws.send_str(json.dumps({"method": method, "params": params, "id": self._req_id}))
+
+    # ---------- vòng đọc ----------
+    async def _run(self) -> None:
+        backoff = self.min_backoff
+        while True:
+            try:
+                session = await http_client.get_session()
+                async with session.ws_connect(self.url(), heartbeat=30, timeout=S.HTTP_TIMEOUT) as ws:
+                    self._ws = ws
+                    self.connected = True
+                    self.stats["connects"] += 1
+                    backoff = self.min_backoff
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self.handle_message(loads(msg.data))
+                        elif msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSED):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[ERROR] binance ws: {e}")
+            finally:
+                if self.connected:
+                    self.stats["disconnects"] += 1
+                self.connected = False
+                self._ws = None
+            await asyncio.sleep(backoff)
+            backoff = min(self.max_backoff, backoff * 2)
+
+    def handle_message(self, msg: dict) -> None:
+        stream = msg.get("stream")
+        data = msg.get("data")
+        if stream is None or data is None:
+            return  # phản hồi SUBSCRIBE/UNSUBSCRIBE
+        self.last_msg_at = time.monotonic()
+        self.stats["messages"] += 1
+        if stream == TICKER_STREAM:
+            TICKERS.merge([Ticker.from_ws(ev) for ev in data if ev.get("s")])
+            self.stats["ticker_events"] += 1
+        elif "@kline_" in stream:
+            k = data.get("k") or {}
+            if k:
+                KLINES.apply_bar(k["s"], k["i"], kline_event_to_rest(k))
+                self.stats["kline_events"] += 1
+
+
+# Instance dùng chung (main.py start/stop, poller đọc is_live)
+STREAM = BinanceMarketStream(S.BINANCE_WS_URL, S.POLL_KLINE_INTERVAL)
@@ -0,0 +1,49 @@
+# autiner_bot/data_sources/fast_json.py
+"""
+Giải mã JSON nhanh cho payload lớn của Binance.
+- Dùng orjson nếu có cài (nhanh hơn json chuẩn), không có thì fallback json chuẩn.
+- Ticker 24h -> list Ticker (__slots__, số đã là float; không float(...) lại mỗi lần đọc).
+- Kline -> KlineSeries (cột numpy, đổi kiểu theo cả cột 1 lần).
+"""
+
+from typing import Any, List
+import json
+
+from autiner_bot.data_sources.models import KlineSeries, Ticker
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+
+def loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# =============================
+# Ticker 24h
+# =============================
+def decode_tickers(raw: bytes) -> List[Ticker]:
+    data = loads(raw)
+    if not isinstance(data, list):
+        raise ValueError(f"unexpected ticker payload: {str(data)[:200]}")
+    return [Ticker.from_rest(rec) for rec in data if rec.get("symbol")]
+
+
+# =============================
+# Kline
+# =============================
+def typed_kline(k: list) -> list:
+    """1 dòng nến (REST hoặc websocket, chuỗi số) -> dòng số (time/trades int, còn lại float)."""
+    return [int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]),
+            int(k[6]), float(k[7]), int(k[8]), float(k[9]), float(k[10])]
+
+
+def decode_klines(raw: bytes) -> KlineSeries:
+    data = loads(raw)
+    if not isinstance(data, list):
+        raise ValueError(f"unexpected kline payload: {str(data)[:200]}")
+    return KlineSeries.from_rows(data)
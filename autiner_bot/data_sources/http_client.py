@@ -0,0 +1,92 @@
+# autiner_bot/data_sources/http_client.py
+"""
+HTTP client dùng chung cho các data source.
+- Một aiohttp.ClientSession sống lâu, keep-alive, pool kết nối có giới hạn.
+- Tạo trong init_bot (main.py) và đóng khi tắt bot.
+- Nếu chưa init (script/test), tự tạo session trên event loop hiện tại.
+- Body giải mã bằng fast_json (orjson nếu có); caller có thể truyền decoder riêng
+  để đổi thẳng sang bản ghi có kiểu.
+"""
+
+from typing import Any, Callable, Mapping, Optional
+import asyncio
+
+import aiohttp
+
+from autiner_bot.settings import S
+from autiner_bot.data_sources import fast_json
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (AutinerBot; +binance-futures)",
+    "Accept": "application/json",
+}
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_lock = asyncio.Lock()
+
+
+def _build_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=S.HTTP_POOL_LIMIT,
+        limit_per_host=S.HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=S.HTTP_KEEPALIVE,
+        ttl_dns_cache=S.HTTP_DNS_TTL,
+        enable_cleanup_closed=True,
+    )
+    timeout = aiohttp.ClientTimeout(total=S.HTTP_TIMEOUT, sock_connect=S.HTTP_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=DEFAULT_HEADERS)
+
+
+async def init_http_session() -> aiohttp.ClientSession:
+    """Tạo session dùng chung (gọi 1 lần trong init_bot)."""
+    global _session
+    async with _session_lock:
+        if _session is None or _session.closed:
+            _session = _build_session()
+    return _session
+
+
+async def get_session() -> aiohttp.ClientSession:
+    if _session is None or _session.closed:
+        return await init_http_session()
+    return _session
+
+
+async def close_http_session() -> None:
+    """Đóng session khi tắt bot."""
+    global _session
+    async with _session_lock:
+        if _session is not None and not _session.closed:
+            await _session.close()
+        _session = None
+
+
+def _timeout(timeout: Optional[float]):
+    return aiohttp.ClientTimeout(total=timeout, sock_connect=S.HTTP_CONNECT_TIMEOUT) if timeout else None
+
+
+# =============================
+# Request helpers
+# =============================
+async def get_json(url: str, params: Optional[dict] = None, timeout: Optional[float] = None,
+                   headers: Optional[dict] = None,
+                   on_response: Optional[Callable[[int, Mapping], None]] = None,
+                   decode: Optional[Callable[[bytes], Any]] = None):
+    """
+    on_response(status, headers): gọi trước raise_for_status (vd: đọc weight, Retry-After).
+    decode(body_bytes): mặc định fast_json.loads.
+    """
+    session = await get_session()
+    async with session.get(url, params=params, headers=headers, timeout=_timeout(timeout)) as r:
+        if on_response is not None:
+            on_response(r.status, r.headers)
+        r.raise_for_status()
+        return (decode or fast_json.loads)(await r.read())
+
+
+async def post_json(url: str, payload: dict, timeout: Optional[float] = None,
+                    headers: Optional[dict] = None):
+    session = await get_session()
+    async with session.post(url, json=payload, headers=headers, timeout=_timeout(timeout)) as r:
+        r.raise_for_status()
+        return fast_json.loads(await r.read())
@@ -0,0 +1,215 @@
+# autiner_bot/data_sources/kline_cache.py
+"""
+Bộ nhớ đệm nến theo (symbol, interval).
+- Giữ nguyên cửa sổ nến trong RAM (KlineSeries: cột numpy, ~72 byte/nến).
+- Lần sau chỉ tải các nến mới hơn open time cuối (startTime), thay nến đang chạy.
+- Vượt giới hạn tổng số nến thì bỏ symbol ít dùng nhất (LRU).
+- Có kho đĩa (KlineStore): nến đã đóng được ghi xuống đĩa; khởi động lại thì nạp từ đĩa
+  và chỉ tải phần đuôi còn thiếu.
+- Nến mới đóng chỉ được xếp hàng trên event loop; poller lấy hàng chờ (take_pending) rồi
+  ghi gộp trong thread (asyncio.to_thread(write_pending, ...)), không chặn loop vì I/O đĩa.
+"""
+
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import time
+
+import numpy as np
+
+from autiner_bot.settings import S
+from autiner_bot.data_sources.kline_store import KlineStore
+from autiner_bot.data_sources.models import KlineSeries
+
+_INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000,
+    "1w": 604_800_000,
+}
+
+# fetcher(symbol, interval, limit, start_time) -> KlineSeries
+Fetcher = Callable[[str, str, int, Optional[int]], Awaitable[KlineSeries]]
+
+
+def interval_ms(interval: str) -> int:
+    return _INTERVAL_MS.get(interval, 0)
+
+
+class _Series:
+    __slots__ = ("bars", "window", "fetched_at")
+
+    def __init__(self, bars: KlineSeries, window: int):
+        self.bars = bars
+        self.window = window
+        self.fetched_at = time.monotonic()
+
+
+class KlineCache:
+    def __init__(self, max_bars: int, min_refresh: float, store: Optional[KlineStore] = None):
+        self.max_bars = max_bars
+        self.min_refresh = min_refresh
+        self.store = store
+        self._series: "OrderedDict[Tuple[str, str], _Series]" = OrderedDict()
+        self._total_bars = 0
+        self._pending: Dict[Tuple[str, str], List[KlineSeries]] = {}   # nến đã đóng chờ ghi đĩa
+        self._queued_until: Dict[Tuple[str, str], int] = {}            # open time nến cuối đã lưu / xếp hàng
+        self.stats: Dict[str, int] = {"hits": 0, "full_fetches": 0, "tail_fetches": 0, "evictions": 0, "pushes": 0,
+                                      "store_loads": 0, "store_writes": 0, "store_queued": 0}
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    @property
+    def total_bars(self) -> int:
+        return self._total_bars
+
+    async def get(self, symbol: str, interval: str, limit: int, fetch: Fetcher,
+                  max_age: Optional[float] = None) -> KlineSeries:
+        key = (symbol, interval)
+        series = self._series.get(key)
+        if series is not None:
+            self._series.move_to_end(key)
+        elif self.store is not None:
+            series = self._load_from_store(key, limit)
+
+        # Cache đủ dài và còn mới -> trả luôn, không gọi mạng
+        max_age = self.min_refresh if max_age is None else max_age
+        if series is not None and len(series.bars) >= limit \
+                and time.monotonic() - series.fetched_at < max_age:
+            self.stats["hits"] += 1
+            return series.bars[-limit:]
+
+        step = interval_ms(interval)
+        # limit - 1: nến nạp từ đĩa chỉ thiếu nến đang chạy, phần đuôi sẽ bù
+        if series is None or len(series.bars) < limit - 1 or not step:
+            return self._store(key, await fetch(symbol, interval, limit, None), limit)
+
+        # Chỉ tải phần đuôi: từ nến cuối (đang chạy) trở đi
+        last_open = series.bars.last_open_time
+        missing = (int(time.time() * 1000) - last_open) // step + 1
+        if missing >= limit:
+            return self._store(key, await fetch(symbol, interval, limit, None), limit)
+
+        tail = await fetch(symbol, interval, int(missing) + 1, last_open)
+        if not tail:
+            return series.bars[-limit:]
+        self.stats["tail_fetches"] += 1
+        self._persist(key, tail)
+        return self._put(key, series.bars.merge_tail(tail), max(limit, series.window))[-limit:]
+
+    def apply_bar(self, symbol: str, interval: str, bar: Sequence) -> bool:
+        """
+        Cập nhật 1 nến từ websocket: cùng open time -> thay, mới hơn -> nối thêm.
+        Chỉ áp cho series đã có (được seed bằng REST); trả False nếu bỏ qua.
+        """
+        series = self._series.get((symbol, interval))
+        if series is None or not series.bars:
+            return False
+        last_open = series.bars.last_open_time
+        open_time = int(bar[0])
+        if open_time == last_open:
+            series.bars.set_last(bar)
+        elif open_time == last_open + interval_ms(interval):
+            self._persist((symbol, interval), series.bars[-1:])  # nến trước vừa đóng
+            grown = len(series.bars) < series.window
+            series.bars = series.bars.append_row(bar, series.window)
+            if grown:
+                self._total_bars += 1
+        else:
+            return False  # lệch/khuyết nến -> để REST tải lại phần đuôi
+        series.fetched_at = time.monotonic()
+        self.stats["pushes"] += 1
+        return True
+
+    def _store(self, key: Tuple[str, str], data: KlineSeries, limit: int) -> KlineSeries:
+        if not data:
+            series = self._series.get(key)
+            return series.bars[-limit:] if series is not None else KlineSeries.empty()
+        self.stats["full_fetches"] += 1
+        self._persist(key, data)
+        old = self._series.get(key)
+        return self._put(key, data, max(limit, old.window if old else 0))[-limit:]
+
+    # ---------- kho đĩa ----------
+    def _load_from_store(self, key: Tuple[str, str], limit: int) -> Optional[_Series]:
+        """Nạp limit nến cuối liên tục từ đĩa; coi như đã cũ để lần get này tải phần đuôi."""
+        step = interval_ms(key[1])
+        if not step:
+            return None
+        try:
+            bars = self.store.tail_series(key[0], key[1], limit)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] kline store read {key}: {e}")
+            return None
+        # Chỉ dùng khi đủ nến liền nhau (không khuyết); nến đang chạy sẽ tải qua phần đuôi
+        if len(bars) < limit - 1 or np.any(np.diff(bars.open_time) != step):
+            return None
+        self._put(key, bars, limit)
+        series = self._series[key]
+        series.fetched_at = float("-inf")   # luôn "cũ" với mọi max_age, kể cả khi monotonic còn nhỏ (máy vừa boot)
+        self.stats["store_loads"] += 1
+        return series
+
+    def _persist(self, key: Tuple[str, str], bars: KlineSeries) -> None:
+        """Xếp hàng các nến đã đóng chưa có trên đĩa (bỏ nến đang chạy); write_pending mới ghi."""
+        if self.store is None or not bars:
+            return
+        closed = bars[:int(np.searchsorted(bars.close_time, int(time.time() * 1000), side="left"))]
+        last = self._queued_until.get(key)
+        if last is None:
+            last = self._queued_until[key] = self.store.last_open_time(key[0], key[1]) or 0
+        closed = closed[int(np.searchsorted(closed.open_time, last, side="right")):]
+        if not closed:
+            return
+        self._pending.setdefault(key, []).append(closed.copy())  # copy: cửa sổ trong RAM bị sửa tại chỗ
+        self._queued_until[key] = int(closed.open_time[-1])
+        self.stats["store_queued"] += len(closed)
+
+    def take_pending(self) -> Dict[Tuple[str, str], List[KlineSeries]]:
+        """Lấy (và xoá) hàng chờ ghi đĩa; gọi trên event loop."""
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def write_pending(self, pending: Dict[Tuple[str, str], List[KlineSeries]]) -> int:
+        """Ghi gộp hàng chờ xuống đĩa, mỗi (symbol, interval) 1 lần append; chạy được trong thread."""
+        if self.store is None:
+            return 0
+        written = 0
+        for key, chunks in pending.items():
+            bars = chunks[0] if len(chunks) == 1 else KlineSeries(*(
+                np.concatenate([getattr(ch, c) for ch in chunks]) for c in chunks[0].columns()
+            ))
+            try:
+                written += self.store.append(key[0], key[1], bars)
+                self.stats["store_writes"] += 1
+            except (OSError, ValueError) as e:
+                print(f"[ERROR] kline store write {key}: {e}")
+                self._queued_until.pop(key, None)  # lần sau đối chiếu lại với đĩa
+        return written
+
+    def _put(self, key: Tuple[str, str], bars: KlineSeries, window: int) -> KlineSeries:
+        bars = bars[-window:]
+        old = self._series.pop(key, None)
+        if old is not None:
+            self._total_bars -= len(old.bars)
+        self._series[key] = _Series(bars, window)
+        self._total_bars += len(bars)
+        self._evict()
+        return bars
+
+    def _evict(self) -> None:
+        while self._total_bars > self.max_bars and len(self._series) > 1:
+            _, old = self._series.popitem(last=False)
+            self._total_bars -= len(old.bars)
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        self._series.clear()
+        self._total_bars = 0
+
+
+KLINES = KlineCache(
+    max_bars=S.KLINE_CACHE_MAX_BARS,
+    min_refresh=S.KLINE_CACHE_MIN_REFRESH,
+    store=KlineStore(S.KLINE_STORE_DIR) if S.KLINE_STORE_DIR else None,
+)
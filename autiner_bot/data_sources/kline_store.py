@@ -0,0 +1,183 @@
+# autiner_bot/data_sources/kline_store.py
+"""
+Kho nến trên đĩa, dạng cột (mỗi cột 1 file nhị phân độ rộng cố định), đọc bằng numpy.memmap.
+- Bố cục: <root>/<interval>/<SYMBOL>/<cột>.bin  (open_time/close_time/trades int64, còn lại float64)
+- Chỉ ghi nối đuôi (append-only) các nến ĐÃ ĐÓNG, open time tăng dần.
+- Đọc theo khoảng open time bằng searchsorted, trả view memmap chỉ đọc (zero-copy).
+- File được cấp trước dung lượng (gấp đôi khi đầy, phần dư là 0) và ghi qua memmap r+:
+  nối nến chỉ ghi vào map đang mở, không mở lại map mỗi lần.
+- Số nến hợp lệ = đoạn đầu open_time khác 0; open_time của mỗi dòng ghi sau cùng nên
+  dòng ghi dở do crash không được tính (bị ghi đè ở lần nối sau).
+- Ghi (thread flush) và đọc (event loop) dùng chung 1 lock.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+import threading
+
+import numpy as np
+
+from autiner_bot.data_sources.models import KLINE_COLUMNS, KlineSeries
+
+COLUMNS = KLINE_COLUMNS
+_ROW_BYTES = 8
+_MIN_CAPACITY = 1024   # số dòng cấp trước tối thiểu khi bắt đầu ghi
+
+
+class _Handle:
+    __slots__ = ("length", "capacity", "maps", "writable", "views")
+
+    def __init__(self, length: int, capacity: int):
+        self.length = length
+        self.capacity = capacity       # số dòng mà map đang mở phủ được
+        self.maps: Optional[Dict[str, np.memmap]] = None
+        self.writable = False
+        self.views: Optional[Dict[str, np.ndarray]] = None   # maps[:length], chỉ đọc
+
+
+class KlineStore:
+    def __init__(self, root: str):
+        self.root = root
+        self._handles: Dict[Tuple[str, str], _Handle] = {}
+        self._lock = threading.RLock()
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, interval, symbol.upper())
+
+    def _path(self, symbol: str, interval: str, col: str) -> str:
+        return os.path.join(self._dir(symbol, interval), col + ".bin")
+
+    def _handle(self, symbol: str, interval: str) -> _Handle:
+        key = (symbol.upper(), interval)
+        h = self._handles.get(key)
+        if h is None:
+            with self._lock:
+                h = self._handles.get(key)
+                if h is None:
+                    h = self._handles[key] = _Handle(*self._recover(symbol, interval))
+        return h
+
+    def _recover(self, symbol: str, interval: str) -> Tuple[int, int]:
+        """(số nến hợp lệ, số dòng mọi cột đều có). Không sửa file: tiến trình khác có thể đang ghi."""
+        paths = [self._path(symbol, interval, c) for c, _ in COLUMNS]
+        if not all(os.path.exists(p) for p in paths):
+            return 0, 0
+        n = min(os.path.getsize(p) // _ROW_BYTES for p in paths)
+        if not n:
+            return 0, 0
+        ot = np.memmap(self._path(symbol, interval, "open_time"), dtype="<i8", mode="r", shape=(n,))
+        zeros = np.flatnonzero(ot == 0)
+        return (int(zeros[0]) if zeros.size else n), n
+
+    def _open_maps(self, symbol: str, interval: str, h: _Handle, writable: bool) -> None:
+        mode = "r+" if writable else "r"
+        h.maps = {c: np.memmap(self._path(symbol, interval, c), dtype=dt, mode=mode, shape=(h.capacity,))
+                  for c, dt in COLUMNS}
+        h.writable = writable
+        h.views = None
+
+    def _reserve(self, symbol: str, interval: str, h: _Handle, rows: int) -> None:
+        """Đảm bảo map ghi được thêm `rows` dòng; đầy thì nới file gấp đôi rồi map lại."""
+        need = h.length + rows
+        if h.writable and need <= h.capacity:
+            return
+        cap = max(need, h.capacity * 2 if h.writable else need, _MIN_CAPACITY)
+        os.makedirs(self._dir(symbol, interval), exist_ok=True)
+        for c, _ in COLUMNS:
+            path = self._path(symbol, interval, c)
+            with open(path, "ab") as f:
+                if f.tell() < cap * _ROW_BYTES:
+                    f.truncate(cap * _ROW_BYTES)   # nới bằng 0 (file thưa)
+        h.capacity = cap
+        self._open_maps(symbol, interval, h, writable=True)
+        h.maps["open_time"][h.length:] = 0   # dòng ghi dở / rác cũ -> không hợp lệ
+
+    # ---------- đọc ----------
+    def length(self, symbol: str, interval: str) -> int:
+        return self._handle(symbol, interval).length
+
+    def last_open_time(self, symbol: str, interval: str) -> Optional[int]:
+        cols = self.columns(symbol, interval)
+        return int(cols["open_time"][-1]) if cols and cols["open_time"].size else None
+
+    def columns(self, symbol: str, interval: str) -> Dict[str, np.ndarray]:
+        """Toàn bộ cột dạng memmap chỉ đọc ({} nếu chưa có dữ liệu)."""
+        h = self._handle(symbol, interval)
+        with self._lock:
+            if not h.length:
+                return {}
+            if h.views is None:
+                if h.maps is None:
+                    self._open_maps(symbol, interval, h, writable=False)
+                h.views = {c: m[:h.length] for c, m in h.maps.items()}
+                for v in h.views.values():
+                    v.flags.writeable = False
+            return h.views
+
+    def read(self, symbol: str, interval: str, start: Optional[int] = None,
+             end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Nến có start <= open_time < end (ms). Trả view, không copy."""
+        cols = self.columns(symbol, interval)
+        if not cols:
+            return {c: np.empty(0, dtype=dt) for c, dt in COLUMNS}
+        ot = cols["open_time"]
+        lo = 0 if start is None else int(np.searchsorted(ot, start, side="left"))
+        hi = ot.size if end is None else int(np.searchsorted(ot, end, side="left"))
+        return {c: a[lo:hi] for c, a in cols.items()}
+
+    def tail(self, symbol: str, interval: str, n: int) -> Dict[str, np.ndarray]:
+        cols = self.columns(symbol, interval)
+        if not cols:
+            return {c: np.empty(0, dtype=dt) for c, dt in COLUMNS}
+        return {c: a[-n:] for c, a in cols.items()}
+
+    def tail_series(self, symbol: str, interval: str, n: int) -> KlineSeries:
+        """n nến cuối, copy vào RAM (series trong cache được sửa tại chỗ, memmap chỉ đọc)."""
+        return KlineSeries.from_columns(self.tail(symbol, interval, n)).copy()
+
+    def symbols(self, interval: str) -> List[str]:
+        base = os.path.join(self.root, interval)
+        if not os.path.isdir(base):
+            return []
+        return sorted(s for s in os.listdir(base) if self.length(s, interval))
+
+    # ---------- ghi ----------
+    def append(self, symbol: str, interval: str, bars: Sequence) -> int:
+        """Nối nến (KlineSeries hoặc list dạng REST) mới hơn nến cuối đã lưu; trả số nến đã ghi."""
+        if not isinstance(bars, KlineSeries):
+            bars = KlineSeries.from_rows(bars)
+        if not bars:
+            return 0
+        ot = bars.open_time
+        if np.any(np.diff(ot) <= 0):
+            _, idx = np.unique(ot, return_index=True)
+            bars = KlineSeries.from_columns({c: a[idx] for c, a in bars.columns().items()})
+        with self._lock:
+            last = self.last_open_time(symbol, interval)
+            if last is not None:
+                bars = bars[int(np.searchsorted(bars.open_time, last, side="right")):]
+            if not bars:
+                return 0
+
+            h = self._handle(symbol, interval)
+            self._reserve(symbol, interval, h, len(bars))
+            lo, hi = h.length, h.length + len(bars)
+            for c, _ in COLUMNS:
+                if c != "open_time":
+                    h.maps[c][lo:hi] = getattr(bars, c)
+            h.maps["open_time"][lo:hi] = bars.open_time   # ghi sau cùng: đánh dấu dòng đã đủ
+            h.length = hi
+            h.views = None
+            return len(bars)
+
+    def append_columns(self, symbol: str, interval: str, cols: Dict[str, np.ndarray]) -> int:
+        """Nối dữ liệu dạng cột (vd: từ file lịch sử); cột thiếu ghi 0."""
+        return self.append(symbol, interval, KlineSeries.from_columns(cols))
+
+    def close(self) -> None:
+        with self._lock:
+            for h in self._handles.values():
+                if h.writable and h.maps:
+                    for m in h.maps.values():
+                        m.flush()
+            self._handles.clear()
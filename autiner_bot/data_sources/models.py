@@ -0,0 +1,241 @@
+# autiner_bot/data_sources/models.py
+"""
+Kiểu dữ liệu gọn cho ticker và nến.
+- Ticker: __slots__, số đã là float (không còn dict ~20 key chuỗi / symbol).
+- KlineSeries: struct-of-arrays numpy (mỗi cột 1 mảng int64/float64) thay cho list các list chuỗi.
+  ~72 byte/nến thay vì ~1KB; cắt lát trả view, không copy.
+"""
+
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _float(v, default: Optional[float] = 0.0) -> Optional[float]:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
+# =============================
+# Ticker 24h
+# =============================
+class Ticker:
+    __slots__ = ("symbol", "last_price", "price_change", "change_pct", "open_price",
+                 "high_price", "low_price", "volume", "quote_volume", "close_time")
+
+    def __init__(self, symbol: str, last_price: Optional[float] = None, price_change: float = 0.0,
+                 change_pct: float = 0.0, open_price: float = 0.0, high_price: float = 0.0,
+                 low_price: float = 0.0, volume: float = 0.0, quote_volume: float = 0.0,
+                 close_time: int = 0):
+        self.symbol = symbol
+        self.last_price = last_price          # None nếu Binance trả giá lỗi
+        self.price_change = price_change
+        self.change_pct = change_pct
+        self.open_price = open_price
+        self.high_price = high_price
+        self.low_price = low_price
+        self.volume = volume
+        self.quote_volume = quote_volume
+        self.close_time = close_time
+
+    @classmethod
+    def from_rest(cls, rec: dict) -> "Ticker":
+        """Bản ghi REST /fapi/v1/ticker/24hr."""
+        g = rec.get
+        return cls(
+            g("symbol"),
+            _float(g("lastPrice"), None),
+            _float(g("priceChange")),
+            _float(g("priceChangePercent")),
+            _float(g("openPrice")),
+            _float(g("highPrice")),
+            _float(g("lowPrice")),
+            _float(g("volume")),
+            _float(g("quoteVolume")),
+            int(g("closeTime") or 0),
+        )
+
+    @classmethod
+    def from_ws(cls, ev: dict) -> "Ticker":
+        """Event 24hrTicker của websocket (key rút gọn)."""
+        g = ev.get
+        return cls(
+            g("s"),
+            _float(g("c"), None),
+            _float(g("p")),
+            _float(g("P")),
+            _float(g("o")),
+            _float(g("h")),
+            _float(g("l")),
+            _float(g("v")),
+            _float(g("q")),
+            int(g("C") or 0),
+        )
+
+    def to_dict(self) -> dict:
+        return {s: getattr(self, s) for s in self.__slots__}
+
+    def update_from(self, other: "Ticker") -> None:
+        """Chép số liệu của other vào object này (giữ nguyên object đang được index/snapshot trỏ tới)."""
+        self.last_price = other.last_price
+        self.price_change = other.price_change
+        self.change_pct = other.change_pct
+        self.open_price = other.open_price
+        self.high_price = other.high_price
+        self.low_price = other.low_price
+        self.volume = other.volume
+        self.quote_volume = other.quote_volume
+        self.close_time = other.close_time
+
+    def __repr__(self) -> str:
+        return f"Ticker({self.symbol} {self.last_price} {self.change_pct:+.2f}% qv={self.quote_volume:,.0f})"
+
+
+# =============================
+# Nến
+# =============================
+# Cột theo đúng thứ tự nến REST /fapi/v1/klines (bỏ các cột taker/ignore)
+KLINE_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("open_time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+    ("close_time", "<i8"),
+    ("quote_volume", "<f8"),
+    ("trades", "<i8"),
+)
+_NAMES = tuple(c for c, _ in KLINE_COLUMNS)
+
+
+class KlineSeries:
+    """Cửa sổ nến dạng cột; nến cuối thường là nến đang chạy."""
+    __slots__ = _NAMES
+
+    def __init__(self, *columns: np.ndarray):
+        for name, col in zip(_NAMES, columns):
+            setattr(self, name, col)
+
+    # ---------- dựng ----------
+    @classmethod
+    def empty(cls) -> "KlineSeries":
+        return cls(*(np.empty(0, dtype=dt) for _, dt in KLINE_COLUMNS))
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence]) -> "KlineSeries":
+        """List nến REST/websocket (chuỗi hoặc số) -> cột numpy, đổi kiểu cả cột 1 lần."""
+        if not len(rows):
+            return cls.empty()
+        width = len(KLINE_COLUMNS)
+        cols = list(zip(*(r[:width] for r in rows)))
+        cols += [(0,) * len(rows)] * (width - len(cols))
+        # open_time/close_time/trades có thể là chuỗi -> qua float64 trước (ms < 2^53 nên không mất số)
+        return cls(*(
+            np.array(c, dtype=np.float64).astype(dt) if dt == "<i8" and isinstance(c[0], str)
+            else np.array(c, dtype=dt)
+            for c, (_, dt) in zip(cols, KLINE_COLUMNS)
+        ))
+
+    @classmethod
+    def from_columns(cls, cols: Dict[str, np.ndarray]) -> "KlineSeries":
+        """Dict cột (KlineStore, file backtest); cột thiếu điền 0."""
+        n = cols["open_time"].size
+        return cls(*(
+            np.asarray(cols[c], dtype=dt) if c in cols else np.zeros(n, dtype=dt)
+            for c, dt in KLINE_COLUMNS
+        ))
+
+    # ---------- đọc ----------
+    def __len__(self) -> int:
+        return self.open_time.size
+
+    def __bool__(self) -> bool:
+        return self.open_time.size > 0
+
+    def __getitem__(self, idx):
+        """series[a:b] -> KlineSeries (view); series[i] -> 1 dòng nến dạng list."""
+        if isinstance(idx, slice):
+            return KlineSeries(*(getattr(self, c)[idx] for c in _NAMES))
+        return self.row(idx)
+
+    def __iter__(self) -> Iterator[list]:
+        return iter(self.to_rows())
+
+    def row(self, i: int) -> list:
+        return [getattr(self, c)[i].item() for c in _NAMES]
+
+    def to_rows(self) -> List[list]:
+        return [list(r) for r in zip(*(getattr(self, c).tolist() for c in _NAMES))]
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {c: getattr(self, c) for c in _NAMES}
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        return int(self.open_time[-1]) if self.open_time.size else None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, c).nbytes for c in _NAMES)
+
+    # ---------- ghép / cập nhật ----------
+    def copy(self) -> "KlineSeries":
+        return KlineSeries(*(np.array(getattr(self, c)) for c in _NAMES))
+
+    def merge_tail(self, tail: "KlineSeries") -> "KlineSeries":
+        """Giữ phần trước tail (theo open time) rồi nối tail; tail thay các nến trùng."""
+        if not tail:
+            return self
+        cut = int(np.searchsorted(self.open_time, tail.open_time[0], side="left"))
+        return KlineSeries(*(
+            np.concatenate((getattr(self, c)[:cut], getattr(tail, c))) for c in _NAMES
+        ))
+
+    def set_last(self, row: Sequence) -> None:
+        """Ghi đè nến cuối tại chỗ (nến đang chạy cập nhật)."""
+        for (c, _), v in zip(KLINE_COLUMNS, row):
+            getattr(self, c)[-1] = v
+
+    def append_row(self, row: Sequence, max_len: Optional[int] = None) -> "KlineSeries":
+        """Nối 1 nến (trả series mới), giữ tối đa max_len nến cuối."""
+        width = len(KLINE_COLUMNS)
+        row = list(row[:width]) + [0] * (width - len(row))
+        start = max(0, len(self) + 1 - max_len) if max_len else 0
+        return KlineSeries(*(
+            np.append(getattr(self, c)[start:], np.array(v, dtype=np.float64).astype(dt))
+            for (c, dt), v in zip(KLINE_COLUMNS, row)
+        ))
+
+    # ---------- đổi khung ----------
+    def resample(self, step_ms: int) -> "KlineSeries":
+        """
+        Gộp sang khung lớn hơn (vd 1m -> 15m, 15m -> 4h), căn mốc theo epoch UTC như Binance (khung ≤ 1d).
+        Vector hoá bằng ufunc.reduceat; bỏ nhóm đầu nếu cửa sổ bắt đầu giữa chừng.
+        Nhóm cuối chứa nến đang chạy -> là nến đang chạy của khung lớn.
+        """
+        if not self:
+            return self
+        bucket = self.open_time - self.open_time % step_ms
+        if self.open_time[0] != bucket[0]:
+            first = int(np.searchsorted(bucket, bucket[0], side="right"))
+            return self[first:].resample(step_ms) if first < len(self) else KlineSeries.empty()
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        ends = np.r_[starts[1:], len(self)] - 1
+        open_time = bucket[starts]
+        return KlineSeries(
+            open_time,
+            self.open[starts],
+            np.maximum.reduceat(self.high, starts),
+            np.minimum.reduceat(self.low, starts),
+            self.close[ends],
+            np.add.reduceat(self.volume, starts),
+            open_time + (step_ms - 1),
+            np.add.reduceat(self.quote_volume, starts),
+            np.add.reduceat(self.trades, starts),
+        )
+
+    def __repr__(self) -> str:
+        return f"KlineSeries({len(self)} bars, last_open={self.last_open_time})"
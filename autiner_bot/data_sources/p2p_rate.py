@@ -0,0 +1,91 @@
+# autiner_bot/data_sources/p2p_rate.py
+"""
+Tỷ giá USDT/VND từ sổ quảng cáo P2P Binance.
+- Giá đại diện: trung vị có trọng số theo khối lượng rao bán của top quảng cáo
+  (ít bị kéo bởi vài quảng cáo giá lệch như trung bình cộng).
+- Cache ttl, hết hạn thì trả giá cũ và làm mới nền.
+- Lỗi mạng / sổ trống: giữ giá tốt gần nhất thay vì 0.0.
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import time
+
+
+def _f(v) -> Optional[float]:
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        return None
+    return x if x > 0 else None
+
+
+def parse_ads(advs: List[dict], top: int) -> List[Tuple[float, float]]:
+    """[(price, weight)] của top quảng cáo; weight = lượng USDT còn rao (1.0 nếu thiếu)."""
+    out = []
+    for item in advs[:top]:
+        adv = item.get("adv") or {}
+        price = _f(adv.get("price"))
+        if price is None:
+            continue
+        qty = _f(adv.get("tradableQuantity")) or _f(adv.get("surplusAmount")) or 1.0
+        out.append((price, qty))
+    return out
+
+
+def weighted_median(points: List[Tuple[float, float]]) -> float:
+    if not points:
+        return 0.0
+    points = sorted(points)
+    half = sum(w for _, w in points) / 2.0
+    acc = 0.0
+    for price, w in points:
+        acc += w
+        if acc >= half:
+            return price
+    return points[-1][0]
+
+
+class P2PRateProvider:
+    def __init__(self, fetch_ads: Callable[[], Awaitable[List[dict]]], ttl: float, top: int = 10):
+        self._fetch_ads = fetch_ads
+        self.ttl = ttl
+        self.top = top
+        self.rate = 0.0               # giá tốt gần nhất
+        self.updated_at = 0.0
+        self._bg: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+
+    def age(self) -> float:
+        return time.monotonic() - self.updated_at if self.rate else float("inf")
+
+    async def get(self, ttl: Optional[float] = None) -> float:
+        ttl = self.ttl if ttl is None else ttl
+        if self.rate:
+            if self.age() <= ttl:
+                self.stats["hits"] += 1
+            else:
+                self.stats["stale_hits"] += 1
+                self.refresh_in_background()
+            return self.rate
+        self.stats["misses"] += 1
+        return await self.refresh()
+
+    async def refresh(self) -> float:
+        """Tải sổ quảng cáo; trả giá mới, hoặc giá tốt gần nhất nếu lỗi."""
+        try:
+            advs = await self._fetch_ads()
+            rate = weighted_median(parse_ads(advs or [], self.top))
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[ERROR] p2p rate refresh: {e}")
+            return self.rate
+        self.stats["refreshes"] += 1
+        if rate:
+            self.rate = rate
+            self.updated_at = time.monotonic()
+        return self.rate
+
+    def refresh_in_background(self) -> None:
+        if self._bg is None or self._bg.done():
+            self._bg = asyncio.get_running_loop().create_task(self.refresh())
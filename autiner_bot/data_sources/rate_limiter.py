@@ -0,0 +1,137 @@
+# autiner_bot/data_sources/rate_limiter.py
+"""
+Giới hạn request-weight phía client cho Binance Futures.
+- Token bucket theo weight/phút (ticker/24hr = 40, klines theo limit...).
+- Đồng bộ với weight server báo (X-MBX-USED-WEIGHT-1M).
+- 429/418: tôn trọng Retry-After, chặn mọi request tới khi hết hạn.
+- Ưu tiên: việc nền (poller, scan) phải chừa lại phần dự trữ cho user,
+  chờ trong hàng hoặc bị bỏ (shed) trước khi đụng tới request của user.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Mapping, Optional
+import asyncio
+import time
+
+PRIORITY_USER = "user"
+PRIORITY_BACKGROUND = "background"
+
+_priority: ContextVar[str] = ContextVar("binance_priority", default=PRIORITY_USER)
+
+
+@contextmanager
+def background_priority():
+    """Đánh dấu các request trong khối là việc nền (ưu tiên thấp)."""
+    token = _priority.set(PRIORITY_BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class BinanceRateLimited(Exception):
+    """Không gửi request: đang bị Binance chặn, hoặc việc nền bị bỏ để giữ weight cho user."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# =============================
+# Weight theo endpoint
+# =============================
+def endpoint_weight(path: str, params: Optional[Mapping] = None) -> int:
+    params = params or {}
+    if path.endswith("/ticker/24hr"):
+        return 1 if params.get("symbol") else 40
+    if path.endswith("/ticker/price") or path.endswith("/ticker/bookTicker"):
+        return 1 if params.get("symbol") else 2
+    if path.endswith("/klines"):
+        limit = int(params.get("limit") or 500)
+        if limit < 100:
+            return 1
+        if limit < 500:
+            return 2
+        if limit <= 1000:
+            return 5
+        return 10
+    return 1
+
+
+# =============================
+# Token bucket
+# =============================
+class WeightLimiter:
+    def __init__(self, limit_per_min: int, reserve_ratio: float = 0.25,
+                 max_wait_user: float = 10.0, max_wait_background: float = 30.0):
+        self.capacity = float(limit_per_min)
+        self.rate = limit_per_min / 60.0
+        self.reserve = self.capacity * reserve_ratio
+        self.max_wait = {PRIORITY_USER: max_wait_user, PRIORITY_BACKGROUND: max_wait_background}
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.server_used = 0
+        self.stats: Dict[str, int] = {
+            "acquired": 0, "waited": 0, "shed": 0, "rejected": 0, "http_429": 0, "http_418": 0,
+        }
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def blocked_for(self) -> float:
+        """Số giây còn bị Binance chặn (0 nếu không)."""
+        return max(0.0, self.blocked_until - time.monotonic())
+
+    async def acquire(self, weight: int, priority: Optional[str] = None) -> None:
+        priority = priority or current_priority()
+        floor = self.reserve if priority == PRIORITY_BACKGROUND else 0.0
+        deadline = time.monotonic() + self.max_wait[priority]
+        waited = False
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                delay = self.blocked_until - now
+            else:
+                self._refill(now)
+                if self.tokens - weight >= floor:
+                    self.tokens -= weight
+                    self.stats["acquired"] += 1
+                    self.stats["waited"] += int(waited)
+                    return
+                delay = (weight + floor - self.tokens) / self.rate
+
+            if now + delay > deadline:
+                if priority == PRIORITY_BACKGROUND:
+                    self.stats["shed"] += 1
+                    raise BinanceRateLimited("background request shed", delay)
+                self.stats["rejected"] += 1
+                raise BinanceRateLimited("Binance weight limit reached", delay)
+            waited = True
+            await asyncio.sleep(min(delay, 1.0))
+
+    def observe(self, status: int, headers: Mapping) -> None:
+        """Gọi sau mỗi response: đồng bộ weight đã dùng, xử lý 429/418."""
+        used = headers.get("X-MBX-USED-WEIGHT-1M") or headers.get("x-mbx-used-weight-1m")
+        if used is not None:
+            try:
+                self.server_used = int(used)
+                self._refill(time.monotonic())
+                self.tokens = min(self.tokens, self.capacity - self.server_used)
+            except ValueError:
+                pass
+        if status in (429, 418):
+            self.stats["http_429" if status == 429 else "http_418"] += 1
+            try:
+                retry_after = float(headers.get("Retry-After") or 0)
+            except ValueError:
+                retry_after = 0.0
+            retry_after = retry_after or (60.0 if status == 429 else 120.0)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.tokens = 0.0
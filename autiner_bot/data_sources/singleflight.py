@@ -0,0 +1,64 @@
+# autiner_bot/data_sources/singleflight.py
+"""
+Gộp request trùng lặp (single-flight).
+- Nhiều caller cùng key trong cùng lúc -> chỉ 1 lần gọi thật, các caller khác chờ chung future.
+- Có thống kê số lần gọi / số lần được gộp.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.stats: Dict[str, int] = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats["calls"] += 1
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.stats["coalesced"] += 1
+            # shield: 1 caller bị huỷ không huỷ kết quả của các caller khác
+            return await asyncio.shield(fut)
+
+        self.stats["executed"] += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            if not fut.done():
+                fut.cancel()
+            raise
+        except BaseException as e:
+            if not fut.done():
+                fut.set_exception(e)
+                fut.exception()  # đánh dấu đã đọc, tránh warning khi không ai chờ
+            raise
+        else:
+            if not fut.done():
+                fut.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+
+# =============================
+# Registry (để xem thống kê)
+# =============================
+_REGISTRY: Dict[str, SingleFlight] = {}
+
+
+def new_group(name: str) -> SingleFlight:
+    sf = SingleFlight(name)
+    _REGISTRY[name] = sf
+    return sf
+
+
+def all_stats() -> Dict[str, Dict[str, int]]:
+    return {name: dict(sf.stats, inflight=sf.inflight()) for name, sf in _REGISTRY.items()}
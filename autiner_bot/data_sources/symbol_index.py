@@ -0,0 +1,72 @@
+# autiner_bot/data_sources/symbol_index.py
+"""
+Index symbol dựng sẵn từ snapshot ticker 24h.
+- by_symbol: symbol -> Ticker (tra O(1); giá/volume đã là float trong Ticker)
+- best_prefix: tiền tố -> symbol USDT có quoteVolume lớn nhất (tính trước, tra O(1))
+Dựng lại khi snapshot đổi (list ticker mới). Websocket cập nhật Ticker tại chỗ nên giá trong
+by_symbol luôn mới; thứ hạng volume (best_prefix, usdt_by_volume) xếp lại tối đa 1 lần / RERANK_SEC.
+"""
+
+from typing import Dict, List, Optional
+import time
+
+from autiner_bot.data_sources.models import Ticker
+
+
+def _volume(t: Ticker) -> float:
+    return t.quote_volume or t.volume
+
+
+class SymbolIndex:
+    __slots__ = ("by_symbol", "best_prefix", "usdt_by_volume")
+
+    def __init__(self, tickers: List[Ticker]):
+        self.by_symbol: Dict[str, Ticker] = {t.symbol: t for t in tickers if t.symbol}
+        # Symbol USDT sắp theo quoteVolume giảm dần -> symbol đầu tiên gặp cho mỗi tiền tố là tốt nhất
+        self.usdt_by_volume: List[str] = sorted(
+            (s for s in self.by_symbol if s.endswith("USDT")),
+            key=lambda s: _volume(self.by_symbol[s]),
+            reverse=True,
+        )
+        self.best_prefix: Dict[str, str] = {}
+        for sym in self.usdt_by_volume:
+            for i in range(len(sym) + 1):
+                self.best_prefix.setdefault(sym[:i], sym)
+
+    def __len__(self) -> int:
+        return len(self.by_symbol)
+
+    def get(self, symbol: str) -> Optional[Ticker]:
+        return self.by_symbol.get(symbol)
+
+    def price(self, symbol: str) -> Optional[float]:
+        t = self.by_symbol.get(symbol)
+        return t.last_price if t is not None else None
+
+    def volume(self, symbol: str) -> float:
+        t = self.by_symbol.get(symbol)
+        return _volume(t) if t is not None else 0.0
+
+    def resolve(self, query_base: str) -> Optional[str]:
+        """
+        1) Ưu tiên exact: BASEUSDT
+        2) Nếu không có, symbol USDT bắt đầu bằng BASE có quoteVolume lớn nhất.
+        """
+        exact = f"{query_base}USDT"
+        if exact in self.by_symbol:
+            return exact
+        return self.best_prefix.get(query_base)
+
+
+# ---------- dựng lại khi snapshot đổi ----------
+RERANK_SEC = 30.0
+_INDEX_CACHE = {"src": None, "index": SymbolIndex([]), "built_at": 0.0}
+
+
+def get_symbol_index(tickers: List[Ticker]) -> SymbolIndex:
+    now = time.monotonic()
+    if tickers is not _INDEX_CACHE["src"] or now - _INDEX_CACHE["built_at"] >= RERANK_SEC:
+        _INDEX_CACHE["index"] = SymbolIndex(tickers or [])
+        _INDEX_CACHE["src"] = tickers
+        _INDEX_CACHE["built_at"] = now
+    return _INDEX_CACHE["index"]
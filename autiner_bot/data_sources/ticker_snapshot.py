@@ -0,0 +1,120 @@
+# autiner_bot/data_sources/ticker_snapshot.py
+"""
+Snapshot ticker 24h dùng chung (1 lớp cache duy nhất).
+- Stale-while-revalidate: hết ttl vẫn trả snapshot cũ ngay, refresh chạy nền.
+- Quá max_stale (hoặc chưa có dữ liệu) thì mới chờ tải.
+- Có đếm hit/stale/miss và tuổi snapshot.
+- Listener (vd: cảnh báo giá) nhận các ticker vừa đổi sau mỗi lần cập nhật.
+- merge (websocket, ~1 lần/giây): cập nhật tại chỗ các Ticker đã có, giữ nguyên list
+  -> không dựng lại list / SymbolIndex mỗi frame; chỉ khi có symbol mới mới tạo list mới.
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import time
+
+from autiner_bot.data_sources.models import Ticker
+from autiner_bot.data_sources.singleflight import new_group
+
+
+class TickerSnapshot:
+    def __init__(self, fetch: Callable[[], Awaitable[list]], ttl: float, max_stale: float):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.data: List[Ticker] = []
+        self.updated_at: float = 0.0   # time.monotonic() lúc cập nhật
+        self._flight = new_group("ticker_24hr")
+        self._bg: Optional[asyncio.Task] = None
+        self.stats: Dict[str, int] = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0, "pushes": 0}
+        self._listeners: List[Callable[[List[Ticker]], None]] = []
+        self._by_symbol: Dict[str, Ticker] = {}
+        self._by_symbol_src: Optional[List[Ticker]] = None   # list mà _by_symbol đang phản ánh
+
+    def age(self) -> float:
+        """Tuổi snapshot (giây); vô cực nếu chưa có."""
+        return time.monotonic() - self.updated_at if self.data else float("inf")
+
+    async def get(self, ttl: Optional[float] = None) -> List[Ticker]:
+        ttl = self.ttl if ttl is None else ttl
+        age = self.age()
+        if age <= ttl:
+            self.stats["hits"] += 1
+            return self.data
+        if age <= self.max_stale:
+            self.stats["stale_hits"] += 1
+            self.refresh_in_background()
+            return self.data
+        self.stats["misses"] += 1
+        return await self.refresh()
+
+    async def refresh(self) -> List[Ticker]:
+        """Tải snapshot mới (gộp các lần gọi trùng)."""
+        return await self._flight.do("all", self._do_refresh)
+
+    def refresh_in_background(self) -> None:
+        if self._bg is None or self._bg.done():
+            self._bg = asyncio.get_running_loop().create_task(self._refresh_quiet())
+
+    def subscribe(self, fn: Callable[[List[Ticker]], None]) -> None:
+        """fn(changed) chạy đồng bộ trên event loop sau mỗi lần cập nhật; phải nhanh."""
+        if fn not in self._listeners:
+            self._listeners.append(fn)
+
+    def unsubscribe(self, fn: Callable[[List[Ticker]], None]) -> None:
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def set(self, data: List[Ticker], changed: Optional[List[Ticker]] = None) -> None:
+        self.data = data
+        self._touch(data if changed is None else changed)
+
+    def merge(self, updates: List[Ticker]) -> None:
+        """Gộp các ticker đổi (từ websocket) vào snapshot hiện tại, cập nhật tại chỗ."""
+        if not updates:
+            return
+        if self._by_symbol_src is not self.data:
+            self._by_symbol = {t.symbol: t for t in self.data}
+            self._by_symbol_src = self.data
+        by_symbol = self._by_symbol
+        changed, added = [], []
+        for t in updates:
+            cur = by_symbol.get(t.symbol)
+            if cur is None:
+                by_symbol[t.symbol] = t
+                added.append(t)
+                changed.append(t)
+            else:
+                cur.update_from(t)
+                changed.append(cur)
+        if added:
+            # symbol mới niêm yết (hiếm): list mới -> index dựng lại
+            self.data = self._by_symbol_src = self.data + added
+        self.stats["pushes"] += 1
+        self._touch(changed)
+
+    def _touch(self, changed: List[Ticker]) -> None:
+        self.updated_at = time.monotonic()
+        for fn in self._listeners:
+            try:
+                fn(changed)
+            except Exception as e:
+                print(f"[ERROR] ticker listener {getattr(fn, '__name__', fn)}: {e}")
+
+    async def _do_refresh(self) -> List[Ticker]:
+        try:
+            data = await self._fetch()
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        self.stats["refreshes"] += 1
+        if isinstance(data, list) and data:
+            self.set(data)
+            return data
+        return self.data if self.age() <= self.max_stale else []
+
+    async def _refresh_quiet(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            print(f"[ERROR] ticker snapshot refresh: {e}")
@@ -0,0 +1,73 @@
+# autiner_bot/dispatcher.py
+"""
+Điều phối update Telegram.
+- Số worker cố định -> giới hạn số phân tích chạy đồng thời.
+- FIFO theo chat: mỗi chat chỉ 1 worker xử lý tại 1 thời điểm, đúng thứ tự tin nhắn.
+- Giới hạn tổng số update chờ và số update chờ / chat; vượt -> submit trả False (caller báo quá tải).
+"""
+
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List
+import asyncio
+import logging
+
+log = logging.getLogger("autiner.dispatcher")
+
+
+class UpdateDispatcher:
+    def __init__(self, process: Callable[[Any], Awaitable[None]], workers: int,
+                 max_pending: int, max_per_chat: int):
+        self._process = process
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_per_chat = max_per_chat
+        self._chats: Dict[Hashable, Deque[Any]] = {}
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self.pending = 0
+        self.in_flight = 0
+        self.stats: Dict[str, int] = {"accepted": 0, "rejected": 0, "processed": 0, "errors": 0}
+
+    def submit(self, chat_key: Hashable, item: Any) -> bool:
+        q = self._chats.get(chat_key)
+        if self.pending >= self.max_pending or (q is not None and len(q) >= self.max_per_chat):
+            self.stats["rejected"] += 1
+            return False
+        if q is None:
+            # chat chưa có trong hàng chờ và không worker nào đang giữ -> đưa vào ready
+            q = self._chats[chat_key] = deque()
+            self._ready.put_nowait(chat_key)
+        q.append(item)
+        self.pending += 1
+        self.stats["accepted"] += 1
+        return True
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            chat_key = await self._ready.get()
+            q = self._chats[chat_key]
+            item = q.popleft()
+            self.pending -= 1
+            self.in_flight += 1
+            try:
+                await self._process(item)
+                self.stats["processed"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                log.exception("dispatcher worker %s error: %s", n, e)
+            finally:
+                self.in_flight -= 1
+                if q:
+                    self._ready.put_nowait(chat_key)  # xếp cuối hàng -> công bằng giữa các chat
+                else:
+                    del self._chats[chat_key]
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.get_running_loop().create_task(self._worker(n)) for n in range(self.workers)]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
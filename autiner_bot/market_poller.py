@@ -0,0 +1,110 @@
+# autiner_bot/market_poller.py
+"""
+Poller nền (APScheduler) chạy trên bot_loop.
+- Làm mới snapshot ticker 24h, tỷ giá P2P USDT/VND, nến của top-N symbol theo quoteVolume.
+- Nạp nến mới đóng cho các symbol có cảnh báo RSI (để kiểm tra RSI trên mỗi tick là O(1)).
+- Ghi gộp nến đã đóng đang chờ xuống kho đĩa trong thread (không chặn loop).
+- Handler của user chỉ đọc dữ liệu đã nóng trong RAM.
+"""
+
+from typing import Optional
+import asyncio
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from autiner_bot.settings import S
+from autiner_bot.alerts import ALERTS
+from autiner_bot.data_sources.binance import TICKERS, get_kline, refresh_usdt_vnd_rate, warm_indicators
+from autiner_bot.data_sources.binance_ws import STREAM
+from autiner_bot.data_sources.kline_cache import KLINES
+from autiner_bot.data_sources.rate_limiter import background_priority
+from autiner_bot.data_sources.symbol_index import get_symbol_index
+from autiner_bot.utils.time_utils import VN_TZ, get_vietnam_time
+
+_scheduler: Optional[AsyncIOScheduler] = None
+
+
+# =============================
+# Jobs
+# =============================
+async def refresh_tickers():
+    if STREAM.is_live():
+        return  # websocket đang đẩy ticker, không tốn weight REST
+    try:
+        with background_priority():
+            await TICKERS.refresh()
+    except Exception as e:
+        print(f"[ERROR] poller tickers: {e}")
+
+
+async def refresh_p2p_rate():
+    await refresh_usdt_vnd_rate()
+
+
+async def refresh_top_klines(top_n: Optional[int] = None):
+    top_n = S.POLL_TOP_N if top_n is None else top_n
+    symbols = get_symbol_index(TICKERS.data).usdt_by_volume[:top_n]
+    if not symbols:
+        return
+    if S.BINANCE_WS_ENABLED:
+        await STREAM.set_kline_symbols(symbols)
+    # Stream sống: nến đã được đẩy liên tục, REST chỉ seed symbol mới / bù khi lệch
+    max_age = None if STREAM.is_live() else 0
+    sem = asyncio.Semaphore(S.POLL_CONCURRENCY)
+
+    async def _one(sym: str):
+        async with sem:
+            await get_kline(sym, S.POLL_KLINE_INTERVAL, S.POLL_KLINE_LIMIT, max_age=max_age)
+
+    with background_priority():
+        await asyncio.gather(*(_one(s) for s in symbols))
+
+
+async def refresh_alert_indicators():
+    symbols = ALERTS.symbols("rsi")
+    if not symbols:
+        return
+    sem = asyncio.Semaphore(S.POLL_CONCURRENCY)
+
+    async def _one(sym: str):
+        async with sem:
+            await warm_indicators(sym, S.ALERTS_RSI_INTERVAL)
+
+    with background_priority():
+        await asyncio.gather(*(_one(s) for s in symbols))
+
+
+async def flush_kline_store():
+    pending = KLINES.take_pending()
+    if pending:
+        await asyncio.to_thread(KLINES.write_pending, pending)
+
+
+# =============================
+# Start / stop
+# =============================
+def start_market_poller(loop: Optional[asyncio.AbstractEventLoop] = None) -> AsyncIOScheduler:
+    """Gọi trong init_bot (đang chạy trên bot_loop)."""
+    global _scheduler
+    if _scheduler is not None and _scheduler.running:
+        return _scheduler
+
+    _scheduler = AsyncIOScheduler(event_loop=loop or asyncio.get_running_loop(), timezone=VN_TZ)
+    now = get_vietnam_time()
+    opts = {"max_instances": 1, "coalesce": True, "misfire_grace_time": 30, "next_run_time": now}
+    _scheduler.add_job(refresh_tickers, "interval", seconds=S.POLL_TICKERS_SEC, id="tickers", **opts)
+    _scheduler.add_job(refresh_p2p_rate, "interval", seconds=S.POLL_P2P_SEC, id="p2p_rate", **opts)
+    _scheduler.add_job(refresh_top_klines, "interval", seconds=S.POLL_KLINES_SEC, id="top_klines", **opts)
+    if KLINES.store is not None:
+        _scheduler.add_job(flush_kline_store, "interval", seconds=S.KLINE_STORE_FLUSH_SEC, id="kline_store", **opts)
+    if S.ALERTS_ENABLED:
+        _scheduler.add_job(refresh_alert_indicators, "interval", seconds=S.POLL_KLINES_SEC, id="alert_indicators", **opts)
+    _scheduler.start()
+    return _scheduler
+
+
+def stop_market_poller() -> None:
+    global _scheduler
+    if _scheduler is not None and _scheduler.running:
+        _scheduler.shutdown(wait=False)
+    _scheduler = None
@@ -1,30 +1,24 @@
 from telegram import ReplyKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 from autiner_bot.utils import state
+from autiner_bot import metrics
 from autiner_bot.data_sources.binance import (
     get_usdt_vnd_rate,
     analyze_coin,
     get_all_futures,
+    live_rsi,
+    warm_indicators,
+    LIMITER,
 )
+from autiner_bot.alerts import ALERTS, ABOVE, BELOW, Alert
+from autiner_bot.data_sources.symbol_index import get_symbol_index
+from autiner_bot.signal_generator import cached_scan
+from autiner_bot.settings import S
 from autiner_bot.utils.time_utils import get_vietnam_time
 
 import re
 import time
 
-# ====== Cache ticker 24h để tránh 429 ======
-_ALL_TICKERS_CACHE = {"ts": 0, "data": []}
-
-async def _get_all_futures_cached(ttl: int = 10):
-    """Cache danh sách futures trong ttl giây."""
-    now = int(time.time())
-    if now - _ALL_TICKERS_CACHE["ts"] <= ttl and _ALL_TICKERS_CACHE["data"]:
-        return _ALL_TICKERS_CACHE["data"]
-    data = await get_all_futures(ttl=ttl)  # đã có cache ở layer data_sources
-    if data:
-        _ALL_TICKERS_CACHE["ts"] = now
-        _ALL_TICKERS_CACHE["data"] = data
-    return data
-
 # ===== Helpers =====
 def _clean_symbol(text: str) -> str:
     """
@@ -44,106 +38,152 @@ def _clean_symbol(text: str) -> str:
         t = t + "USDT"
     return t
 
-def _prefer_symbol(query_base: str, futures_list: list) -> str | None:
-    """
-    Chọn symbol tốt nhất:
-      1) Ưu tiên exact: BASEUSDT
-      2) Nếu không có, tìm symbol bắt đầu bằng BASE, sort theo quoteVolume giảm dần.
-    """
-    exact = f"{query_base}USDT"
-    have = [c.get("symbol") for c in futures_list]
-    if exact in have:
-        return exact
-
-    candidates = []
-    for c in futures_list:
-        sym = c.get("symbol", "")
-        if sym.startswith(query_base) and sym.endswith("USDT"):
-            try:
-                vol = float(c.get("quoteVolume") or c.get("volume") or 0.0)
-            except Exception:
-                vol = 0.0
-            candidates.append((sym, vol))
-    if not candidates:
-        return None
-    candidates.sort(key=lambda x: x[1], reverse=True)
-    return candidates[0][0]
+# ===== Giãn cách phân tích theo user =====
+_LAST_ANALYSIS: dict = {}
+
+def _throttle_wait(user_id) -> float:
+    """Số giây user còn phải chờ trước lần phân tích tiếp theo (0 = được phép, và ghi nhận lần này)."""
+    if not user_id or S.USER_MIN_INTERVAL <= 0:
+        return 0.0
+    now = time.monotonic()
+    wait = S.USER_MIN_INTERVAL - (now - _LAST_ANALYSIS.get(user_id, -S.USER_MIN_INTERVAL))
+    if wait > 0:
+        return wait
+    if len(_LAST_ANALYSIS) > 10_000:
+        cutoff = now - S.USER_MIN_INTERVAL
+        for uid in [u for u, t in _LAST_ANALYSIS.items() if t < cutoff]:
+            del _LAST_ANALYSIS[uid]
+    _LAST_ANALYSIS[user_id] = now
+    return 0.0
+
+def _chat_id(update: Update):
+    chat = update.effective_chat
+    return chat.id if chat else None
 
 def _format_price(v: float, unit: str) -> str:
     return f"{v:,.0f}" if unit == "VND" else f"{v:,.2f}"
 
 # ==== Tạo menu ====
-def get_reply_menu():
-    s = state.get_state()
-    # Dùng nhãn USDT cho đúng bản chất
-    currency_btn = "💵 USDT Mode" if s.get("currency_mode") == "VND" else "💴 VND Mode"
+def get_reply_menu(chat_id=None):
+    # Nút đổi sang đơn vị còn lại của chat (trạng thái đọc từ LRU, không đụng DB)
+    currency_btn = "💵 USDT Mode" if state.get_currency_mode(chat_id) == "VND" else "💴 VND Mode"
     keyboard = [["🔍 Trạng thái", currency_btn]]
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
 
 # ==== /start ====
+@metrics.timed()
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    s = state.get_state()
-    unit = "VND" if s.get("currency_mode") == "VND" else "USDT"
+    chat_id = _chat_id(update)
+    unit = state.get_currency_mode(chat_id)
     msg = (
         f"📡 Bot thủ công Binance Futures\n"
         f"• Đơn vị hiển thị: {unit}\n"
-        f"👉 Gõ tên coin để phân tích (vd: op, btc, eth, 1000shib...)"
+        f"👉 Gõ tên coin để phân tích (vd: op, btc, eth, 1000shib...)\n"
+        f"👉 /scan để quét toàn thị trường\n"
+        f"👉 /alert btc > 70000 | /alert eth pct < -5 | /alert op rsi < 30 để đặt cảnh báo\n"
+        f"👉 /watch btc eth để theo dõi, /watch xem giá, /unwatch btc để bỏ"
     )
-    await update.message.reply_text(msg, reply_markup=get_reply_menu())
+    await update.message.reply_text(msg, reply_markup=get_reply_menu(chat_id))
+
+# ==== /scan: quét toàn thị trường ====
+def format_scan_result(res: dict, unit: str = "USDT", vnd_rate: float = 0.0) -> str:
+    def _lines(items):
+        out = []
+        for i, r in enumerate(items, 1):
+            price = r.get("price") or 0.0
+            disp = price * vnd_rate if vnd_rate else price
+            out.append(
+                f"{i}. {r['symbol'].replace('USDT', '/' + unit)} — {r['strength']}% "
+                f"| {_format_price(disp, unit)} {unit} | 24h {r['change_pct']:+.2f}%"
+            )
+        return "\n".join(out) or "—"
+
+    return (
+        f"🔎 Quét {res.get('scanned', 0)} cặp Binance Futures ({res.get('elapsed', 0)}s)\n\n"
+        f"🟢 LONG mạnh nhất:\n{_lines(res.get('long', []))}\n\n"
+        f"🔴 SHORT mạnh nhất:\n{_lines(res.get('short', []))}\n\n"
+        f"🕒 {get_vietnam_time().strftime('%H:%M %d/%m/%Y')}"
+    )
+
+@metrics.timed()
+async def scan_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = _chat_id(update)
+    user = update.effective_user
+    wait = _throttle_wait(user.id if user else None)
+    if wait > 0:
+        await update.message.reply_text(f"⏳ Chậm lại chút nhé, thử lại sau {wait:.0f}s.")
+        return
+    await update.message.reply_text("⏳ Đang quét toàn thị trường…")
+    res = await cached_scan(S.SCAN_TOP_K)
+    if not res.get("scanned"):
+        await update.message.reply_text("⚠️ Không lấy được dữ liệu từ Binance Futures. Thử lại sau nhé.")
+        return
+    unit = state.get_currency_mode(chat_id)
+    vnd_rate = await get_usdt_vnd_rate() if unit == "VND" else 0.0
+    if not vnd_rate:
+        unit = "USDT"
+    await update.message.reply_text(format_scan_result(res, unit, vnd_rate), reply_markup=get_reply_menu(chat_id))
 
 # ==== Xử lý input ====
+@metrics.timed()
 async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = (update.message.text or "").strip()
+    chat_id = _chat_id(update)
 
     # Đổi đơn vị USDT/VND
     tl = text.lower()
     if tl in ["💴 vnd mode", "💵 usdt mode"]:
         new_mode = "VND" if "vnd" in tl else "USDT"
-        state.set_currency_mode(new_mode)
-        await update.message.reply_text(f"💱 Đã chuyển sang {new_mode}", reply_markup=get_reply_menu())
+        state.set_currency_mode(chat_id, new_mode)
+        await update.message.reply_text(f"💱 Đã chuyển sang {new_mode}", reply_markup=get_reply_menu(chat_id))
         return
 
     # Trạng thái
     if tl == "🔍 trạng thái":
-        s = state.get_state()
-        unit = "VND" if s.get("currency_mode") == "VND" else "USDT"
-        await update.message.reply_text(f"📡 Binance Futures\n• Đơn vị: {unit}", reply_markup=get_reply_menu())
+        unit = state.get_currency_mode(chat_id)
+        await update.message.reply_text(f"📡 Binance Futures\n• Đơn vị: {unit}", reply_markup=get_reply_menu(chat_id))
         return
 
-    # Lấy danh sách futures (có cache)
-    all_coins = await _get_all_futures_cached(ttl=10)
+    # Giãn cách: mỗi user tối đa 1 lần phân tích / USER_MIN_INTERVAL giây
+    user = update.effective_user
+    wait = _throttle_wait(user.id if user else None)
+    if wait > 0:
+        await update.message.reply_text(f"⏳ Chậm lại chút nhé, thử lại sau {wait:.0f}s.")
+        return
+
+    # Lấy danh sách futures (snapshot dùng chung, trả ngay kể cả khi đang refresh nền)
+    all_coins = await get_all_futures()
     if not all_coins:
+        blocked = LIMITER.blocked_for()
+        if blocked:
+            await update.message.reply_text(f"⏳ Binance đang giới hạn request, thử lại sau ~{int(blocked) + 1}s nhé.")
+            return
         await update.message.reply_text("⚠️ Không lấy được dữ liệu từ Binance Futures. Thử lại sau nhé.")
         return
 
     # Chuẩn hoá và chọn symbol
     cleaned = _clean_symbol(text)               # "OP" -> "OPUSDT"
     query_base = cleaned.replace("USDT", "")    # "OP"
-    symbol = _prefer_symbol(query_base, all_coins)
+    index = get_symbol_index(all_coins)
+    symbol = index.resolve(query_base)
     if not symbol:
         await update.message.reply_text(f"⚠️ Không tìm thấy {query_base} trên Binance Futures.")
         return
 
     # Tìm 24h record của symbol
-    coin = None
-    for c in all_coins:
-        if c.get("symbol") == symbol:
-            coin = c
-            break
+    coin = index.get(symbol)
     if not coin:
         await update.message.reply_text(f"⚠️ Thiếu dữ liệu 24h cho {symbol}.")
         return
 
-    # Giá hiện tại
-    try:
-        price = float(coin.get("lastPrice"))
-    except Exception:
+    # Giá hiện tại (Ticker đã là float)
+    price = coin.last_price
+    if price is None:
         await update.message.reply_text(f"⚠️ Không đọc được giá của {symbol}.")
         return
 
     # Đơn vị hiển thị & tỷ giá
-    s = state.get_state()
-    unit = "VND" if s.get("currency_mode") == "VND" else "USDT"
+    unit = state.get_currency_mode(chat_id)
     vnd_rate = 0.0
     if unit == "VND":
         try:
@@ -151,7 +191,7 @@ async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except Exception:
             vnd_rate = 0.0
 
-    # Phân tích
+    # Phân tích (nhớ theo nến đóng cuối; giá, TP/SL, quy đổi VND tính lại mỗi lần bên dưới)
     trend = await analyze_coin(symbol)
     if not trend:
         await update.message.reply_text(f"⚠️ Không phân tích được {symbol}.")
@@ -180,4 +220,190 @@ async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"📌 Lý do: {reason}\n"
         f"🕒 Thời gian: {get_vietnam_time().strftime('%H:%M %d/%m/%Y')}"
     )
-    await update.message.reply_text(msg, reply_markup=get_reply_menu())
+    await update.message.reply_text(msg, reply_markup=get_reply_menu(chat_id))
+
+# ==== Cảnh báo: /alert, /alerts, /unalert ====
+_ALERT_RE = re.compile(
+    r"^(?P<sym>[^\s<>=]+)\s*(?P<metric>giá|gia|price|pct|rsi)?\s*(?P<op>>=|<=|>|<)?\s*"
+    r"(?P<val>[-+]?[\d.,]+)\s*(?P<pct>%)?$",
+    re.IGNORECASE,
+)
+_METRIC_ALIASES = {"giá": "price", "gia": "price", "price": "price", "pct": "pct", "rsi": "rsi"}
+_ALERT_USAGE = (
+    "🔔 Cách đặt cảnh báo:\n"
+    "• /alert btc > 70000 (giá USDT)\n"
+    "• /alert eth pct < -5 (hoặc /alert eth -5%: % thay đổi 24h)\n"
+    "• /alert op rsi < 30 (RSI {itv})\n"
+    "Không ghi > / < thì tự chọn theo giá trị hiện tại.\n"
+    "/alerts xem danh sách • /unalert <id> hoặc /unalert all để xoá"
+)
+
+def _parse_alert(text: str):
+    """"btc > 70000" -> ("btc", "price", ">", 70000.0); ValueError nếu sai cú pháp."""
+    m = _ALERT_RE.match((text or "").strip())
+    if not m:
+        raise ValueError(text)
+    metric = _METRIC_ALIASES.get((m.group("metric") or "").lower(), "pct" if m.group("pct") else "price")
+    value = float(m.group("val").replace(",", ""))
+    return m.group("sym"), metric, m.group("op"), value
+
+def _fmt_num(v: float) -> str:
+    return f"{v:,.2f}" if abs(v) >= 1 else f"{v:.8g}"
+
+def _fmt_alert_value(metric: str, v: float) -> str:
+    return f"{v:+.2f}%" if metric == "pct" else _fmt_num(v)
+
+def format_alert(alert: Alert) -> str:
+    name = alert.symbol.replace("USDT", "/USDT")
+    label = {"price": "giá", "pct": "24h", "rsi": f"RSI {S.ALERTS_RSI_INTERVAL}"}[alert.metric]
+    op = "≥" if alert.direction == ABOVE else "≤"
+    return f"#{alert.id} {name} {label} {op} {_fmt_alert_value(alert.metric, alert.threshold)}"
+
+def format_alert_fired(alert: Alert, value: float) -> str:
+    return (
+        f"🔔 Cảnh báo {format_alert(alert)}\n"
+        f"• Hiện tại: {_fmt_alert_value(alert.metric, value)}\n"
+        f"🕒 {get_vietnam_time().strftime('%H:%M %d/%m/%Y')}"
+    )
+
+@metrics.timed()
+async def alert_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    usage = _ALERT_USAGE.format(itv=S.ALERTS_RSI_INTERVAL)
+    try:
+        sym_text, metric, op, value = _parse_alert(" ".join(context.args or []))
+    except ValueError:
+        await update.message.reply_text(usage)
+        return
+    if metric == "rsi" and not 0 < value < 100:
+        await update.message.reply_text("⚠️ Ngưỡng RSI phải trong khoảng 0–100.")
+        return
+
+    all_coins = await get_all_futures()
+    index = get_symbol_index(all_coins)
+    symbol = index.resolve(_clean_symbol(sym_text).replace("USDT", "")) if all_coins else None
+    coin = index.get(symbol) if symbol else None
+    if coin is None or coin.last_price is None:
+        await update.message.reply_text(f"⚠️ Không tìm thấy {sym_text.upper()} trên Binance Futures.")
+        return
+
+    if metric == "price":
+        current = coin.last_price
+    elif metric == "pct":
+        current = coin.change_pct
+    else:
+        await warm_indicators(symbol, S.ALERTS_RSI_INTERVAL)
+        current = live_rsi(symbol, coin.last_price, S.ALERTS_RSI_INTERVAL)
+
+    if op:
+        direction = ABOVE if op.startswith(">") else BELOW
+    else:
+        ref = current if current is not None else 50.0
+        direction = ABOVE if value >= ref else BELOW
+    try:
+        alert = ALERTS.add(update.effective_chat.id, symbol, metric, direction, value)
+    except ValueError as e:
+        await update.message.reply_text(f"⚠️ {e}")
+        return
+    now = f" (hiện tại {_fmt_alert_value(metric, current)})" if current is not None else ""
+    await update.message.reply_text(f"✅ Đã đặt cảnh báo {format_alert(alert)}{now}")
+
+@metrics.timed()
+async def alerts_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    alerts = ALERTS.for_chat(update.effective_chat.id)
+    if not alerts:
+        await update.message.reply_text("📭 Chưa có cảnh báo nào. " + _ALERT_USAGE.format(itv=S.ALERTS_RSI_INTERVAL))
+        return
+    await update.message.reply_text("🔔 Cảnh báo đang chờ:\n" + "\n".join(format_alert(a) for a in alerts))
+
+@metrics.timed()
+async def unalert_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    args = [a.lstrip("#") for a in (context.args or [])]
+    if args and args[0].lower() == "all":
+        n = ALERTS.remove_chat(chat_id)
+        await update.message.reply_text(f"🗑️ Đã xoá {n} cảnh báo.")
+        return
+    ids = [int(a) for a in args if a.isdigit()]
+    if not ids:
+        await update.message.reply_text("Dùng: /unalert <id> (xem id bằng /alerts) hoặc /unalert all")
+        return
+    removed = [i for i in ids if ALERTS.remove(chat_id, i)]
+    missing = [i for i in ids if i not in removed]
+    msg = f"🗑️ Đã xoá: {', '.join(f'#{i}' for i in removed)}" if removed else ""
+    if missing:
+        msg += ("\n" if msg else "") + f"⚠️ Không có: {', '.join(f'#{i}' for i in missing)}"
+    await update.message.reply_text(msg)
+
+# ==== Watchlist: /watch, /unwatch ====
+_WATCH_USAGE = "👀 /watch btc eth op để thêm • /watch để xem giá • /unwatch btc hoặc /unwatch all để bỏ"
+
+@metrics.timed()
+async def watch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = _chat_id(update)
+    args = context.args or []
+    all_coins = await get_all_futures()
+    if not all_coins:
+        await update.message.reply_text("⚠️ Không lấy được dữ liệu từ Binance Futures. Thử lại sau nhé.")
+        return
+    index = get_symbol_index(all_coins)
+
+    if args:
+        added, missing = [], []
+        for a in args:
+            symbol = index.resolve(_clean_symbol(a).replace("USDT", ""))
+            if not symbol:
+                missing.append(a.upper())
+                continue
+            try:
+                if state.watch(chat_id, symbol):
+                    added.append(symbol)
+            except ValueError as e:
+                await update.message.reply_text(f"⚠️ {e}")
+                return
+        msg = f"👀 Đã thêm: {', '.join(added)}" if added else "👀 Không có symbol mới."
+        if missing:
+            msg += f"\n⚠️ Không tìm thấy: {', '.join(missing)}"
+        await update.message.reply_text(msg)
+        return
+
+    symbols = state.get_watchlist(chat_id)
+    if not symbols:
+        await update.message.reply_text("📭 Watchlist trống. " + _WATCH_USAGE)
+        return
+    unit = state.get_currency_mode(chat_id)
+    vnd_rate = await get_usdt_vnd_rate() if unit == "VND" else 0.0
+    if not vnd_rate:
+        unit = "USDT"
+    lines = []
+    for symbol in symbols:
+        t = index.get(symbol)
+        if t is None or t.last_price is None:
+            lines.append(f"• {symbol.replace('USDT', '/' + unit)} — không có dữ liệu")
+            continue
+        price = t.last_price * vnd_rate if vnd_rate else t.last_price
+        lines.append(f"• {symbol.replace('USDT', '/' + unit)} — {_format_price(price, unit)} {unit} | 24h {t.change_pct:+.2f}%")
+    await update.message.reply_text(
+        "👀 Watchlist:\n" + "\n".join(lines) + f"\n🕒 {get_vietnam_time().strftime('%H:%M %d/%m/%Y')}",
+        reply_markup=get_reply_menu(chat_id),
+    )
+
+@metrics.timed()
+async def unwatch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = _chat_id(update)
+    args = context.args or []
+    if not args:
+        await update.message.reply_text(_WATCH_USAGE)
+        return
+    if args[0].lower() == "all":
+        targets = list(state.get_watchlist(chat_id))
+    else:
+        # Giải cùng cách với /watch (vd "pepe" -> 1000PEPEUSDT); không có dữ liệu thì dùng tên đã chuẩn hoá
+        index = get_symbol_index(await get_all_futures())
+        targets = []
+        for a in args:
+            cleaned = _clean_symbol(a)
+            targets.append(index.resolve(cleaned.replace("USDT", "")) or cleaned)
+    removed = [s for s in targets if state.unwatch(chat_id, s)]
+    await update.message.reply_text(
+        f"🗑️ Đã bỏ: {', '.join(removed)}" if removed else "⚠️ Không có trong watchlist."
+    )
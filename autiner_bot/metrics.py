@@ -0,0 +1,292 @@
+# autiner_bot/metrics.py
+"""
+Metrics dạng Prometheus (text exposition 0.0.4), không thêm thư viện ngoài.
+- Counter / Gauge / Histogram có label; đường nóng chỉ cộng số trên object con đã cache
+  (không khoá, không cấp phát) vì cả bot chạy trên 1 event loop.
+- Collector: hàm gọi lúc scrape để đọc các dict stats sẵn có (cache, limiter, dispatcher...)
+  -> không tốn gì trên đường nóng.
+- timed(): decorator đo latency (histogram), lỗi và số lời gọi đang chạy theo tên hàm.
+- LoopLagMonitor: đo độ trễ event loop (ngủ interval, đo phần thức dậy muộn).
+"""
+
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import asyncio
+import functools
+import math
+import time
+
+from autiner_bot.settings import S
+
+# (giây) từ 0.5ms tới 10s: đủ cho cả hàm tính chỉ báo lẫn request Binance chậm
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# collector() -> [(tên, kiểu, help, [(labels, giá trị)])]
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+Collector = Callable[[], Iterable[Family]]
+
+
+# =============================
+# Giá trị con (theo bộ label)
+# =============================
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, n: float = 1.0) -> None:
+        self.value += n
+
+    def dec(self, n: float = 1.0) -> None:
+        self.value -= n
+
+    def set(self, v: float) -> None:
+        self.value = v
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # ô cuối = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect_left(self.buckets, v)] += 1
+        self.sum += v
+        self.count += 1
+
+
+# =============================
+# Metric có tên
+# =============================
+class Metric:
+    def __init__(self, name: str, kind: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values) -> object:
+        """Object con cho bộ label; nên giữ lại để dùng trên đường nóng."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: cần label {self.labelnames}, nhận {key}")
+            child = _Histogram(self.buckets) if self.kind == "histogram" else _Value()
+            self._children[key] = child
+        return child
+
+    # metric không label: dùng trực tiếp
+    def inc(self, n: float = 1.0) -> None:
+        self.labels().inc(n)
+
+    def dec(self, n: float = 1.0) -> None:
+        self.labels().dec(n)
+
+    def set(self, v: float) -> None:
+        self.labels().set(v)
+
+    def observe(self, v: float) -> None:
+        self.labels().observe(v)
+
+    def _render(self, out: List[str]) -> None:
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        for key, child in self._children.items():
+            labels = dict(zip(self.labelnames, key))
+            if self.kind != "histogram":
+                out.append(f"{self.name}{_labels(labels)} {_num(child.value)}")
+                continue
+            acc = 0
+            for le, n in zip(self.buckets, child.counts):
+                acc += n
+                out.append(f"{self.name}_bucket{_labels(labels, le=_num(le))} {acc}")
+            out.append(f"{self.name}_bucket{_labels(labels, le='+Inf')} {child.count}")
+            out.append(f"{self.name}_sum{_labels(labels)} {_num(child.sum)}")
+            out.append(f"{self.name}_count{_labels(labels)} {child.count}")
+
+
+# =============================
+# Registry
+# =============================
+_METRICS: Dict[str, Metric] = {}
+_COLLECTORS: List[Collector] = []
+
+
+def _metric(name: str, kind: str, help: str, labels: Sequence[str], **kw) -> Metric:
+    m = _METRICS.get(name)
+    if m is None:
+        m = _METRICS[name] = Metric(name, kind, help, labels, **kw)
+    elif m.kind != kind or m.labelnames != tuple(labels):
+        raise ValueError(f"metric {name} đã đăng ký với kiểu/label khác")
+    return m
+
+
+def counter(name: str, help: str, labels: Sequence[str] = ()) -> Metric:
+    return _metric(name, "counter", help, labels)
+
+
+def gauge(name: str, help: str, labels: Sequence[str] = ()) -> Metric:
+    return _metric(name, "gauge", help, labels)
+
+
+def histogram(name: str, help: str, labels: Sequence[str] = (),
+              buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Metric:
+    return _metric(name, "histogram", help, labels, buckets=buckets)
+
+
+def register_collector(fn: Collector) -> Collector:
+    """Đăng ký hàm đọc số liệu lúc scrape (dùng được làm decorator)."""
+    _COLLECTORS.append(fn)
+    return fn
+
+
+def stats_family(name: str, kind: str, help: str, label: str,
+                 sources: Dict[str, Dict[str, float]]) -> Family:
+    """Dict stats {nguồn: {khoá: số}} -> 1 family với label (label=nguồn, key=khoá)."""
+    return name, kind, help, [
+        ({label: src, "key": k}, v) for src, stats in sources.items() for k, v in stats.items()
+    ]
+
+
+def render() -> str:
+    out: List[str] = []
+    for m in list(_METRICS.values()):
+        m._render(out)
+    for fn in list(_COLLECTORS):
+        try:
+            families = list(fn())
+        except Exception as e:
+            print(f"[ERROR] metrics collector {getattr(fn, '__name__', fn)}: {e}")
+            continue
+        for name, kind, help, samples in families:
+            out.append(f"# HELP {name} {help}")
+            out.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                out.append(f"{name}{_labels(labels)} {_num(value)}")
+    out.append("")
+    return "\n".join(out)
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str], **extra) -> str:
+    if extra:
+        labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _num(v: float) -> str:
+    v = float(v)
+    if math.isnan(v):
+        return "NaN"
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return str(int(v)) if v.is_integer() else repr(v)
+
+
+# =============================
+# Đo hàm
+# =============================
+FUNCTION_SECONDS = histogram("autiner_function_seconds", "Latency theo hàm (giây)", ["fn"])
+FUNCTION_ERRORS = counter("autiner_function_errors_total", "Số lần hàm ném exception", ["fn"])
+FUNCTION_IN_FLIGHT = gauge("autiner_function_in_flight", "Số lời gọi async đang chạy", ["fn"])
+
+
+def timed(name: Optional[str] = None):
+    """
+    Decorator đo latency / lỗi (và số lời gọi đang chạy nếu là coroutine) của hàm.
+    METRICS_ENABLED=0 -> trả nguyên hàm, không tốn gì.
+    """
+    def deco(fn):
+        if not S.METRICS_ENABLED:
+            return fn
+        label = name or fn.__name__
+        hist = FUNCTION_SECONDS.labels(label)
+        errors = FUNCTION_ERRORS.labels(label)
+        clock = time.perf_counter
+
+        if asyncio.iscoroutinefunction(fn):
+            in_flight = FUNCTION_IN_FLIGHT.labels(label)
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                in_flight.value += 1
+                t0 = clock()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception:
+                    errors.value += 1
+                    raise
+                finally:
+                    in_flight.value -= 1
+                    hist.observe(clock() - t0)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = clock()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                errors.value += 1
+                raise
+            finally:
+                hist.observe(clock() - t0)
+        return wrapper
+    return deco
+
+
+# =============================
+# Độ trễ event loop
+# =============================
+LOOP_LAG = histogram(
+    "autiner_event_loop_lag_seconds", "Độ trễ event loop (thức dậy muộn so với hẹn)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_LAG_LAST = gauge("autiner_event_loop_lag_last_seconds", "Độ trễ event loop lần đo gần nhất")
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> Optional[asyncio.Task]:
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - t0 - self.interval)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(lag)
+
+
+LOOP_LAG_MONITOR = LoopLagMonitor(S.METRICS_LOOP_LAG_INTERVAL)
@@ -8,6 +8,21 @@ class Settings:
     TELEGRAM_ALLOWED_USER_ID: int = int(os.getenv("TELEGRAM_ALLOWED_USER_ID", "0"))
     TZ_NAME: str = os.getenv("TZ_NAME", "Asia/Ho_Chi_Minh")
 
+    # Webhook (aiohttp) -> điều phối update (worker cố định, FIFO theo chat)
+    UPDATE_QUEUE_MAX: int = int(os.getenv("UPDATE_QUEUE_MAX", "1000"))     # tổng update chờ; vượt -> báo quá tải
+    UPDATE_MAX_PER_CHAT: int = int(os.getenv("UPDATE_MAX_PER_CHAT", "5"))  # update chờ tối đa / chat
+    UPDATE_WORKERS: int = int(os.getenv("UPDATE_WORKERS", "8"))             # số phân tích chạy đồng thời
+    OVERLOAD_NOTICE_SEC: float = float(os.getenv("OVERLOAD_NOTICE_SEC", "30"))
+    USER_MIN_INTERVAL: float = float(os.getenv("USER_MIN_INTERVAL", "2"))   # giãn cách tối thiểu giữa 2 lần phân tích / user
+    WEBHOOK_MAX_BODY: int = int(os.getenv("WEBHOOK_MAX_BODY", str(1024 * 1024)))
+
+    # Gửi tin chủ động (cảnh báo, thông báo): giới hạn của Telegram
+    TG_GLOBAL_RATE: float = float(os.getenv("TG_GLOBAL_RATE", "30"))       # tin / giây cho cả bot
+    TG_CHAT_RATE: float = float(os.getenv("TG_CHAT_RATE", "1"))            # tin / giây / chat riêng
+    TG_GROUP_RATE: float = float(os.getenv("TG_GROUP_RATE", str(20 / 60)))  # tin / giây / nhóm (20 / phút)
+    TG_SEND_CONCURRENCY: int = int(os.getenv("TG_SEND_CONCURRENCY", "10"))
+    TG_OUTBOX_MAX: int = int(os.getenv("TG_OUTBOX_MAX", "10000"))          # tin chờ tối đa; vượt -> bỏ
+
     # Binance API
     BINANCE_API_KEY: str = os.getenv("BINANCE_API_KEY", "")
     BINANCE_API_SECRET: str = os.getenv("BINANCE_API_SECRET", "")
@@ -19,5 +34,75 @@ class Settings:
     BINANCE_KLINES_URL: str = BINANCE_BASE_URL + "/fapi/v1/klines"              # Nến (ohlcv)
     BINANCE_TICKER_24H_URL: str = BINANCE_BASE_URL + "/fapi/v1/ticker/24hr"     # Volume, biến động 24h
 
+    # Binance Futures WebSocket (combined stream), REST làm fallback khi stream rớt
+    BINANCE_WS_ENABLED: bool = os.getenv("BINANCE_WS_ENABLED", "1") == "1"
+    BINANCE_WS_URL: str = os.getenv("BINANCE_WS_URL", "wss://fstream.binance.com")
+
+    # Giới hạn request-weight Binance Futures
+    BINANCE_WEIGHT_LIMIT: int = int(os.getenv("BINANCE_WEIGHT_LIMIT", "2400"))               # weight / phút / IP
+    BINANCE_WEIGHT_SAFETY: float = float(os.getenv("BINANCE_WEIGHT_SAFETY", "0.9"))          # chỉ dùng 90%
+    BINANCE_BACKGROUND_RESERVE: float = float(os.getenv("BINANCE_BACKGROUND_RESERVE", "0.25"))  # phần chừa cho user
+    BINANCE_MAX_WAIT_USER: float = float(os.getenv("BINANCE_MAX_WAIT_USER", "10"))
+    BINANCE_MAX_WAIT_BACKGROUND: float = float(os.getenv("BINANCE_MAX_WAIT_BACKGROUND", "30"))
+
+    # HTTP client dùng chung (aiohttp, keep-alive)
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "20"))                 # tổng thời gian 1 request (giây)
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # thời gian mở kết nối
+    HTTP_POOL_LIMIT: int = int(os.getenv("HTTP_POOL_LIMIT", "100"))              # tổng số kết nối trong pool
+    HTTP_POOL_LIMIT_PER_HOST: int = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+    HTTP_KEEPALIVE: float = float(os.getenv("HTTP_KEEPALIVE", "60"))             # giữ kết nối rảnh (giây)
+    HTTP_DNS_TTL: int = int(os.getenv("HTTP_DNS_TTL", "300"))
+
+    # Snapshot ticker 24h (stale-while-revalidate)
+    TICKER_TTL: float = float(os.getenv("TICKER_TTL", "10"))              # còn "tươi" trong khoảng này
+    TICKER_MAX_STALE: float = float(os.getenv("TICKER_MAX_STALE", "120"))  # quá mức này phải chờ tải lại
+
+    # Cache nến (theo symbol, interval)
+    KLINE_CACHE_MAX_BARS: int = int(os.getenv("KLINE_CACHE_MAX_BARS", "120000"))   # tổng số nến giữ trong RAM
+    KLINE_CACHE_MIN_REFRESH: float = float(os.getenv("KLINE_CACHE_MIN_REFRESH", "15"))  # trong khoảng này dùng cache, không gọi API
+    KLINE_STORE_DIR: str = os.getenv("KLINE_STORE_DIR", "data/klines")   # kho nến đã đóng trên đĩa ("" = tắt)
+    KLINE_STORE_FLUSH_SEC: int = int(os.getenv("KLINE_STORE_FLUSH_SEC", "30"))  # poller ghi gộp nến chờ mỗi khoảng này
+
+    # Nhớ kết quả analyze_coin theo nến đóng cuối
+    ANALYSIS_MEMO_SIZE: int = int(os.getenv("ANALYSIS_MEMO_SIZE", "5000"))  # số (symbol, khung) tối đa
+
+    # Tỷ giá P2P USDT/VND
+    P2P_RATE_TTL: float = float(os.getenv("P2P_RATE_TTL", "120"))
+    P2P_TOP_ADS: int = int(os.getenv("P2P_TOP_ADS", "10"))   # số quảng cáo đầu sổ dùng tính giá
+
+    # Poller nền (APScheduler) làm nóng dữ liệu cho handler
+    POLLER_ENABLED: bool = os.getenv("POLLER_ENABLED", "1") == "1"
+    POLL_TICKERS_SEC: int = int(os.getenv("POLL_TICKERS_SEC", "5"))
+    POLL_P2P_SEC: int = int(os.getenv("POLL_P2P_SEC", "60"))
+    POLL_KLINES_SEC: int = int(os.getenv("POLL_KLINES_SEC", "10"))
+    POLL_TOP_N: int = int(os.getenv("POLL_TOP_N", "30"))                 # số symbol top quoteVolume được làm nóng nến
+    POLL_KLINE_INTERVAL: str = os.getenv("POLL_KLINE_INTERVAL", "15m")
+    POLL_KLINE_LIMIT: int = int(os.getenv("POLL_KLINE_LIMIT", "200"))
+    POLL_CONCURRENCY: int = int(os.getenv("POLL_CONCURRENCY", "5"))
+
+    # Cảnh báo giá / % 24h / RSI (/alert)
+    ALERTS_ENABLED: bool = os.getenv("ALERTS_ENABLED", "1") == "1"
+    ALERTS_FILE: str = os.getenv("ALERTS_FILE", "data/alerts.json")        # "" = không lưu
+    ALERTS_MAX_PER_CHAT: int = int(os.getenv("ALERTS_MAX_PER_CHAT", "50"))
+    ALERTS_SAVE_DELAY: float = float(os.getenv("ALERTS_SAVE_DELAY", "2"))  # gộp nhiều thay đổi rồi mới ghi file
+    ALERTS_RSI_INTERVAL: str = os.getenv("ALERTS_RSI_INTERVAL", "15m")
+
+    # Trạng thái theo chat (đơn vị hiển thị, watchlist) - SQLite + LRU, ghi gộp
+    STATE_DB: str = os.getenv("STATE_DB", "data/state.db")                 # "" = chỉ giữ trong RAM
+    STATE_CACHE_SIZE: int = int(os.getenv("STATE_CACHE_SIZE", "10000"))    # số chat giữ trong LRU
+    STATE_FLUSH_DELAY: float = float(os.getenv("STATE_FLUSH_DELAY", "1"))  # gộp thay đổi rồi mới ghi DB
+
+    # Metrics (/metrics, định dạng Prometheus)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "1") == "1"
+    METRICS_LOOP_LAG_INTERVAL: float = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "0.5"))  # 0 = tắt đo độ trễ loop
+
+    # Quét toàn thị trường (/scan)
+    SCAN_CONCURRENCY: int = int(os.getenv("SCAN_CONCURRENCY", "10"))
+    SCAN_MAX_SYMBOLS: int = int(os.getenv("SCAN_MAX_SYMBOLS", "0"))              # 0 = tất cả
+    SCAN_MIN_QUOTE_VOLUME: float = float(os.getenv("SCAN_MIN_QUOTE_VOLUME", "0"))
+    SCAN_TOP_K: int = int(os.getenv("SCAN_TOP_K", "5"))
+    SCAN_CACHE_TTL: float = float(os.getenv("SCAN_CACHE_TTL", "60"))   # dùng lại kết quả quét trong khoảng này
+    SCAN_ROUTE_TOKEN: str = os.getenv("SCAN_ROUTE_TOKEN", "")          # GET /scan cần ?token= / X-Scan-Token; "" = tắt route
+
 # Instance để main.py gọi
 S = Settings()
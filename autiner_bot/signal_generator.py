@@ -1,45 +1,126 @@
-import random
-from autiner_bot.data_sources.mexc import get_usdt_pairs
-from autiner_bot.data_sources.trend_detector import get_coin_trend
+# autiner_bot/signal_generator.py
+"""
+Quét toàn thị trường Binance Futures (USDT-M).
+- Lấy snapshot ticker 24h → tải nến song song (giới hạn concurrency để giữ weight)
+- Chấm điểm từng symbol bằng luật của analyze_coin
+- Trả top-K LONG / SHORT theo độ mạnh
+- cached_scan: cho /scan (Telegram lẫn HTTP): top_k bị chặn 1..SCAN_MAX_TOP_K, kết quả dùng lại
+  trong SCAN_CACHE_TTL giây, các lời gọi trùng lúc gộp chung 1 lượt quét (single-flight)
+"""
+
+from typing import Optional
+import asyncio
+import time
+
+from autiner_bot.settings import S
+from autiner_bot import metrics
+from autiner_bot.data_sources.binance import get_all_futures, get_kline, analyze_klines
+from autiner_bot.data_sources.symbol_index import get_symbol_index
+from autiner_bot.data_sources.rate_limiter import background_priority
+from autiner_bot.data_sources.singleflight import new_group
+
+SCAN_INTERVAL = "15m"
+SCAN_LIMIT = 200
+
 
 # =============================
-# Giả lập phân tích kỹ thuật
+# Quét thị trường
 # =============================
-def calc_rsi(change_pct: float) -> float:
-    return 50 + (change_pct * 2)  # demo RSI
+@metrics.timed()
+async def scan_market(top_k: int = 5, concurrency: Optional[int] = None,
+                      max_symbols: Optional[int] = None) -> dict:
+    started = time.perf_counter()
+    concurrency = concurrency or S.SCAN_CONCURRENCY
+    max_symbols = S.SCAN_MAX_SYMBOLS if max_symbols is None else max_symbols
+
+    tickers = await get_all_futures()
+    index = get_symbol_index(tickers)
+    symbols = [
+        s for s in index.usdt_by_volume
+        if index.volume(s) >= S.SCAN_MIN_QUOTE_VOLUME
+    ]
+    if max_symbols:
+        symbols = symbols[:max_symbols]
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one(sym: str):
+        async with sem:
+            klines = await get_kline(sym, SCAN_INTERVAL, SCAN_LIMIT)
+        result = analyze_klines(sym, klines, SCAN_INTERVAL)
+        if result is None:
+            return None
+        t = index.get(sym)
+        return {
+            "symbol": sym,
+            "price": t.last_price,
+            "change_pct": t.change_pct,
+            "volume": index.volume(sym),
+            **result,
+        }
+
+    # Quét là việc nền: nhường weight cho user tra từng coin
+    with background_priority():
+        results = [r for r in await asyncio.gather(*(_one(s) for s in symbols)) if r]
+
+    # Độ mạnh giảm dần, hoà thì ưu tiên volume lớn
+    def _rank(r):
+        return (r["strength"], r["volume"])
+
+    longs = sorted((r for r in results if r["side"] == "LONG"), key=_rank, reverse=True)
+    shorts = sorted((r for r in results if r["side"] == "SHORT"), key=_rank, reverse=True)
+    return {
+        "long": longs[:top_k],
+        "short": shorts[:top_k],
+        "scanned": len(results),
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+# =============================
+# Quét dùng chung (cache + gộp lời gọi)
+# =============================
+SCAN_MAX_TOP_K = 20
+
+_SCAN_FLIGHT = new_group("scan")
+_last_scan: Optional[dict] = None
+_last_scan_at = 0.0
+
+
+def clamp_top_k(top_k) -> int:
+    try:
+        top_k = int(top_k)
+    except (TypeError, ValueError):
+        top_k = S.SCAN_TOP_K
+    return max(1, min(SCAN_MAX_TOP_K, top_k))
+
+
+async def _scan_and_keep() -> dict:
+    global _last_scan, _last_scan_at
+    res = await scan_market(top_k=SCAN_MAX_TOP_K)
+    if res.get("scanned"):
+        _last_scan, _last_scan_at = res, time.monotonic()
+    return res
+
+
+@metrics.timed()
+async def cached_scan(top_k=None) -> dict:
+    """Kết quả quét còn mới (< SCAN_CACHE_TTL giây) thì dùng lại; không thì 1 lượt quét chung."""
+    top_k = clamp_top_k(S.SCAN_TOP_K if top_k is None else top_k)
+    res = _last_scan
+    if res is None or time.monotonic() - _last_scan_at >= S.SCAN_CACHE_TTL:
+        res = await _SCAN_FLIGHT.do("market", _scan_and_keep)
+    return {**res, "long": res["long"][:top_k], "short": res["short"][:top_k],
+            "age": round(time.monotonic() - _last_scan_at, 1) if res is _last_scan else 0.0}
 
-def ma_signal(change_pct: float) -> str:
-    return "BUY" if change_pct > 0 else "SELL"
 
 # =============================
-# Tạo tín hiệu
+# Tạo tín hiệu (tương thích cũ)
 # =============================
+@metrics.timed()
 async def generate_signals(limit: int = 5):
-    """
-    Lấy coin từ MEXC → check trend Coingecko → phân tích → tạo tín hiệu
-    """
-    coins = await get_usdt_pairs()
-    signals = []
-
-    for coin in coins[:limit * 2]:  # lấy rộng hơn để lọc
-        trends = await get_coin_trend(coin["symbol"].lower())
-        rsi = calc_rsi(coin["change_pct"])
-        ma = ma_signal(coin["change_pct"])
-
-        if not trends:
-            continue  # coin không rõ trend → bỏ qua
-
-        signals.append({
-            "symbol": coin["symbol"],
-            "price": coin["lastPrice"],
-            "change_pct": coin["change_pct"],
-            "volume": coin["volume"],
-            "trend": trends,
-            "rsi": round(rsi, 2),
-            "ma_signal": ma,
-            "reason": f"{coin['symbol']} thuộc trend {', '.join(trends)}, RSI={round(rsi,2)}, MA={ma}, biến động {coin['change_pct']}%"
-        })
-
-    # Sắp xếp ưu tiên coin có biến động mạnh + trend rõ
-    sorted_signals = sorted(signals, key=lambda x: abs(x["change_pct"]), reverse=True)
-    return sorted_signals[:limit]
+    """Top tín hiệu mạnh nhất (gộp LONG + SHORT)."""
+    res = await cached_scan(limit)
+    merged = res["long"] + res["short"]
+    merged.sort(key=lambda x: (x["strength"], abs(x["change_pct"])), reverse=True)
+    return merged[:limit]
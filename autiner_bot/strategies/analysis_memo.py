@@ -0,0 +1,62 @@
+# autiner_bot/strategies/analysis_memo.py
+"""
+Nhớ kết quả chấm điểm theo nến đã đóng.
+- Khoá (symbol, interval, version), mỗi khoá giữ 1 kết quả kèm open time nến đóng cuối đã chấm:
+  tương đương khoá (symbol, interval, nến đóng cuối, version) nhưng nến mới đóng thì bản cũ
+  tự mất hiệu lực và bị ghi đè tại chỗ, không để rác chờ LRU.
+- Nến đóng cuối suy ra từ đồng hồ (không cần tải nến) -> hit là trả ngay, không mạng, không tính chỉ báo.
+- version: đổi luật chấm điểm thì tăng để bỏ kết quả cũ.
+- LRU giới hạn số khoá.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+import time
+
+from autiner_bot.data_sources.kline_cache import interval_ms
+
+
+def last_closed_open_time(interval: str, now_ms: Optional[int] = None) -> Optional[int]:
+    """Open time của nến đã đóng gần nhất theo đồng hồ (căn mốc epoch UTC như Binance)."""
+    step = interval_ms(interval)
+    if not step:
+        return None
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    return now_ms - now_ms % step - step
+
+
+class AnalysisMemo:
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Hashable, Tuple[int, dict]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "stale": 0, "stores": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, bar_open_time: Optional[int]) -> Optional[dict]:
+        """Kết quả đã chấm cho đúng nến đóng bar_open_time; None nếu chưa có hoặc đã cũ."""
+        entry = self._entries.get(key)
+        if entry is None or bar_open_time is None:
+            self.stats["misses"] += 1
+            return None
+        if entry[0] != bar_open_time:
+            self.stats["stale"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[1]
+
+    def put(self, key: Hashable, bar_open_time: int, result: dict) -> None:
+        old = self._entries.get(key)
+        if old is not None and old[0] > bar_open_time:
+            return  # đã có kết quả nến mới hơn (request chậm về sau)
+        self._entries[key] = (bar_open_time, result)
+        self._entries.move_to_end(key)
+        self.stats["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,185 @@
+# autiner_bot/strategies/batch_indicators.py
+"""
+Engine chỉ báo theo lô (nhiều symbol cùng lúc).
+- Input: mảng 2-D (symbols x bars) close/high/low/volume (1-D cũng được).
+- Tính RSI (Wilder), EMA, MACD, Bollinger, ATR trong 1 lượt vector hoá theo trục symbol.
+- Output: structured array (1 dòng / symbol) với giá trị tại nến cuối,
+  hoặc dict các chuỗi đầy đủ (compute_series) cho scanner/backtest.
+"""
+
+from typing import Dict, List, Tuple
+import numpy as np
+
+from autiner_bot.data_sources.models import KlineSeries
+
+INDICATOR_DTYPE = np.dtype([
+    ("last_close", "f8"),
+    ("rsi", "f8"),
+    ("ema20", "f8"), ("ema50", "f8"),
+    ("ema12", "f8"), ("ema26", "f8"),
+    ("macd", "f8"), ("macd_signal", "f8"), ("macd_hist", "f8"),
+    ("bb_mid", "f8"), ("bb_upper", "f8"), ("bb_lower", "f8"),
+    ("atr", "f8"),
+    ("vol_sma20", "f8"),
+])
+
+
+# =============================
+# Chuẩn bị dữ liệu
+# =============================
+def stack_klines(klines_by_symbol: Dict[str, KlineSeries], min_bars: int = 26) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """
+    Gộp nến của nhiều symbol thành mảng 2-D cùng độ dài (cắt theo phần đuôi chung).
+    Bỏ symbol có ít hơn min_bars nến.
+    """
+    symbols = [s for s, k in klines_by_symbol.items() if k is not None and len(k) >= min_bars]
+    if not symbols:
+        empty = np.empty((0, 0))
+        return [], {"open_time": empty, "high": empty, "low": empty, "close": empty, "volume": empty}
+    n = min(len(klines_by_symbol[s]) for s in symbols)
+    return symbols, {
+        col: np.array([getattr(klines_by_symbol[s], col)[-n:] for s in symbols], dtype=float)
+        for col in ("open_time", "high", "low", "close", "volume")
+    }
+
+
+# =============================
+# Làm mượt đệ quy
+# =============================
+def _smooth(x: np.ndarray, alpha: float, seed_at: int, period: int) -> np.ndarray:
+    """
+    y[seed_at] = mean(x[seed_at-period+1 .. seed_at]); y[t] = y[t-1] + alpha * (x[t] - y[t-1]).
+    Trước seed_at là NaN. 1-D chạy vòng float thuần (nhanh hơn numpy scalar), 2-D vector hoá theo symbol.
+    """
+    out = np.full(x.shape, np.nan)
+    n = x.shape[-1]
+    if seed_at >= n or seed_at < period - 1:
+        return out
+    seed = x[..., seed_at - period + 1: seed_at + 1].mean(axis=-1)
+    if x.ndim == 1:
+        vals = x.tolist()
+        res = [0.0] * n
+        y = float(seed)
+        res[seed_at] = y
+        for t in range(seed_at + 1, n):
+            y += alpha * (vals[t] - y)
+            res[t] = y
+        out[seed_at:] = res[seed_at:]
+        return out
+    out[..., seed_at] = seed
+    y = seed
+    for t in range(seed_at + 1, n):
+        y = y + alpha * (x[..., t] - y)
+        out[..., t] = y
+    return out
+
+
+def ema(x: np.ndarray, period: int) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    return _smooth(x, 2.0 / (period + 1), period - 1, period)
+
+
+def rsi(closes: np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI Wilder; giá trị đầu tiên ở index period."""
+    closes = np.asarray(closes, dtype=float)
+    out = np.full(closes.shape, np.nan)
+    if closes.shape[-1] <= period:
+        return out
+    deltas = np.diff(closes, axis=-1)
+    gains = np.where(deltas > 0, deltas, 0.0)
+    losses = np.where(deltas < 0, -deltas, 0.0)
+    avg_gain = _smooth(gains, 1.0 / period, period - 1, period)
+    avg_loss = _smooth(losses, 1.0 / period, period - 1, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        val = 100.0 - 100.0 / (1.0 + rs)
+    val = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), val)
+    out[..., 1:] = np.where(np.isnan(avg_gain), np.nan, val)
+    return out
+
+
+def macd(closes: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    closes = np.asarray(closes, dtype=float)
+    line = ema(closes, fast) - ema(closes, slow)
+    sig = np.full(closes.shape, np.nan)
+    start = slow - 1
+    if closes.shape[-1] > start:
+        sig[..., start:] = _smooth(line[..., start:], 2.0 / (signal + 1), signal - 1, signal)
+    return line, sig, line - sig
+
+
+def bollinger(closes: np.ndarray, period: int = 20, k: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    closes = np.asarray(closes, dtype=float)
+    mid = np.full(closes.shape, np.nan)
+    std = np.full(closes.shape, np.nan)
+    if closes.shape[-1] >= period:
+        win = np.lib.stride_tricks.sliding_window_view(closes, period, axis=-1)
+        mid[..., period - 1:] = win.mean(axis=-1)
+        std[..., period - 1:] = win.std(axis=-1)
+    return mid, mid + k * std, mid - k * std
+
+
+def atr(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 14) -> np.ndarray:
+    """ATR Wilder; giá trị đầu tiên ở index period."""
+    highs, lows, closes = (np.asarray(a, dtype=float) for a in (highs, lows, closes))
+    out = np.full(closes.shape, np.nan)
+    if closes.shape[-1] <= period:
+        return out
+    prev = closes[..., :-1]
+    h, l = highs[..., 1:], lows[..., 1:]
+    tr = np.maximum(h - l, np.maximum(np.abs(h - prev), np.abs(l - prev)))
+    out[..., 1:] = _smooth(tr, 1.0 / period, period - 1, period)
+    return out
+
+
+def sma(x: np.ndarray, period: int) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= period:
+        out[..., period - 1:] = np.lib.stride_tricks.sliding_window_view(x, period, axis=-1).mean(axis=-1)
+    return out
+
+
+# =============================
+# API chính
+# =============================
+def compute_series(closes: np.ndarray, highs: np.ndarray, lows: np.ndarray,
+                   volumes: np.ndarray) -> Dict[str, np.ndarray]:
+    """Chuỗi đầy đủ cho mọi nến (cùng shape với input)."""
+    closes = np.asarray(closes, dtype=float)
+    macd_line, macd_sig, macd_hist = macd(closes)
+    bb_mid, bb_upper, bb_lower = bollinger(closes)
+    return {
+        "last_close": closes,
+        "rsi": rsi(closes),
+        "ema20": ema(closes, 20), "ema50": ema(closes, 50),
+        "ema12": ema(closes, 12), "ema26": ema(closes, 26),
+        "macd": macd_line, "macd_signal": macd_sig, "macd_hist": macd_hist,
+        "bb_mid": bb_mid, "bb_upper": bb_upper, "bb_lower": bb_lower,
+        "atr": atr(highs, lows, closes),
+        "vol_sma20": sma(volumes, 20),
+    }
+
+
+def compute_batch(closes: np.ndarray, highs: np.ndarray, lows: np.ndarray,
+                  volumes: np.ndarray) -> np.ndarray:
+    """
+    Giá trị chỉ báo tại nến cuối cho từng symbol.
+    Trả structured array shape (n_symbols,) với dtype INDICATOR_DTYPE.
+    """
+    closes = np.atleast_2d(np.asarray(closes, dtype=float))
+    highs, lows, volumes = (np.atleast_2d(np.asarray(a, dtype=float)) for a in (highs, lows, volumes))
+    series = compute_series(closes, highs, lows, volumes)
+    out = np.empty(closes.shape[0], dtype=INDICATOR_DTYPE)
+    for name in INDICATOR_DTYPE.names:
+        col = series[name]
+        out[name] = col[:, -1] if col.shape[-1] else np.nan
+    return out
+
+
+def compute_batch_klines(klines_by_symbol: Dict[str, KlineSeries], min_bars: int = 26) -> Tuple[List[str], np.ndarray]:
+    """Tiện ích: nến nhiều symbol -> (symbols, structured array)."""
+    symbols, arr = stack_klines(klines_by_symbol, min_bars)
+    if not symbols:
+        return [], np.empty(0, dtype=INDICATOR_DTYPE)
+    return symbols, compute_batch(arr["close"], arr["high"], arr["low"], arr["volume"])
@@ -0,0 +1,137 @@
+# autiner_bot/strategies/confluence.py
+"""
+Phân tích đa khung thời gian (confluence).
+- Mỗi symbol chỉ tải 1 chuỗi nến gốc (qua cache + kho đĩa), các khung lớn hơn gộp tại chỗ
+  bằng numpy (KlineSeries.resample) thay vì 1 request klines / khung.
+- Mỗi khung chấm bằng luật analyze_coin (RSI / MACD / EMA), cộng có trọng số: khung lớn nặng hơn.
+  Trạng thái chỉ báo giữ theo khoá riêng (khung@mode): cửa sổ gộp / dài khác nến thật của
+  analyze_coin, dùng chung khoá sẽ ghi đè trạng thái của nhau.
+- scalping: gốc 1m -> 1m / 5m / 15m; swing: gốc 15m -> 15m / 1h / 4h.
+  (1 request Binance tối đa 1500 nến: gốc 1m không đủ cho EMA50 khung 1h/4h.)
+- TP/SL theo ATR của khung vào lệnh.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from autiner_bot import metrics
+from autiner_bot.data_sources.binance import analyze_klines, get_kline
+from autiner_bot.data_sources.kline_cache import interval_ms
+from autiner_bot.data_sources.models import KlineSeries
+from autiner_bot.strategies.batch_indicators import atr
+
+
+@dataclass(frozen=True)
+class Mode:
+    name: str
+    base: str                                # khung nến tải về
+    limit: int                               # số nến gốc (khung lớn nhất cần >= ~60 nến)
+    frames: Tuple[Tuple[str, float], ...]    # (khung, trọng số)
+    atr_frame: str                           # khung tính ATR cho TP/SL
+    tp_atr: float
+    sl_atr: float
+    order_type: str
+    fallback_pct: float                      # TP/SL % khi chưa tính được ATR
+
+
+MODES: Dict[str, Mode] = {
+    "scalping": Mode("scalping", "1m", 1000, (("1m", 1.0), ("5m", 1.5), ("15m", 2.0)),
+                     atr_frame="5m", tp_atr=1.5, sl_atr=1.0, order_type="Market", fallback_pct=1.0),
+    "swing": Mode("swing", "15m", 1000, (("15m", 1.0), ("1h", 1.5), ("4h", 2.0)),
+                  atr_frame="1h", tp_atr=2.0, sl_atr=1.2, order_type="Limit", fallback_pct=3.0),
+}
+
+
+def frames_from_base(bars: KlineSeries, mode: Mode) -> Dict[str, KlineSeries]:
+    """Chuỗi nến cho từng khung của mode, gộp từ chuỗi gốc."""
+    out = {}
+    for tf, _ in mode.frames + ((mode.atr_frame, 0.0),):
+        if tf not in out:
+            out[tf] = bars if tf == mode.base else bars.resample(interval_ms(tf))
+    return out
+
+
+def state_key(tf: str, mode: Mode) -> str:
+    """Khoá interval của trạng thái chỉ báo cho khung tf của mode (tách khỏi khoá của analyze_coin)."""
+    return f"{tf}@{mode.name}"
+
+
+def confluence_from_klines(symbol: str, bars: KlineSeries, mode: Mode) -> Optional[dict]:
+    """Chấm confluence từ chuỗi nến gốc có sẵn; None nếu không khung nào đủ dữ liệu."""
+    series = frames_from_base(bars, mode)
+    frames: List[dict] = []
+    total_w = weighted = 0.0
+    for tf, w in mode.frames:
+        res = analyze_klines(symbol, series[tf], state_key(tf, mode))
+        if res is None:
+            continue
+        # strength 50..90 -> điểm có dấu -1..1
+        score = (res["strength"] - 50) / 40 * (1 if res["side"] == "LONG" else -1)
+        frames.append({"interval": tf, "side": res["side"], "strength": res["strength"],
+                       "score": round(score, 3), "weight": w})
+        total_w += w
+        weighted += w * score
+    if not frames:
+        return None
+
+    conf = weighted / total_w
+    side = "LONG" if conf >= 0 else "SHORT"
+    agreement = sum(f["weight"] for f in frames if f["side"] == side) / total_w
+    strength = 50 + 40 * abs(conf)
+    if agreement == 1.0 and len(frames) == len(mode.frames):
+        strength += 5   # mọi khung cùng hướng
+    strength = int(round(min(95, strength)))
+
+    entry = float(bars.close[-1])
+    a = series[mode.atr_frame]
+    atr_val = float(atr(a.high, a.low, a.close)[-1]) if len(a) > 15 else float("nan")
+    if np.isfinite(atr_val) and atr_val > 0:
+        tp_dist, sl_dist = mode.tp_atr * atr_val, mode.sl_atr * atr_val
+    else:
+        tp_dist = entry * mode.fallback_pct / 100
+        sl_dist = tp_dist * mode.sl_atr / mode.tp_atr
+    sign = 1 if side == "LONG" else -1
+
+    return {
+        "symbol": symbol,
+        "mode": mode.name,
+        "side": side,
+        "strength": strength,
+        "confluence": round(conf, 3),
+        "agreement": round(agreement, 3),
+        "entry": entry,
+        "tp": entry + sign * tp_dist,
+        "sl": entry - sign * sl_dist,
+        "atr": atr_val if np.isfinite(atr_val) else None,
+        "frames": frames,
+        "reason": " | ".join(f"{f['interval']} {f['side']} {f['strength']}%" for f in frames)
+                  + f" → đồng thuận {agreement:.0%}",
+    }
+
+
+@metrics.timed()
+async def analyze_confluence(symbol: str, mode: str = "swing") -> Optional[dict]:
+    """1 request nến gốc (hoặc cache) -> confluence các khung của mode."""
+    m = MODES[mode]
+    symbol = symbol.upper()
+    bars = await get_kline(symbol, m.base, m.limit)
+    if not bars:
+        return None
+    return confluence_from_klines(symbol, bars, m)
+
+
+def to_signal(res: dict, kind: str) -> dict:
+    """Kết quả confluence -> format tín hiệu cũ của swing/scalping."""
+    return {
+        "symbol": res["symbol"],
+        "side": res["side"],
+        "type": kind,
+        "orderType": MODES[res["mode"]].order_type,
+        "entry": res["entry"],
+        "tp": res["tp"],
+        "sl": res["sl"],
+        "strength": res["strength"],
+        "reason": res["reason"],
+    }
@@ -0,0 +1,296 @@
+# autiner_bot/strategies/indicators.py
+"""
+Chỉ báo có trạng thái, cập nhật O(1) mỗi nến.
+- EMA (seed bằng SMA), RSI Wilder, MACD (EMA12/EMA26, signal EMA9), Bollinger (tổng trượt).
+- update(x): nến đã đóng -> đổi trạng thái.
+- peek(x): giá trị nếu x là nến tiếp theo (nến đang chạy), không đổi trạng thái.
+Cùng công thức với batch_indicators (kết quả khớp nhau).
+"""
+
+from collections import OrderedDict, deque
+from typing import Dict, Hashable, List, Optional, Tuple
+import math
+
+import numpy as np
+
+from autiner_bot.data_sources.models import KlineSeries
+
+
+class EMA:
+    __slots__ = ("period", "alpha", "value", "_n", "_sum")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.value: Optional[float] = None
+        self._n = 0
+        self._sum = 0.0
+
+    def update(self, x: float) -> Optional[float]:
+        self.value = self.peek(x)
+        if self.value is None:
+            self._n += 1
+            self._sum += x
+        return self.value
+
+    def peek(self, x: float) -> Optional[float]:
+        if self.value is not None:
+            return self.value + self.alpha * (x - self.value)
+        if self._n + 1 == self.period:
+            return (self._sum + x) / self.period
+        return None
+
+
+class WilderRSI:
+    __slots__ = ("period", "prev", "avg_gain", "avg_loss", "_n", "_gain_sum", "_loss_sum")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev: Optional[float] = None
+        self.avg_gain: Optional[float] = None
+        self.avg_loss: Optional[float] = None
+        self._n = 0
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+
+    def _next(self, close: float) -> Tuple[Optional[float], Optional[float]]:
+        if self.prev is None:
+            return None, None
+        delta = close - self.prev
+        gain, loss = (delta, 0.0) if delta > 0 else (0.0, -delta)
+        p = self.period
+        if self.avg_gain is not None:
+            return (self.avg_gain * (p - 1) + gain) / p, (self.avg_loss * (p - 1) + loss) / p
+        if self._n + 1 == p:
+            return (self._gain_sum + gain) / p, (self._loss_sum + loss) / p
+        return None, None
+
+    def update(self, close: float) -> Optional[float]:
+        avg_gain, avg_loss = self._next(close)
+        if avg_gain is None and self.prev is not None:
+            delta = close - self.prev
+            self._n += 1
+            self._gain_sum += max(delta, 0.0)
+            self._loss_sum += max(-delta, 0.0)
+        self.avg_gain, self.avg_loss = avg_gain, avg_loss
+        self.prev = close
+        return self._value(avg_gain, avg_loss)
+
+    def peek(self, close: float) -> Optional[float]:
+        return self._value(*self._next(close))
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._value(self.avg_gain, self.avg_loss)
+
+    @staticmethod
+    def _value(avg_gain: Optional[float], avg_loss: Optional[float]) -> Optional[float]:
+        if avg_gain is None:
+            return None
+        if avg_loss == 0:
+            return 50.0 if avg_gain == 0 else 100.0
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+class MACD:
+    __slots__ = ("fast", "slow", "signal")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def update(self, x: float) -> Tuple[Optional[float], Optional[float]]:
+        f, s = self.fast.update(x), self.slow.update(x)
+        if f is None or s is None:
+            return None, None
+        line = f - s
+        return line, self.signal.update(line)
+
+    def peek(self, x: float) -> Tuple[Optional[float], Optional[float]]:
+        f, s = self.fast.peek(x), self.slow.peek(x)
+        if f is None or s is None:
+            return None, None
+        line = f - s
+        return line, self.signal.peek(line)
+
+    @property
+    def value(self) -> Tuple[Optional[float], Optional[float]]:
+        """(line, signal) tại nến đã nạp cuối."""
+        f, s = self.fast.value, self.slow.value
+        if f is None or s is None:
+            return None, None
+        return f - s, self.signal.value
+
+
+class Bands:
+    """Bollinger: trung bình / độ lệch chuẩn (population) trên cửa sổ trượt, tổng chạy O(1)."""
+    __slots__ = ("period", "k", "window", "_sum", "_sumsq")
+
+    def __init__(self, period: int = 20, k: float = 2.0):
+        self.period = period
+        self.k = k
+        self.window: deque = deque()
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def update(self, x: float) -> None:
+        self.window.append(x)
+        self._sum += x
+        self._sumsq += x * x
+        if len(self.window) > self.period:
+            old = self.window.popleft()
+            self._sum -= old
+            self._sumsq -= old * old
+
+    def peek(self, x: float) -> Optional[Tuple[float, float, float]]:
+        s, sq = self._sum + x, self._sumsq + x * x
+        n = len(self.window) + 1
+        if n > self.period:
+            old = self.window[0]
+            s, sq, n = s - old, sq - old * old, self.period
+        if n < self.period:
+            return None
+        return self._bands(s, sq, n)
+
+    @property
+    def value(self) -> Optional[Tuple[float, float, float]]:
+        """(mid, upper, lower) tại nến đã nạp cuối."""
+        n = len(self.window)
+        return self._bands(self._sum, self._sumsq, n) if n == self.period else None
+
+    def _bands(self, s: float, sq: float, n: int) -> Tuple[float, float, float]:
+        mid = s / n
+        std = math.sqrt(max(0.0, sq / n - mid * mid))
+        return mid, mid + self.k * std, mid - self.k * std
+
+
+# =============================
+# Bộ chỉ báo cho analyze_coin
+# =============================
+class IndicatorState:
+    """Trạng thái đầy đủ cho 1 (symbol, interval): chỉ nạp nến đã đóng, nến đang chạy dùng peek."""
+    __slots__ = ("ema20", "ema50", "rsi", "macd", "bands", "count", "last_open_time", "last_close")
+
+    def __init__(self):
+        self.ema20 = EMA(20)
+        self.ema50 = EMA(50)
+        self.rsi = WilderRSI(14)
+        self.macd = MACD(12, 26, 9)
+        self.bands = Bands(20, 2.0)
+        self.count = 0
+        self.last_open_time: Optional[int] = None
+        self.last_close: Optional[float] = None
+
+    def update(self, close: float, open_time: Optional[int] = None) -> None:
+        self.ema20.update(close)
+        self.ema50.update(close)
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.bands.update(close)
+        self.count += 1
+        self.last_open_time = open_time
+        self.last_close = close
+
+    def snapshot(self, last_close: Optional[float] = None) -> dict:
+        """
+        Giá trị chỉ báo (cùng format calculate_indicators):
+        last_close=None -> tại nến đã nạp cuối (nến đã đóng); có giá -> như thêm nến đang chạy last_close.
+        """
+        if last_close is None:
+            if self.count < 26:
+                return {}
+            last_close = self.last_close
+            ema20, ema50, rsi = self.ema20.value, self.ema50.value, self.rsi.value
+            line, signal = self.macd.value
+            bands = self.bands.value
+        else:
+            if self.count + 1 < 26:
+                return {}
+            ema20 = self.ema20.peek(last_close)
+            ema50 = self.ema50.peek(last_close)
+            rsi = self.rsi.peek(last_close)
+            line, signal = self.macd.peek(last_close)
+            bands = self.bands.peek(last_close)
+
+        if bands is not None:
+            _, upper, lower = bands
+            if last_close >= upper:
+                bb_status = "gần biên trên"
+            elif last_close <= lower:
+                bb_status = "gần biên dưới"
+            else:
+                bb_status = "trong dải"
+        else:
+            bb_status = "trong dải"
+
+        # Chưa đủ nến cho đường signal -> so MACD với 0
+        ref = signal if signal is not None else 0.0
+        macd_signal = "bullish" if line is not None and line > ref else "bearish"
+
+        return {
+            "RSI": round(rsi if rsi is not None else 50.0, 2),
+            "MACD": macd_signal,
+            "EMA20": round(ema20 if ema20 is not None else last_close, 6),
+            "EMA50": round(ema50 if ema50 is not None else last_close, 6),
+            "Bollinger": bb_status,
+            "last_close": last_close,
+        }
+
+
+def indicators_from_closes(closes: List[float]) -> dict:
+    """Tính toàn bộ từ đầu (O(n)); nến cuối coi như nến đang chạy."""
+    if len(closes) < 26:
+        return {}
+    st = IndicatorState()
+    for c in closes[:-1]:
+        st.update(c)
+    return st.snapshot(closes[-1])
+
+
+class IncrementalIndicators:
+    """
+    Giữ IndicatorState theo key (symbol, interval), mỗi lần chỉ nạp các nến đã đóng mới.
+    Khi nến mới đóng: O(1) / symbol thay vì tính lại cả cửa sổ. LRU giới hạn số key.
+    """
+
+    def __init__(self, max_keys: int = 2000):
+        self.max_keys = max_keys
+        self._states: "OrderedDict[Hashable, IndicatorState]" = OrderedDict()
+        self.stats: Dict[str, int] = {"incremental": 0, "rebuilds": 0, "bars_fed": 0}
+
+    def state(self, key: Hashable) -> Optional[IndicatorState]:
+        """Trạng thái đã nạp (nến đã đóng) của key, None nếu chưa có."""
+        return self._states.get(key)
+
+    def compute(self, key: Hashable, klines: KlineSeries) -> dict:
+        """
+        Nạp các nến đã đóng (mọi nến trừ nến cuối = nến đang chạy) rồi trả chỉ báo tại nến đóng cuối:
+        cố định trong suốt 1 nến, giống cách backtest chấm điểm.
+        """
+        if len(klines) < 27:
+            return {}
+        n_closed = len(klines) - 1
+        open_time, close = klines.open_time, klines.close
+        st = self._states.get(key)
+        start = None
+        if st is not None and st.last_open_time is not None:
+            # vị trí nến cuối đã nạp
+            i = int(np.searchsorted(open_time[:n_closed], st.last_open_time))
+            if i < n_closed and open_time[i] == st.last_open_time:
+                start = i + 1
+        if start is None:
+            st = IndicatorState()
+            start = 0
+            self.stats["rebuilds"] += 1
+        else:
+            self.stats["incremental"] += 1
+        for c, t in zip(close[start:n_closed].tolist(), open_time[start:n_closed].tolist()):
+            st.update(c, t)
+        self.stats["bars_fed"] += n_closed - start
+
+        self._states[key] = st
+        self._states.move_to_end(key)
+        while len(self._states) > self.max_keys:
+            self._states.popitem(last=False)
+        return st.snapshot()
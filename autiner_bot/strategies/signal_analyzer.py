@@ -1,67 +1,57 @@
-import aiohttp
 import numpy as np
-from autiner_bot.settings import S
+from autiner_bot import metrics
+from autiner_bot.data_sources.binance import get_kline
+from autiner_bot.data_sources.models import Ticker
+from autiner_bot.strategies.indicators import WilderRSI
 
 
 # =============================
 # Tính RSI
 # =============================
+@metrics.timed()
 def calculate_rsi(prices, period: int = 14) -> float:
+    """RSI Wilder trên toàn chuỗi giá (làm mượt đệ quy, không chỉ period nến đầu)."""
     if len(prices) < period + 1:
         return 50.0
 
-    deltas = np.diff(prices)
-    gains = np.where(deltas > 0, deltas, 0)
-    losses = np.where(deltas < 0, -deltas, 0)
-
-    avg_gain = np.mean(gains[:period])
-    avg_loss = np.mean(losses[:period])
-
-    if avg_loss == 0:
-        return 100.0
-    if avg_gain == 0:
-        return 0.0
-
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return float(rsi)
+    rsi = WilderRSI(period)
+    for p in prices:
+        value = rsi.update(float(p))
+    return float(value)
 
 
 # =============================
-# Lấy dữ liệu Kline MEXC
+# Lấy dữ liệu Kline
 # =============================
+@metrics.timed()
 async def fetch_klines(symbol: str, limit: int = 100):
     """
-    Lấy dữ liệu nến 1 phút từ MEXC.
-    Trả về danh sách giá đóng cửa.
+    Giá đóng cửa nến 1 phút của symbol (Binance Futures).
+    Đi qua get_kline: session dùng chung, weight limiter, cache nến, metrics.
     """
-    url = S.MEXC_KLINES_URL.format(sym=symbol)
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=10) as resp:
-                data = await resp.json()
-                if data.get("success") and "data" in data:
-                    closes = [float(c[4]) for c in data["data"]]  # c[4] = close price
-                    return closes[-limit:]
-    except Exception as e:
-        print(f"[ERROR] fetch_klines {symbol}: {e}")
-    return []
+    series = await get_kline(symbol, "1m", limit)
+    return series.close.tolist()
 
 
 # =============================
 # Phân tích tín hiệu nâng cấp
 # =============================
-async def analyze_coin_signal(coin: dict) -> dict:
+@metrics.timed()
+async def analyze_coin_signal(coin) -> dict:
     """
     Phân tích kỹ thuật:
     - RSI (14 kỳ, dữ liệu thực)
     - MA5, MA20
     - Entry linh hoạt (Market/Limit)
     - TP/SL động theo biến động
+    coin: Ticker, hoặc dict {symbol, lastPrice, change_pct}.
     """
-    symbol = coin["symbol"]
-    last_price = coin["lastPrice"]
-    change_pct = coin["change_pct"]
+    if isinstance(coin, Ticker):
+        symbol, last_price, change_pct = coin.symbol, coin.last_price, coin.change_pct
+    else:
+        symbol = coin["symbol"]
+        last_price = coin["lastPrice"]
+        change_pct = coin["change_pct"]
 
     # --- Lấy dữ liệu nến ---
     closes = await fetch_klines(symbol, limit=50)
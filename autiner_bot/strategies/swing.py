@@ -1,26 +1,12 @@
 # autiner_bot/strategies/swing.py
-import random
+from autiner_bot import metrics
+from autiner_bot.strategies.confluence import analyze_confluence, to_signal
 
-def generate_swing_signal(symbol: str):
+@metrics.timed()
+async def generate_swing_signal(symbol: str):
     """
-    Tạo tín hiệu swing giả lập.
-    Có thể mở rộng dùng phân tích khung H4/D1.
+    Tín hiệu swing: confluence 15m / 1h / 4h, gộp từ 1 chuỗi nến 15m.
+    None nếu không đủ dữ liệu.
     """
-    side = random.choice(["LONG", "SHORT"])
-    entry = round(random.uniform(0.8, 1.2) * 100, 2)
-    tp = entry * (1.03 if side == "LONG" else 0.97)
-    sl = entry * (0.98 if side == "LONG" else 1.02)
-    strength = random.randint(50, 90)
-    reason = "Xu hướng trung hạn mạnh, hỗ trợ/kháng cự rõ"
-
-    return {
-        "symbol": symbol,
-        "side": side,
-        "type": "Swing",
-        "orderType": "Limit",
-        "entry": entry,
-        "tp": tp,
-        "sl": sl,
-        "strength": strength,
-        "reason": reason
-    }
+    res = await analyze_confluence(symbol, "swing")
+    return to_signal(res, "Swing") if res else None
@@ -1,39 +1,270 @@
 # autiner_bot/utils/state.py
 """
-Trạng thái đơn giản cho bot.
-- Lưu đơn vị hiển thị: "USDT" hoặc "VND"
-- Có khoá để set thread-safe khi chạy Flask + PTB song song.
+Trạng thái theo chat (đơn vị hiển thị USDT/VND, watchlist), lưu SQLite.
+- Đọc: LRU trong RAM (OrderedDict) -> đường nóng của handler không đụng đĩa;
+  miss mới SELECT theo khoá chính, chat chưa có bản ghi dùng mặc định (cũng được cache).
+- Ghi: write-behind. Đổi trạng thái chỉ đánh dấu dirty, gom lại rồi ghi 1 transaction
+  (executemany upsert) sau STATE_FLUSH_DELAY giây hoặc khi đủ batch_size chat.
+- SQLite WAL + synchronous=NORMAL: ghi nhanh, đọc không bị khoá bởi ghi.
+- Chat dirty bị đẩy khỏi LRU vẫn nằm trong hàng ghi (get() đọc từ đó trước) nên không mất thay đổi.
+- path="" -> chỉ giữ trong RAM (script/test).
 """
 
-from typing import Dict
-import threading
-
-_LOCK = threading.RLock()
-
-# Trạng thái mặc định
-_state: Dict[str, object] = {
-    "currency_mode": "USDT",   # hoặc "VND"
-}
-
-def get_state() -> Dict[str, object]:
-    """
-    Trả về dict trạng thái hiện tại.
-    Dùng read-only trong luồng khác nhau. Nếu cần sửa, dùng hàm setter.
-    """
-    return _state
-
-def set_currency_mode(mode: str) -> None:
-    """
-    Đổi đơn vị hiển thị: "USDT" hoặc "VND".
-    """
-    mode = (mode or "").upper()
-    if mode not in ("USDT", "VND"):
-        mode = "USDT"
-    with _LOCK:
-        _state["currency_mode"] = mode
-
-# (tuỳ chọn) reset trạng thái
-def reset_state() -> None:
-    with _LOCK:
-        _state.clear()
-        _state.update({"currency_mode": "USDT"})
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import asyncio
+import json
+import os
+import sqlite3
+import time
+
+from autiner_bot import metrics
+from autiner_bot.settings import S
+
+CURRENCY_MODES = ("USDT", "VND")
+DEFAULT_CURRENCY = "USDT"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_state (
+    chat_id       INTEGER PRIMARY KEY,
+    currency_mode TEXT    NOT NULL DEFAULT 'USDT',
+    watchlist     TEXT    NOT NULL DEFAULT '[]',
+    updated_at    REAL    NOT NULL
+)
+"""
+_UPSERT = """
+INSERT INTO chat_state (chat_id, currency_mode, watchlist, updated_at) VALUES (?, ?, ?, ?)
+ON CONFLICT(chat_id) DO UPDATE SET
+    currency_mode = excluded.currency_mode,
+    watchlist     = excluded.watchlist,
+    updated_at    = excluded.updated_at
+"""
+
+
+class ChatState:
+    __slots__ = ("chat_id", "currency_mode", "watchlist", "updated_at")
+
+    def __init__(self, chat_id: int, currency_mode: str = DEFAULT_CURRENCY,
+                 watchlist: Tuple[str, ...] = (), updated_at: float = 0.0):
+        self.chat_id = chat_id
+        self.currency_mode = currency_mode
+        self.watchlist = watchlist      # tuple: đọc chung an toàn, đổi là thay cả tuple
+        self.updated_at = updated_at
+
+    def to_row(self) -> tuple:
+        return self.chat_id, self.currency_mode, json.dumps(list(self.watchlist)), self.updated_at
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "ChatState":
+        chat_id, mode, watchlist, updated_at = row
+        try:
+            symbols = tuple(json.loads(watchlist or "[]"))
+        except ValueError:
+            symbols = ()
+        return cls(chat_id, mode if mode in CURRENCY_MODES else DEFAULT_CURRENCY, symbols, updated_at)
+
+    def __repr__(self) -> str:
+        return f"ChatState({self.chat_id} {self.currency_mode} watch={len(self.watchlist)})"
+
+
+class StateStore:
+    def __init__(self, path: str = "", cache_size: int = 10_000, flush_delay: float = 1.0,
+                 batch_size: int = 500, max_watchlist: int = 30):
+        self.path = path
+        self.cache_size = max(1, cache_size)
+        self.flush_delay = flush_delay
+        self.batch_size = max(1, batch_size)
+        self.max_watchlist = max_watchlist
+        self._db: Optional[sqlite3.Connection] = None
+        self._cache: "OrderedDict[int, ChatState]" = OrderedDict()
+        self._dirty: Dict[int, ChatState] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "loaded": 0, "evicted": 0,
+                                      "flushes": 0, "rows_written": 0, "errors": 0}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    # ---------- kết nối ----------
+    def open(self) -> Optional[sqlite3.Connection]:
+        if self._db is not None or not self.path:
+            return self._db
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(_SCHEMA)
+            db.commit()
+            self._db = db
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            print(f"[ERROR] state db {self.path}: {e}")
+        return self._db
+
+    def close(self) -> None:
+        """Ghi nốt phần dirty rồi đóng DB (gọi lúc tắt bot)."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ---------- đọc ----------
+    def get(self, chat_id: int) -> ChatState:
+        st = self._cache.get(chat_id)
+        if st is not None:
+            self.stats["hits"] += 1
+            self._cache.move_to_end(chat_id)
+            return st
+        self.stats["misses"] += 1
+        st = self._dirty.get(chat_id) or self._load(chat_id) or ChatState(chat_id)
+        self._remember(st)
+        return st
+
+    def _load(self, chat_id: int) -> Optional[ChatState]:
+        db = self.open()
+        if db is None:
+            return None
+        try:
+            row = db.execute(
+                "SELECT chat_id, currency_mode, watchlist, updated_at FROM chat_state WHERE chat_id = ?",
+                (chat_id,),
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            print(f"[ERROR] state load {chat_id}: {e}")
+            return None
+        if row is None:
+            return None
+        self.stats["loaded"] += 1
+        return ChatState.from_row(row)
+
+    def _remember(self, st: ChatState) -> None:
+        cache = self._cache
+        cache[st.chat_id] = st
+        cache.move_to_end(st.chat_id)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def currency_mode(self, chat_id: Optional[int]) -> str:
+        return self.get(chat_id).currency_mode if chat_id is not None else DEFAULT_CURRENCY
+
+    def watchlist(self, chat_id: int) -> Tuple[str, ...]:
+        return self.get(chat_id).watchlist
+
+    # ---------- ghi ----------
+    def set_currency_mode(self, chat_id: int, mode: str) -> str:
+        mode = (mode or "").upper()
+        if mode not in CURRENCY_MODES:
+            mode = DEFAULT_CURRENCY
+        st = self.get(chat_id)
+        if st.currency_mode != mode:
+            st.currency_mode = mode
+            self._changed(st)
+        return mode
+
+    def watch(self, chat_id: int, symbol: str) -> bool:
+        st = self.get(chat_id)
+        symbol = symbol.upper()
+        if symbol in st.watchlist:
+            return False
+        if len(st.watchlist) >= self.max_watchlist:
+            raise ValueError(f"tối đa {self.max_watchlist} symbol / watchlist")
+        st.watchlist = st.watchlist + (symbol,)
+        self._changed(st)
+        return True
+
+    def unwatch(self, chat_id: int, symbol: str) -> bool:
+        st = self.get(chat_id)
+        symbol = symbol.upper()
+        if symbol not in st.watchlist:
+            return False
+        st.watchlist = tuple(s for s in st.watchlist if s != symbol)
+        self._changed(st)
+        return True
+
+    def _changed(self, st: ChatState) -> None:
+        st.updated_at = time.time()
+        self._dirty[st.chat_id] = st
+        if not self.path:
+            return
+        if len(self._dirty) >= self.batch_size:
+            self.flush()
+            return
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # ngoài event loop (script/test): gọi flush() khi cần
+        self._flush_handle = loop.call_later(self.flush_delay, self._flush_scheduled)
+
+    def _flush_scheduled(self) -> None:
+        self._flush_handle = None
+        self.flush()
+        if self._dirty:   # ghi lỗi -> thử lại lần sau
+            self._schedule_flush()
+
+    def flush(self) -> int:
+        """Ghi mọi chat dirty trong 1 transaction; trả số dòng đã ghi."""
+        if not self._dirty:
+            return 0
+        db = self.open()
+        if db is None:
+            return 0
+        batch = list(self._dirty.values())
+        try:
+            with db:
+                db.executemany(_UPSERT, [st.to_row() for st in batch])
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            print(f"[ERROR] state flush {len(batch)} rows: {e}")
+            return 0
+        self._dirty.clear()   # ghi đồng bộ trên loop -> không có thay đổi chen giữa
+        self.stats["flushes"] += 1
+        self.stats["rows_written"] += len(batch)
+        return len(batch)
+
+
+STATE = StateStore(S.STATE_DB, cache_size=S.STATE_CACHE_SIZE, flush_delay=S.STATE_FLUSH_DELAY)
+
+
+def get_currency_mode(chat_id: Optional[int]) -> str:
+    return STATE.currency_mode(chat_id)
+
+
+def set_currency_mode(chat_id: int, mode: str) -> str:
+    """Đổi đơn vị hiển thị của chat: "USDT" hoặc "VND" (giá trị khác -> USDT)."""
+    return STATE.set_currency_mode(chat_id, mode)
+
+
+def get_watchlist(chat_id: int) -> Tuple[str, ...]:
+    return STATE.watchlist(chat_id)
+
+
+def watch(chat_id: int, symbol: str) -> bool:
+    """Thêm symbol vào watchlist của chat; False nếu đã có, ValueError nếu đầy."""
+    return STATE.watch(chat_id, symbol)
+
+
+def unwatch(chat_id: int, symbol: str) -> bool:
+    return STATE.unwatch(chat_id, symbol)
+
+
+@metrics.register_collector
+def _collect_metrics():
+    yield "autiner_state_cached", "gauge", "Số chat trong LRU trạng thái", [({}, len(STATE))]
+    yield "autiner_state_pending", "gauge", "Số chat chờ ghi xuống SQLite", [({}, STATE.pending)]
+    yield metrics.stats_family("autiner_state_stats_total", "counter", "Thống kê kho trạng thái chat",
+                               "store", {"chat_state": STATE.stats})
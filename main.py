@@ -1,30 +1,104 @@
 import os
 import asyncio
-import threading
+import hmac
+import signal
 import logging
 
-from flask import Flask, request
+from aiohttp import web
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters
 
 from autiner_bot.settings import S
 from autiner_bot import menu  # chỉ cần menu
+from autiner_bot import metrics  # route /metrics
 from autiner_bot.data_sources.binance import diagnose_binance  # cho route /diag
+from autiner_bot.signal_generator import cached_scan  # cho route /scan
+from autiner_bot.data_sources import http_client
+from autiner_bot.data_sources.binance_ws import STREAM
+from autiner_bot.market_poller import flush_kline_store, start_market_poller, stop_market_poller
+from autiner_bot.alerts import start_alerts, stop_alerts
+from autiner_bot.dispatcher import UpdateDispatcher
+from autiner_bot.broadcaster import Broadcaster, PRIORITY_HIGH, PRIORITY_NORMAL
+from autiner_bot.utils.state import STATE
 
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("autiner")
 
-# ========= Flask =========
-app = Flask(__name__)
-
 # ========= PTB Application (async) =========
 bot_loop = asyncio.new_event_loop()
 application = Application.builder().token(S.TELEGRAM_BOT_TOKEN).build()
 
 # Handlers
 application.add_handler(CommandHandler("start", menu.start_command))
+application.add_handler(CommandHandler("scan", menu.scan_command))
+application.add_handler(CommandHandler("alert", menu.alert_command))
+application.add_handler(CommandHandler("alerts", menu.alerts_command))
+application.add_handler(CommandHandler("unalert", menu.unalert_command))
+application.add_handler(CommandHandler("watch", menu.watch_command))
+application.add_handler(CommandHandler("unwatch", menu.unwatch_command))
 application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, menu.text_handler))
 
+# ========= Điều phối update: worker cố định, FIFO theo chat, giới hạn hàng chờ =========
+@metrics.timed("process_update")
+async def _process_raw_update(data: dict):
+    update = Update.de_json(data, application.bot)
+    await application.process_update(update)
+
+dispatcher = UpdateDispatcher(
+    _process_raw_update,
+    workers=S.UPDATE_WORKERS,
+    max_pending=S.UPDATE_QUEUE_MAX,
+    max_per_chat=S.UPDATE_MAX_PER_CHAT,
+)
+# ========= Gửi tin chủ động: giới hạn toàn cục + theo chat, gộp tin, RetryAfter =========
+outbox = Broadcaster(
+    application.bot.send_message,
+    global_rate=S.TG_GLOBAL_RATE,
+    chat_rate=S.TG_CHAT_RATE,
+    group_rate=S.TG_GROUP_RATE,
+    concurrency=S.TG_SEND_CONCURRENCY,
+    max_pending=S.TG_OUTBOX_MAX,
+)
+_web_runner: web.AppRunner | None = None
+_overload_notified: dict = {}
+
+@metrics.register_collector
+def _collect_app_metrics():
+    yield "autiner_updates_pending", "gauge", "Update đang chờ worker", [({}, dispatcher.pending)]
+    yield "autiner_updates_in_flight", "gauge", "Update đang được xử lý", [({}, dispatcher.in_flight)]
+    yield metrics.stats_family("autiner_dispatcher_events_total", "counter",
+                               "Update theo kết quả (accepted/rejected/processed/errors)",
+                               "dispatcher", {"updates": dispatcher.stats})
+    yield metrics.stats_family("autiner_ws_events_total", "counter", "Sự kiện websocket Binance",
+                               "stream", {"market": STREAM.stats})
+    yield "autiner_ws_live", "gauge", "Websocket Binance đang sống (1/0)", [({}, int(STREAM.is_live()))]
+    yield "autiner_outbox_pending", "gauge", "Tin chủ động đang chờ gửi", [({}, outbox.pending)]
+    yield metrics.stats_family("autiner_outbox_events_total", "counter", "Hàng gửi tin Telegram",
+                               "outbox", {"telegram": outbox.stats})
+
+def _chat_id_of(data: dict):
+    for key in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        chat = (data.get(key) or {}).get("chat")
+        if chat:
+            return chat.get("id")
+    cq = data.get("callback_query") or {}
+    chat = (cq.get("message") or {}).get("chat")
+    return chat.get("id") if chat else None
+
+def _notify_overload(chat_id):
+    # Báo quá tải tối đa 1 lần / OVERLOAD_NOTICE_SEC / chat
+    now = bot_loop.time()
+    if now - _overload_notified.get(chat_id, 0.0) < S.OVERLOAD_NOTICE_SEC:
+        return
+    if len(_overload_notified) > 10_000:
+        _overload_notified.clear()
+    _overload_notified[chat_id] = now
+    outbox.submit(chat_id, "⚠️ Bot đang quá tải, bạn thử lại sau ít giây nhé.", PRIORITY_HIGH, key="overload")
+
+async def _send_alert(alert, value):
+    if not outbox.submit(alert.chat_id, menu.format_alert_fired(alert, value), PRIORITY_NORMAL):
+        log.warning("outbox full, alert #%s to %s dropped", alert.id, alert.chat_id)
+
 # ========= Webhook helpers =========
 def _get_webhook_base():
     # Ưu tiên biến ENV của Render; có thể tự set WEBHOOK_BASE nếu cần
@@ -34,62 +108,132 @@ def _get_webhook_base():
         or "https://autiner-7mgw.onrender.com"  # fallback
     ).rstrip("/")
 
+# ========= Web routes (aiohttp, chạy chung bot_loop) =========
+@metrics.timed("webhook")
+async def webhook(request: web.Request):
+    try:
+        data = await request.json()
+    except Exception:
+        return web.Response(text="no json", status=400)
+    if not data:
+        return web.Response(text="no json", status=400)
+    # log để debug khi cần
+    log.debug("Incoming update: %s", data)
+    chat_id = _chat_id_of(data)
+    # Update không gắn chat -> khoá riêng theo update_id (xử lý song song)
+    key = chat_id if chat_id is not None else ("update", data.get("update_id"))
+    if not dispatcher.submit(key, data):
+        log.warning("dispatcher overloaded (pending=%d), dropping update", dispatcher.pending)
+        if chat_id is not None:
+            _notify_overload(chat_id)
+    return web.Response(text="OK")
+
+async def health(request: web.Request):
+    return web.Response(text="ok")
+
+async def home(request: web.Request):
+    return web.Response(text="Autiner Bot Running")
+
+# === Route chẩn đoán Binance (rất hữu ích khi lỗi) ===
+async def diag(request: web.Request):
+    try:
+        info = await asyncio.wait_for(diagnose_binance(), timeout=20)
+    except asyncio.TimeoutError:
+        info = {"error": "timeout"}
+    return web.Response(
+        text=(
+            "Binance Futures diagnose:\n"
+            f"- ping status: {info.get('ping')}\n"
+            f"- tickers status: {info.get('tickers_status')}\n"
+            f"- tickers len: {info.get('tickers_len')}\n"
+            f"- sample: {str(info.get('sample'))[:200]}\n"
+            f"- error: {info.get('error')}\n"
+            f"- updates pending/in-flight: {dispatcher.pending}/{dispatcher.in_flight}\n"
+        ),
+        content_type="text/plain",
+        charset="utf-8",
+    )
+
+# === Metrics dạng Prometheus ===
+async def metrics_route(request: web.Request):
+    return web.Response(body=metrics.render().encode("utf-8"), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+# === Quét toàn thị trường: top LONG/SHORT (cần token, dùng chung kết quả quét) ===
+async def scan(request: web.Request):
+    if not S.SCAN_ROUTE_TOKEN:
+        return web.Response(text="scan route disabled", status=404)
+    token = request.headers.get("X-Scan-Token") or request.query.get("token", "")
+    if not hmac.compare_digest(token.encode(), S.SCAN_ROUTE_TOKEN.encode()):
+        return web.Response(text="forbidden", status=403)
+    return web.json_response(await cached_scan(request.query.get("top")))
+
+def build_web_app() -> web.Application:
+    web_app = web.Application(client_max_size=S.WEBHOOK_MAX_BODY)
+    web_app.router.add_post(f"/webhook/{S.TELEGRAM_BOT_TOKEN}", webhook)
+    web_app.router.add_get("/health", health)
+    web_app.router.add_get("/", home)
+    web_app.router.add_get("/diag", diag)
+    web_app.router.add_get("/metrics", metrics_route)
+    web_app.router.add_get("/scan", scan)
+    return web_app
+
+# ========= Start / stop =========
 async def init_bot():
+    global _web_runner
+    await http_client.init_http_session()
     await application.initialize()
     await application.start()
+    dispatcher.start()
+    outbox.start()
+    STATE.open()
+    if S.METRICS_ENABLED:
+        metrics.LOOP_LAG_MONITOR.start()
+    if S.ALERTS_ENABLED:
+        log.info("[ALERTS] loaded %d alerts", start_alerts(_send_alert))
+    if S.BINANCE_WS_ENABLED:
+        STREAM.start()
+    if S.POLLER_ENABLED:
+        start_market_poller(bot_loop)
+
+    port = int(os.getenv("PORT", "10000"))  # Render set PORT qua ENV
+    _web_runner = web.AppRunner(build_web_app(), access_log=None)
+    await _web_runner.setup()
+    await web.TCPSite(_web_runner, "0.0.0.0", port).start()
+    log.info("[WEB] listening on :%s", port)
+
     webhook_base = _get_webhook_base()
     webhook_url = f"{webhook_base}/webhook/{S.TELEGRAM_BOT_TOKEN}"
     await application.bot.set_webhook(webhook_url, drop_pending_updates=True)
     log.info("[WEBHOOK] set to %s", webhook_url)
 
-# ========= Flask routes =========
-@app.route(f"/webhook/{S.TELEGRAM_BOT_TOKEN}", methods=["POST"])
-def webhook():
+async def shutdown_bot():
+    stop_market_poller()
+    stop_alerts()
+    await STREAM.stop()
+    await flush_kline_store()   # ghi nốt nến đã đóng còn chờ
+    await metrics.LOOP_LAG_MONITOR.stop()
+    if _web_runner is not None:
+        await _web_runner.cleanup()
+    await dispatcher.stop()
+    await outbox.stop(drain_timeout=5)
+    STATE.close()   # ghi nốt trạng thái chat còn chờ
     try:
-        data = request.get_json(force=True, silent=True)
-        if not data:
-            return "no json", 400
-        # log để debug khi cần
-        log.info("Incoming update: %s", data)
-        update = Update.de_json(data, application.bot)
-        asyncio.run_coroutine_threadsafe(application.process_update(update), bot_loop)
-        return "OK", 200
-    except Exception as e:
-        log.exception("webhook error: %s", e)
-        return "ERR", 500
-
-@app.route("/health", methods=["GET"])
-def health():
-    return "ok", 200
-
-@app.route("/", methods=["GET"])
-def home():
-    return "Autiner Bot Running", 200
+        await application.stop()
+        await application.shutdown()
+    finally:
+        await http_client.close_http_session()
 
-# === Route chẩn đoán Binance (rất hữu ích khi lỗi) ===
-@app.route("/diag", methods=["GET"])
-def diag():
-    fut = asyncio.run_coroutine_threadsafe(diagnose_binance(), bot_loop)
-    info = fut.result(timeout=20)
-    return (
-        "Binance Futures diagnose:\n"
-        f"- ping status: {info.get('ping')}\n"
-        f"- tickers status: {info.get('tickers_status')}\n"
-        f"- tickers len: {info.get('tickers_len')}\n"
-        f"- sample: {str(info.get('sample'))[:200]}\n"
-        f"- error: {info.get('error')}\n",
-        200,
-        {"Content-Type": "text/plain; charset=utf-8"}
-    )
-
-# ========= Threads =========
-def start_bot_loop():
+def run():
     asyncio.set_event_loop(bot_loop)
     log.info("[BOT] Starting bot loop…")
-    bot_loop.run_until_complete(init_bot())
-    bot_loop.run_forever()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        bot_loop.add_signal_handler(sig, bot_loop.stop)
+    try:
+        bot_loop.run_until_complete(init_bot())
+        bot_loop.run_forever()
+    finally:
+        bot_loop.run_until_complete(shutdown_bot())
+        bot_loop.close()
 
 if __name__ == "__main__":
-    threading.Thread(target=start_bot_loop, daemon=True).start()
-    port = int(os.getenv("PORT", "10000"))  # Render set PORT qua ENV
-    app.run(host="0.0.0.0", port=port, use_reloader=False)
+    run()
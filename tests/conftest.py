@@ -0,0 +1,7 @@
+# tests/conftest.py
+"""Chạy test không đụng đĩa: tắt SQLite state, file cảnh báo, kho nến (Settings đọc env lúc import)."""
+
+import os
+
+for _key in ("STATE_DB", "ALERTS_FILE", "KLINE_STORE_DIR"):
+    os.environ.setdefault(_key, "")
@@ -0,0 +1,111 @@
+# tests/test_binance_ws.py
+"""
+BinanceMarketStream chạy trên stub websocket local (replay frame của fixtures) + stub REST:
+nhận ticker/nến, rớt kết nối -> REST fallback, reconnect với backoff tăng dần, SUBSCRIBE symbol mới.
+Chạy: python -m pytest -q
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from autiner_bot import market_poller
+from autiner_bot.bench import fixtures as fx_mod
+from autiner_bot.bench.stub_server import StubServer
+from autiner_bot.bench.ws_stub import WsStubServer
+from autiner_bot.data_sources import binance, http_client
+from autiner_bot.data_sources.binance_ws import BinanceMarketStream
+from autiner_bot.data_sources.kline_cache import KLINES
+from autiner_bot.data_sources.rate_limiter import WeightLimiter
+from autiner_bot.data_sources.symbol_index import get_symbol_index
+
+MIN_BACKOFF = 0.05
+
+
+async def _wait(cond, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > deadline:
+            raise AssertionError("hết thời gian chờ")
+        await asyncio.sleep(0.01)
+
+
+def _last_kline_close(fx, symbol: str) -> float:
+    return max(float(f["data"]["k"]["c"]) for f in fx.ws if f["stream"] == f"{symbol.lower()}@kline_15m")
+
+
+async def _scenario(fx, rest: StubServer, ws: WsStubServer, stream: BinanceMarketStream) -> None:
+    rest_tickers = lambda: rest.requests.get("ticker_24hr", 0)
+
+    # seed nến bằng REST (stream chỉ cập nhật series đã có)
+    for sym in ("BTCUSDT", "ETHUSDT"):
+        assert len(await binance.get_kline(sym, "15m", 100)) == 100
+    klines_fetched = rest.requests["klines"]
+
+    # 1) stream sống: ticker + nến đang chạy đi qua websocket, poller không gọi REST ticker
+    stream.start()
+    await _wait(lambda: stream.is_live() and stream.stats["kline_events"] >= 3)
+    assert ws.clients == 1 and stream.stats["connects"] == 1
+    btc = next(t for t in fx.tickers if t["symbol"] == "BTCUSDT")
+    assert get_symbol_index(binance.TICKERS.data).price("BTCUSDT") == float(btc["lastPrice"])
+    series = await binance.get_kline("BTCUSDT", "15m", 100)
+    assert series.close[-1] == pytest.approx(_last_kline_close(fx, "BTCUSDT"))
+    assert rest.requests["klines"] == klines_fetched
+    await market_poller.refresh_tickers()
+    assert rest_tickers() == 0
+
+    # 2) rớt kết nối, 2 lần bắt tay kế tiếp bị từ chối -> REST làm fallback trong lúc chờ
+    ws.reject(2)
+    attempts_before = len(ws.attempts)
+    await ws.drop()
+    await _wait(lambda: not stream.connected)
+    assert not stream.is_live() and stream.stats["disconnects"] == 1
+    await market_poller.refresh_tickers()
+    assert rest_tickers() == 1
+
+    # 3) reconnect: chờ giữa các lần thử tăng gấp đôi (min_backoff, x2, x4)
+    await _wait(lambda: stream.stats["connects"] == 2 and stream.is_live())
+    times = ws.attempts[attempts_before - 1:]
+    assert len(times) == 4
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    for gap, want in zip(gaps, (MIN_BACKOFF, 2 * MIN_BACKOFF, 4 * MIN_BACKOFF)):
+        assert gap >= want * 0.9
+    await market_poller.refresh_tickers()
+    assert rest_tickers() == 1
+
+    # 4) thêm symbol nến khi đang kết nối -> SUBSCRIBE, không reconnect
+    events = stream.stats["kline_events"]
+    await stream.set_kline_symbols(["BTCUSDT", "ETHUSDT"])
+    await _wait(lambda: stream.stats["kline_events"] >= events + 3)
+    assert ws.subscribe_requests == 1 and stream.stats["connects"] == 2
+    series = await binance.get_kline("ETHUSDT", "15m", 100)
+    assert series.close[-1] == pytest.approx(_last_kline_close(fx, "ETHUSDT"))
+
+
+def test_stream_reconnect_and_rest_fallback(monkeypatch):
+    fx = fx_mod.generate(n_symbols=20, bars=150)
+    stream = BinanceMarketStream("", "15m", ["BTCUSDT"], min_backoff=MIN_BACKOFF, max_backoff=1.0)
+    monkeypatch.setattr(market_poller, "STREAM", stream)
+    monkeypatch.setattr(binance, "LIMITER", WeightLimiter(10**9))
+    monkeypatch.setattr(binance.TICKERS, "data", [])
+    monkeypatch.setattr(binance.TICKERS, "updated_at", 0.0)
+    monkeypatch.setattr(KLINES, "store", None)
+
+    async def run():
+        rest = await StubServer(fx).start()
+        ws = await WsStubServer(fx).start()
+        monkeypatch.setattr(binance, "BINANCE_FUTURES_URL", rest.base_url)
+        stream.base_url = ws.base_url
+        KLINES.clear()
+        try:
+            await http_client.init_http_session()
+            await _scenario(fx, rest, ws, stream)
+        finally:
+            await stream.stop()
+            await http_client.close_http_session()
+            await ws.stop()
+            await rest.stop()
+            KLINES.clear()
+
+    asyncio.run(run())
@@ -0,0 +1,62 @@
+# tests/test_confluence.py
+"""
+Confluence (khung gộp từ nến gốc) không được đụng trạng thái chỉ báo của analyze_coin.
+Chạy: python -m pytest -q
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from autiner_bot.data_sources import binance
+from autiner_bot.data_sources.kline_cache import interval_ms
+from autiner_bot.data_sources.models import KlineSeries
+from autiner_bot.strategies.analysis_memo import AnalysisMemo
+from autiner_bot.strategies.confluence import MODES, confluence_from_klines, state_key
+from autiner_bot.strategies.indicators import IncrementalIndicators
+
+
+def _series(interval: str, n: int, seed: int) -> KlineSeries:
+    """n nến, nến cuối là nến đang chạy theo đồng hồ."""
+    step = interval_ms(interval)
+    now_open = int(time.time() * 1000) // step * step
+    ot = now_open - (n - 1 - np.arange(n, dtype=np.int64)) * step
+    close = 100 + np.cumsum(np.random.default_rng(seed).normal(0, 0.5, n))
+    return KlineSeries(ot, close, close + 0.5, close - 0.5, close, np.ones(n), ot + step - 1, close,
+                       np.ones(n, dtype=np.int64))
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    klines = {"15m": _series("15m", 1000, 1), "1m": _series("1m", 1000, 2)}
+
+    async def fake_get_kline(symbol, interval="15m", limit=200, max_age=None):
+        return klines[interval][-limit:]
+
+    monkeypatch.setattr(binance, "get_kline", fake_get_kline)
+
+    def reset():
+        monkeypatch.setattr(binance, "_INDICATORS", IncrementalIndicators())
+        monkeypatch.setattr(binance, "ANALYSES", AnalysisMemo())
+    return klines, reset
+
+
+def test_analyze_coin_unaffected_by_confluence(fresh):
+    klines, reset = fresh
+    reset()
+    alone = asyncio.run(binance.analyze_coin("BTCUSDT", "15m"))
+    alone_ind = binance.calculate_indicators(klines["15m"][-200:], "BTCUSDT", "15m")
+
+    for mode in ("scalping", "swing"):
+        reset()
+        base = klines[MODES[mode].base]
+        assert confluence_from_klines("BTCUSDT", base, MODES[mode]) is not None
+        assert asyncio.run(binance.analyze_coin("BTCUSDT", "15m")) == alone
+        assert binance.calculate_indicators(klines["15m"][-200:], "BTCUSDT", "15m") == alone_ind
+        # trạng thái nến thật 15m chỉ dựng 1 lần, không bị khung gộp ghi đè
+        assert binance._INDICATORS.state(("BTCUSDT", "15m")).last_open_time == int(klines["15m"].open_time[-2])
+        own = [tf for tf, _ in MODES[mode].frames
+               if binance._INDICATORS.state(("BTCUSDT", state_key(tf, MODES[mode]))) is not None]
+        assert own and binance._INDICATORS.stats["rebuilds"] == 1 + len(own)
@@ -0,0 +1,157 @@
+# tests/test_indicators.py
+"""
+Chỉ báo so với giá trị tham chiếu đã biết + khớp giữa bản có trạng thái (indicators)
+và bản vector hoá (batch_indicators).
+Chạy: python -m pytest -q
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from autiner_bot.data_sources.models import KlineSeries
+from autiner_bot.strategies import batch_indicators as bi
+from autiner_bot.strategies.indicators import (
+    EMA, MACD, Bands, IncrementalIndicators, IndicatorState, WilderRSI, indicators_from_closes,
+)
+
+# StockCharts "RSI" (ChartSchool): RSI 14 Wilder, giá trị đầu tiên ở close thứ 15
+RSI_CLOSES = [
+    44.34, 44.09, 44.15, 43.61, 44.33, 44.83, 45.10, 45.42, 45.84, 46.08, 45.89, 46.03, 45.61, 46.28,
+    46.28, 46.00, 46.03, 46.41, 46.22, 45.64, 46.21, 46.25, 45.71, 46.45, 45.78, 45.35, 44.03, 44.18,
+    44.22, 44.57, 43.42, 42.66, 43.13,
+]
+RSI_EXPECTED = [
+    70.46, 66.25, 66.48, 69.35, 66.29, 57.92, 62.88, 63.21, 56.01, 62.34, 54.67, 50.39, 40.02, 41.49,
+    41.90, 45.50, 37.32, 33.09, 37.79,
+]
+
+# StockCharts "Moving Averages": EMA 10 ngày, seed bằng SMA 10 nến đầu
+EMA_CLOSES = [
+    22.27, 22.19, 22.08, 22.17, 22.18, 22.13, 22.23, 22.43, 22.24, 22.29, 22.15, 22.39, 22.38, 22.61,
+    23.36, 24.05, 23.75, 23.83, 23.95, 23.63, 23.82, 23.87, 23.65, 23.19, 23.10, 23.33, 22.68, 23.10,
+    22.40, 22.17,
+]
+EMA_EXPECTED = [
+    22.22, 22.21, 22.24, 22.27, 22.33, 22.52, 22.80, 22.97, 23.13, 23.28, 23.34, 23.43, 23.51, 23.53,
+    23.47, 23.40, 23.39, 23.26, 23.23, 23.08, 22.92,
+]
+
+
+def _random_walk(n: int = 300, seed: int = 7) -> list:
+    rng = np.random.default_rng(seed)
+    return (100 + np.cumsum(rng.normal(0, 1, n))).tolist()
+
+
+def _feed(ind, closes):
+    return [ind.update(c) for c in closes]
+
+
+# =============================
+# Giá trị tham chiếu
+# =============================
+def test_wilder_rsi_matches_stockcharts():
+    batch = bi.rsi(RSI_CLOSES)
+    assert np.isnan(batch[:14]).all()
+    assert batch[14:] == pytest.approx(RSI_EXPECTED, abs=0.01)
+
+    live = _feed(WilderRSI(14), RSI_CLOSES)
+    assert live[:14] == [None] * 14
+    assert live[14:] == pytest.approx(RSI_EXPECTED, abs=0.01)
+
+
+def test_ema_matches_stockcharts():
+    assert bi.ema(EMA_CLOSES, 10)[9:] == pytest.approx(EMA_EXPECTED, abs=0.01)
+    assert _feed(EMA(10), EMA_CLOSES)[9:] == pytest.approx(EMA_EXPECTED, abs=0.01)
+
+
+def test_macd_on_linear_ramp():
+    # EMA(p) của chuỗi tăng đều 1/nến trễ đúng (p-1)/2 -> MACD(12, 26) = 12.5 - 5.5 = 7, signal = 7
+    ramp = np.arange(100.0)
+    line, sig, hist = bi.macd(ramp)
+    assert np.isnan(line[:25]).all() and np.isnan(sig[:33]).all()
+    assert line[25:] == pytest.approx(7.0)
+    assert sig[33:] == pytest.approx(7.0)
+    assert hist[33:] == pytest.approx(0.0, abs=1e-9)
+
+    m = MACD()
+    out = _feed(m, ramp.tolist())
+    assert out[24] == (None, None)
+    assert out[25][0] == pytest.approx(7.0) and out[25][1] is None
+    assert out[-1] == pytest.approx((7.0, 7.0))
+
+
+def test_rsi_flat_and_monotonic():
+    assert bi.rsi([5.0] * 30)[-1] == 50.0
+    assert bi.rsi(list(range(30)))[-1] == 100.0
+    assert _feed(WilderRSI(14), [float(x) for x in range(30, 0, -1)])[-1] == pytest.approx(0.0)
+
+
+# =============================
+# Có trạng thái == vector hoá
+# =============================
+def test_state_update_matches_batch():
+    closes = _random_walk()
+    rsi, ema20, ema50 = WilderRSI(14), EMA(20), EMA(50)
+    macd, bands = MACD(), Bands(20, 2.0)
+    b_rsi, b_ema20, b_ema50 = bi.rsi(closes), bi.ema(closes, 20), bi.ema(closes, 50)
+    b_line, b_sig, _ = bi.macd(closes)
+    for i, c in enumerate(closes):
+        for got, want in ((rsi.update(c), b_rsi[i]), (ema20.update(c), b_ema20[i]), (ema50.update(c), b_ema50[i])):
+            assert (got is None) == math.isnan(want)
+            if got is not None:
+                assert got == pytest.approx(want, rel=1e-9)
+        line, sig = macd.update(c)
+        assert (line is None) == math.isnan(b_line[i]) and (sig is None) == math.isnan(b_sig[i])
+        if sig is not None:
+            assert (line, sig) == pytest.approx((b_line[i], b_sig[i]), rel=1e-9)
+        bands.update(c)
+    nxt = closes[-1] + 1.0
+    mid, upper, lower = (a[-1] for a in bi.bollinger(closes + [nxt]))
+    assert bands.peek(nxt) == pytest.approx((mid, upper, lower), rel=1e-9)
+
+
+@pytest.mark.parametrize("n", [26, 60, 200])
+def test_state_peek_matches_batch_last_bar(n):
+    closes = _random_walk(n, seed=n)
+    st = IndicatorState()
+    for c in closes[:-1]:
+        st.update(c)
+    snap = st.snapshot(closes[-1])
+
+    arr = np.array(closes)
+    line, sig, _ = bi.macd(arr)
+    mid, upper, lower = bi.bollinger(arr)
+    assert snap["RSI"] == pytest.approx(round(bi.rsi(arr)[-1], 2))
+    if n >= 50:
+        assert snap["EMA50"] == pytest.approx(round(bi.ema(arr, 50)[-1], 6))
+    assert snap["EMA20"] == pytest.approx(round(bi.ema(arr, 20)[-1], 6))
+    ref = sig[-1] if not math.isnan(sig[-1]) else 0.0
+    assert snap["MACD"] == ("bullish" if line[-1] > ref else "bearish")
+    want_bb = "gần biên trên" if closes[-1] >= upper[-1] else "gần biên dưới" if closes[-1] <= lower[-1] else "trong dải"
+    assert snap["Bollinger"] == want_bb
+    assert snap == indicators_from_closes(closes)
+
+    # peek không đổi trạng thái: peek rồi update cùng giá -> cùng giá trị
+    peeked = st.rsi.peek(closes[-1])
+    assert st.rsi.update(closes[-1]) == pytest.approx(peeked)
+
+
+def test_incremental_compute_scores_last_closed_bar():
+    closes = _random_walk(120, seed=3)
+    n = len(closes)
+    ot = np.arange(n, dtype=np.int64) * 60_000
+    arr = np.array(closes)
+    k = KlineSeries(ot, arr, arr + 1, arr - 1, arr, np.ones(n), ot + 59_999, np.ones(n), np.ones(n, dtype=np.int64))
+    inc = IncrementalIndicators()
+    snap = inc.compute("k", k)
+    # nến cuối là nến đang chạy -> chỉ báo tại nến đóng n-2, không đổi khi giá nến đang chạy đổi
+    assert snap == indicators_from_closes(closes[:-1])
+    k.close[-1] += 50.0
+    assert inc.compute("k", k) == snap
+    assert inc.state("k").last_open_time == int(ot[-2])
+    # nến mới: nạp đúng 1 nến, khớp tính lại từ đầu
+    grown = k.append_row([int(ot[-1]) + 60_000, 1.0, 1.0, 1.0, 1.0])
+    assert inc.compute("k", grown) == indicators_from_closes(grown.close.tolist()[:-1])
+    assert inc.stats == {"incremental": 2, "rebuilds": 1, "bars_fed": n}
@@ -0,0 +1,97 @@
+# tests/test_kline_store.py
+"""
+KlineStore nối nến vào memmap đang mở (không mở lại mỗi lần), đọc lại sau khi mở lại / ghi dở,
+và KlineCache chỉ xếp hàng nến đã đóng cho tới khi write_pending ghi gộp.
+Chạy: python -m pytest -q
+"""
+
+import asyncio
+import time
+
+import numpy as np
+
+from autiner_bot.data_sources.kline_cache import KlineCache
+from autiner_bot.data_sources.kline_store import KlineStore
+from autiner_bot.data_sources.models import KlineSeries
+
+STEP = 60_000
+
+
+def _bars(start: int, n: int, t0: int = 1_700_000_000_000) -> KlineSeries:
+    ot = t0 + (start + np.arange(n, dtype=np.int64)) * STEP
+    px = 100.0 + start + np.arange(n, dtype=np.float64)
+    return KlineSeries(ot, px, px + 1, px - 1, px, np.ones(n), ot + STEP - 1, px, np.full(n, 7, dtype=np.int64))
+
+
+def test_append_extends_open_maps(tmp_path):
+    store = KlineStore(str(tmp_path))
+    assert store.append("BTCUSDT", "1m", _bars(0, 10)) == 10
+    maps = store._handles[("BTCUSDT", "1m")].maps
+    for i in range(10, 200):
+        assert store.append("BTCUSDT", "1m", _bars(i - 1, 2)) == 1   # nến trùng bị bỏ
+        cols = store.columns("BTCUSDT", "1m")
+        assert cols["open_time"].size == i + 1 and cols["close"][-1] == 100.0 + i
+    assert store._handles[("BTCUSDT", "1m")].maps is maps   # 200 nến < dung lượng cấp trước
+    assert not cols["close"].flags.writeable
+
+    reader = KlineStore(str(tmp_path))   # tiến trình khác / lần khởi động sau
+    assert reader.length("BTCUSDT", "1m") == 200
+    assert np.array_equal(reader.read("BTCUSDT", "1m")["close"], store.read("BTCUSDT", "1m")["close"])
+    assert reader.symbols("1m") == ["BTCUSDT"]
+
+
+def test_grows_past_capacity_and_ignores_partial_row(tmp_path):
+    store = KlineStore(str(tmp_path))
+    store.append("ETHUSDT", "1m", _bars(0, 1000))
+    store.append("ETHUSDT", "1m", _bars(1000, 100))   # > 1024 dòng -> nới file gấp đôi
+    h = store._handles[("ETHUSDT", "1m")]
+    assert h.length == 1100 and h.capacity == 2048
+    # ghi dở do crash: các cột khác đã ghi nhưng open_time chưa -> không tính
+    h.maps["close"][1100] = 9.0
+    h.maps["open_time"].flush()
+
+    reopened = KlineStore(str(tmp_path))
+    assert reopened.length("ETHUSDT", "1m") == 1100
+    assert reopened.append("ETHUSDT", "1m", _bars(1100, 1)) == 1
+    assert reopened.read("ETHUSDT", "1m")["close"][-1] == 1200.0
+    assert np.all(np.diff(reopened.read("ETHUSDT", "1m")["open_time"]) == STEP)
+
+
+def test_cache_queues_closed_bars_until_flush(tmp_path):
+    store = KlineStore(str(tmp_path))
+    cache = KlineCache(max_bars=10_000, min_refresh=60, store=store)
+    now_open = int(time.time() * 1000) // STEP * STEP
+    bars = _bars(0, 50, t0=now_open - 49 * STEP)   # nến cuối đang chạy
+
+    async def fetch(symbol, interval, limit, start_time):
+        return bars[-limit:]
+
+    asyncio.run(cache.get("BTCUSDT", "1m", 50, fetch))
+    assert store.length("BTCUSDT", "1m") == 0 and cache.stats["store_queued"] == 49
+    # tải lại cùng dữ liệu không xếp hàng trùng
+    asyncio.run(cache.get("BTCUSDT", "1m", 50, fetch, max_age=0))
+    assert cache.stats["store_queued"] == 49
+
+    assert cache.write_pending(cache.take_pending()) == 49
+    assert store.length("BTCUSDT", "1m") == 49 and not cache.take_pending()
+    assert store.last_open_time("BTCUSDT", "1m") == int(bars.open_time[-2])
+
+
+def test_store_loaded_series_refreshes_tail_on_fresh_boot(tmp_path, monkeypatch):
+    # máy vừa boot: time.monotonic() còn nhỏ hơn min_refresh
+    monkeypatch.setattr(time, "monotonic", lambda: 1.0)
+    store = KlineStore(str(tmp_path))
+    now_open = int(time.time() * 1000) // STEP * STEP
+    bars = _bars(0, 51, t0=now_open - 50 * STEP)
+    store.append("BTCUSDT", "1m", bars[:-1])   # đủ 50 nến đã đóng: đủ dài để bị trả như cache "còn mới"
+    cache = KlineCache(max_bars=10_000, min_refresh=60, store=store)
+    calls = []
+
+    async def fetch(symbol, interval, limit, start_time):
+        calls.append((limit, start_time))
+        return bars[-limit:]
+
+    got = asyncio.run(cache.get("BTCUSDT", "1m", 50, fetch))
+    assert cache.stats["store_loads"] == 1 and cache.stats["tail_fetches"] == 1
+    assert calls and calls[0][1] is not None   # chỉ tải phần đuôi, không trả nến đĩa như "còn mới"
+    assert got.last_open_time == now_open